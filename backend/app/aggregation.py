@@ -0,0 +1,269 @@
+"""
+Vectorized metric aggregation shared by the dashboard servers.
+"""
+
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Number of equal-width bins used for the materialized score histograms
+HISTOGRAM_BINS = 10
+
+
+def pass_mask(values) -> np.ndarray:
+    """
+    Resolve pass/fail strings to a boolean mask without a per-row Python loop.
+
+    Args:
+        values: Sequence of evaluator results (``"pass"``, ``"Fail"``, NaN, ...)
+
+    Returns:
+        np.ndarray: True where the result is a pass
+    """
+    # Compare once per distinct category, then broadcast through the codes
+    categorical = values if isinstance(values, pd.Categorical) else pd.Categorical(values)
+    categories = pd.Index(categorical.categories).astype(str).str.strip().str.lower()
+    lookup = np.append(np.asarray(categories == "pass"), False)
+    return lookup[categorical.codes]
+
+
+# Result strings with a fixed numeric value; other results are parsed as floats
+RESULT_VALUES = {"pass": 1.0, "true": 1.0, "1": 1.0, "fail": 0.0, "false": 0.0, "0": 0.0}
+
+
+def normalize_result(value: Any) -> float:
+    """Numeric value of a single result cell: 1 for pass, 0 for fail or missing."""
+    if pd.isna(value) or value == "":
+        return 0.0
+    lowered = str(value).lower()
+    if lowered in RESULT_VALUES:
+        return RESULT_VALUES[lowered]
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def normalize_results(frame: pd.DataFrame, columns: Sequence[str]) -> np.ndarray:
+    """
+    Map several result columns to numbers in one bulk pass.
+
+    Args:
+        frame (pd.DataFrame): Export holding the result columns
+        columns (Sequence[str]): Result columns, one per metric
+
+    Returns:
+        np.ndarray: (rows x columns) float array
+    """
+    values = frame[list(columns)].to_numpy(dtype=object)
+    # Normalize each distinct value once, then broadcast through the codes;
+    # missing cells get code -1, which picks the trailing 0
+    codes, uniques = pd.factorize(values.ravel())
+    lookup = np.array([normalize_result(value) for value in uniques] + [0.0], dtype=np.float64)
+    return lookup[codes].reshape(values.shape)
+
+
+def column_moments(scores: np.ndarray):
+    """
+    Count, mean, sum of squared deviations, min and max of each column.
+
+    Args:
+        scores (np.ndarray): (rows x metrics) float scores, NaN where missing
+
+    Returns:
+        Tuple of per-column arrays; means, minima and maxima are 0 for
+        columns without any score
+    """
+    valid = ~np.isnan(scores)
+    counts = valid.sum(axis=0)
+    filled = np.where(valid, scores, 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.where(counts > 0, filled.sum(axis=0) / counts, 0.0)
+    deviations = np.where(valid, scores - means, 0.0)
+    m2s = (deviations * deviations).sum(axis=0)
+
+    mins = np.where(counts > 0, np.where(valid, scores, np.inf).min(axis=0, initial=np.inf), 0.0)
+    maxs = np.where(counts > 0, np.where(valid, scores, -np.inf).max(axis=0, initial=-np.inf), 0.0)
+    return counts, means, m2s, mins, maxs
+
+
+def aggregate(keys: Sequence[str], scores: np.ndarray, passed: np.ndarray,
+              present: np.ndarray) -> Dict[str, Dict[str, float]]:
+    """
+    Summarize every metric in one vectorized pass over (rows x metrics) arrays.
+
+    Args:
+        keys (Sequence[str]): Metric names, one per column
+        scores (np.ndarray): Float scores, NaN where a row has no score
+        passed (np.ndarray): Boolean pass mask
+        present (np.ndarray): Boolean mask of rows that carry the metric
+
+    Returns:
+        Dict[str, Dict[str, float]]: Per-metric mean, passed, total, scored,
+        min, max and sample standard deviation
+    """
+    counts, means, m2s, mins, maxs = column_moments(scores)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variances = np.where(counts > 1, m2s / (counts - 1), 0.0)
+    passes = passed.sum(axis=0)
+    totals = present.sum(axis=0)
+
+    return {
+        key: {
+            "mean": float(means[i]),
+            "passed": int(passes[i]),
+            "total": int(totals[i]),
+            "scored": int(counts[i]),
+            "min": float(mins[i]),
+            "max": float(maxs[i]),
+            "stddev": float(np.sqrt(variances[i])),
+        }
+        for i, key in enumerate(keys)
+    }
+
+
+def aggregate_dataset(dataset) -> Dict[str, Dict[str, float]]:
+    """Aggregate all seven dashboard metrics of a columnar dataset."""
+    keys: List[str] = list(dataset.metrics)
+    n = len(dataset)
+    scores = np.empty((n, len(keys)), dtype=np.float64)
+    passed = np.empty((n, len(keys)), dtype=bool)
+    present = np.empty((n, len(keys)), dtype=bool)
+    for i, key in enumerate(keys):
+        columns = dataset.metrics[key]
+        scores[:, i] = columns.scores
+        passed[:, i] = columns.passed
+        present[:, i] = columns.present
+    return aggregate(keys, scores, passed, present)
+
+
+def summarize(dataset) -> Dict[str, Dict[str, Any]]:
+    """
+    Build the per-metric summary served by ``/runs``.
+
+    Called once when a dataset is loaded so that reads never rescan rows.
+
+    Args:
+        dataset (EvaluationDataset): Columnar dataset to summarize
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Score, pass/fail counts, spread and a
+        score histogram for each metric
+    """
+    summary = {}
+    for key, stats in aggregate_dataset(dataset).items():
+        scores = dataset.metrics[key].scores
+        scores = scores[~np.isnan(scores)]
+        if len(scores) > 0:
+            counts, edges = np.histogram(scores, bins=HISTOGRAM_BINS)
+        else:
+            counts, edges = np.zeros(0, dtype=int), np.zeros(0)
+        summary[key] = {
+            "score": round(stats["mean"], 1),
+            "passed": stats["passed"],
+            "failed": stats["total"] - stats["passed"],
+            "total": stats["total"],
+            "min": stats["min"],
+            "max": stats["max"],
+            "stddev": stats["stddev"],
+            "histogram": {"counts": counts.tolist(), "edges": edges.tolist()},
+        }
+    return summary
+
+
+class RunningStats:
+    """
+    Mergeable running statistics of one metric.
+
+    Keeps counts, mean and the sum of squared deviations (Welford), so a
+    batch of new rows is folded in without revisiting older ones, and stats
+    of separate partitions combine with :meth:`merge` (Chan et al.).
+    """
+
+    __slots__ = ("total", "passed", "count", "mean", "m2", "min", "max")
+
+    def __init__(self, total: int = 0, passed: int = 0, count: int = 0, mean: float = 0.0,
+                 m2: float = 0.0, min: float = np.inf, max: float = -np.inf):
+        self.total = total
+        self.passed = passed
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Fold ``other`` into these stats in place and return them."""
+        if other.count:
+            count = self.count + other.count
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self.m2 += other.m2 + delta * delta * self.count * other.count / count
+            self.count = count
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.total += other.total
+        self.passed += other.passed
+        return self
+
+    @property
+    def stddev(self) -> float:
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else 0.0
+
+    def to_dict(self) -> Dict[str, float]:
+        """Stats in the same shape as one metric of :func:`aggregate`."""
+        return {
+            "mean": float(self.mean) if self.count else 0.0,
+            "passed": int(self.passed),
+            "total": int(self.total),
+            "scored": int(self.count),
+            "min": float(self.min) if self.count else 0.0,
+            "max": float(self.max) if self.count else 0.0,
+            "stddev": self.stddev,
+        }
+
+
+class MetricAccumulator:
+    """Running stats of several metrics, updated one batch of rows at a time."""
+
+    def __init__(self):
+        self.stats: Dict[str, RunningStats] = {}
+
+    def update(self, keys: Sequence[str], scores: np.ndarray, passed: np.ndarray,
+               present: np.ndarray) -> "MetricAccumulator":
+        """
+        Fold a batch of rows in; arrays are shaped as for :func:`aggregate`.
+
+        Cost is proportional to the batch, not to the rows seen so far.
+        """
+        counts, means, m2s, mins, maxs = column_moments(np.asarray(scores, dtype=np.float64))
+        passes = np.asarray(passed).sum(axis=0)
+        totals = np.asarray(present).sum(axis=0)
+        for i, key in enumerate(keys):
+            batch = RunningStats(int(totals[i]), int(passes[i]), int(counts[i]),
+                                 float(means[i]), float(m2s[i]), float(mins[i]), float(maxs[i]))
+            self.stats.setdefault(key, RunningStats()).merge(batch)
+        return self
+
+    def update_dataset(self, dataset) -> "MetricAccumulator":
+        """Fold in every row of a columnar dataset, e.g. a newly appended run."""
+        keys: List[str] = list(dataset.metrics)
+        columns = [dataset.metrics[key] for key in keys]
+        return self.update(
+            keys,
+            np.column_stack([c.scores for c in columns]),
+            np.column_stack([c.passed for c in columns]),
+            np.column_stack([c.present for c in columns]),
+        )
+
+    def merge(self, other: "MetricAccumulator") -> "MetricAccumulator":
+        """Combine the stats of another partition into this one."""
+        for key, stats in other.stats.items():
+            self.stats.setdefault(key, RunningStats()).merge(stats)
+        return self
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        """Stats per metric, in the same shape as :func:`aggregate`."""
+        return {key: stats.to_dict() for key, stats in self.stats.items()}
@@ -0,0 +1,146 @@
+"""
+Process-wide cache of parsed datasets.
+"""
+
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+# Memory budget for cached datasets, configurable per deployment
+DATASET_CACHE_BYTES = int(os.environ.get("DATASET_CACHE_MB", "512")) * 1024 * 1024
+
+# Memory budget for serialized response bodies
+RESPONSE_CACHE_BYTES = int(os.environ.get("RESPONSE_CACHE_MB", "64")) * 1024 * 1024
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the number of bytes held by a cached value.
+
+    Args:
+        value (Any): DataFrame, EvaluationDataset, list of row dicts, ...
+
+    Returns:
+        int: Approximate size in bytes
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if hasattr(value, "memory_usage"):
+        return int(value.memory_usage())
+    if isinstance(value, (list, tuple)):
+        total = sys.getsizeof(value)
+        for item in value:
+            total += sys.getsizeof(item)
+            if isinstance(item, dict):
+                total += sum(sys.getsizeof(v) for v in item.values())
+        return total
+    return sys.getsizeof(value)
+
+
+class DatasetCache:
+    """LRU cache of parsed datasets keyed by (kind, path, mtime, size).
+
+    A file that is rewritten in place gets a new mtime/size and therefore a
+    new key, so stale entries are never served; they simply age out.
+    """
+
+    def __init__(self, max_bytes: int = DATASET_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(path: str, kind: str = "dataset") -> Tuple[str, str, int, int]:
+        stat = os.stat(path)
+        return (kind, os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+    def get(self, path: str, loader: Callable[[str], Any], kind: str = "dataset",
+            size_of: Optional[Callable[[Any], int]] = None) -> Any:
+        """
+        Return the parsed form of ``path``, loading it on a miss.
+
+        Args:
+            path (str): File the value was parsed from
+            loader (Callable[[str], Any]): Parses ``path`` on a cache miss
+            kind (str): Distinguishes different parsed forms of the same file
+            size_of (Optional[Callable[[Any], int]]): Size estimator override
+
+        Returns:
+            Any: Cached or freshly loaded value
+
+        Raises:
+            FileNotFoundError: If ``path`` does not exist
+        """
+        key = self.key_for(path, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Parse outside the lock so other datasets stay readable meanwhile
+        value = loader(path)
+        self.put(key, value, (size_of or estimate_size)(value))
+        return value
+
+    def lookup(self, key: Hashable) -> Any:
+        """Return a value stored under an explicit key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def contains(self, key: Hashable) -> bool:
+        """Whether ``key`` is resident, without counting a hit or miss."""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            # Always keep the newest entry, even if it alone exceeds the budget
+            while self.current_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def put_path(self, path: str, value: Any, kind: str = "dataset") -> None:
+        """Store a value parsed elsewhere (e.g. in a worker process) for ``path``."""
+        self.put(self.key_for(path, kind), value, estimate_size(value))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Shared by every server in the process
+DATASET_CACHE = DatasetCache()
+
+# Serialized JSON bodies keyed by dataset version and request parameters
+RESPONSE_CACHE = DatasetCache(RESPONSE_CACHE_BYTES)
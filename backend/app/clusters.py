@@ -0,0 +1,232 @@
+"""
+Near-duplicate clustering of judge failure reasons.
+
+Reasons are compared by MinHash signatures of their word shingles and
+grouped with banded locality-sensitive hashing, so similar wordings of the
+same failure fall into one cluster without comparing every pair. Everything
+runs locally on NumPy arrays.
+"""
+
+import zlib
+from itertools import chain
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .search import tokenize
+
+# Words per shingle; shorter reasons use their whole token sequence
+SHINGLE_SIZE = 3
+
+# MinHash permutations, split into LSH bands of BAND_ROWS rows each
+NUM_PERMUTATIONS = 64
+BAND_ROWS = 4
+
+# Estimated Jaccard similarity above which two LSH candidates are merged
+SIMILARITY_THRESHOLD = 0.5
+
+# Example wordings returned per cluster besides the representative
+CLUSTER_EXAMPLES = 3
+
+# Bump when hashing or the result layout changes so saved clusters are recomputed
+CLUSTERS_FORMAT = 2
+
+# Shingles permuted at once when signing many texts
+SHINGLE_BATCH_SIZE = 1 << 16
+
+# Multiply-shift hashing ((a * x + b) mod 2^64) >> 32 with odd a; the
+# wrap-around of uint64 arithmetic is the modulus
+_rng = np.random.default_rng(20251224)
+_A = _rng.integers(0, 1 << 64, NUM_PERMUTATIONS, dtype=np.uint64, endpoint=False) | np.uint64(1)
+_B = _rng.integers(0, 1 << 64, NUM_PERMUTATIONS, dtype=np.uint64, endpoint=False)
+_SHIFT = np.uint64(32)
+
+# Multiplier combining the word hashes of a shingle
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def shingle_hashes(texts: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashes of the word shingles of every text, concatenated.
+
+    Each distinct word is hashed once; shingles combine the hashes of their
+    words. A text of at most ``SHINGLE_SIZE`` words is one shingle of all of
+    them, so every text, even an empty one, has at least one shingle.
+
+    Args:
+        texts (Sequence[Any]): Texts to shingle
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Shingle hashes, and the offset of
+            each text's first shingle
+    """
+    tokens = [tokenize(text) for text in texts]
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+    codes, words = pd.factorize(pd.Series(list(chain.from_iterable(tokens)), dtype=object))
+    word_hashes = np.fromiter((zlib.crc32(word.encode()) for word in words),
+                              dtype=np.uint64, count=len(words))[codes]
+
+    widths = np.minimum(lengths, SHINGLE_SIZE)
+    counts = np.maximum(lengths - SHINGLE_SIZE + 1, 1)
+    offsets = np.cumsum(counts) - counts
+    owner = np.repeat(np.arange(len(texts)), counts)
+    # First word of each shingle
+    positions = (np.cumsum(lengths) - lengths)[owner] + np.arange(int(counts.sum())) - offsets[owner]
+    shingle_widths = widths[owner]
+
+    hashes = np.zeros(len(owner), dtype=np.uint64)
+    for k in range(SHINGLE_SIZE):
+        take = k < shingle_widths
+        hashes[take] = hashes[take] * _MIX + word_hashes[positions[take] + k]
+    return hashes, offsets
+
+
+def minhash_signatures(texts: Sequence[Any]) -> np.ndarray:
+    """
+    MinHash signatures of many texts, permuting their shingles in batches.
+
+    Args:
+        texts (Sequence[Any]): Texts to sign
+
+    Returns:
+        np.ndarray: One signature row per text, shape ``(len(texts), NUM_PERMUTATIONS)``
+    """
+    hashes, offsets = shingle_hashes(texts)
+    signatures = np.empty((len(texts), NUM_PERMUTATIONS), dtype=np.uint32)
+    # Batches start at the text holding every SHINGLE_BATCH_SIZE-th shingle
+    starts = np.unique(np.searchsorted(offsets, np.arange(0, len(hashes), SHINGLE_BATCH_SIZE), side="right") - 1)
+    bounds = np.append(starts, len(texts)).tolist()
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        begin = offsets[first]
+        end = offsets[last] if last < len(texts) else len(hashes)
+        permuted = (_A[:, None] * hashes[None, begin:end] + _B[:, None]) >> _SHIFT
+        signatures[first:last] = np.minimum.reduceat(permuted, offsets[first:last] - begin, axis=1).T
+    return signatures
+
+
+class _DisjointSet:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+def cluster_signatures(signatures: np.ndarray) -> List[int]:
+    """
+    Connected components of every LSH candidate pair that passes the threshold.
+
+    Each band bucket keeps its members grouped by component. A new member
+    is compared at once with every group it is not yet connected to and
+    joins each group holding a member that passes; pairs within one
+    component cannot change the components, so they are skipped. The
+    result equals comparing every pair that shares a bucket, whatever the
+    input order.
+
+    Args:
+        signatures (np.ndarray): MinHash signatures, one row per text
+
+    Returns:
+        List[int]: Component of each row, named by its smallest row
+    """
+    min_agreement = int(np.ceil(SIMILARITY_THRESHOLD * NUM_PERMUTATIONS))
+    groups = _DisjointSet(len(signatures))
+    for band in range(0, NUM_PERMUTATIONS, BAND_ROWS):
+        keys = np.ascontiguousarray(signatures[:, band:band + BAND_ROWS]).view(
+            np.dtype((np.void, BAND_ROWS * signatures.itemsize))).ravel()
+        _, bucket, sizes = np.unique(keys, return_inverse=True, return_counts=True)
+        # Rows alone in their bucket have no candidates in this band
+        shared = np.flatnonzero(sizes[bucket] > 1)
+        buckets: Dict[int, List[List[int]]] = {}
+        for index, key in zip(shared.tolist(), bucket[shared].tolist()):
+            entries = buckets.setdefault(key, [])
+            root = groups.find(index)
+            joined, others = [], []
+            for entry in entries:
+                (joined if groups.find(entry[0]) == root else others).append(entry)
+            if others:
+                members = list(chain.from_iterable(others))
+                agreement = (signatures[members] == signatures[index]).sum(axis=1)
+                starts = np.cumsum([0] + [len(entry) for entry in others[:-1]])
+                passed = np.maximum.reduceat(agreement, starts) >= min_agreement
+                joined += [entry for entry, hit in zip(others, passed.tolist()) if hit]
+            if not joined:
+                entries.append([index])
+                continue
+            for entry in joined[1:]:
+                joined[0].extend(entry)
+                entries.remove(entry)
+            for entry in joined:
+                groups.union(entry[0], index)
+            joined[0].append(index)
+    return [groups.find(index) for index in range(len(signatures))]
+
+
+def cluster_reasons(reasons: pd.Categorical, rows: np.ndarray,
+                    limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Group the reasons of ``rows`` into clusters of near-duplicate wordings.
+
+    Each distinct reason is hashed once however many rows share it.
+
+    Args:
+        reasons (pd.Categorical): Reason column of one metric
+        rows (np.ndarray): Rows to cluster, e.g. the metric's failures
+        limit (Optional[int]): Largest clusters to return; all by default
+
+    Returns:
+        Dict[str, Any]: Row and cluster counts and the clusters, largest
+            first, each with its size, share of rows, most common reason and
+            a few other wordings
+    """
+    codes = np.asarray(reasons.codes)[rows]
+    codes = codes[codes >= 0]
+    reason_ids, counts = np.unique(codes, return_counts=True)
+    texts: List[str] = [str(reasons.categories[i]) for i in reason_ids]
+
+    signatures = minhash_signatures(texts)
+
+    members: Dict[int, List[int]] = {}
+    for index, label in enumerate(cluster_signatures(signatures)):
+        members.setdefault(label, []).append(index)
+
+    total = int(counts.sum())
+    clusters = []
+    for indexes in members.values():
+        # Most frequent wording first, shorter wordings breaking ties
+        indexes.sort(key=lambda i: (-counts[i], len(texts[i])))
+        size = int(counts[indexes].sum())
+        clusters.append({
+            "size": size,
+            "share": size / total if total else 0.0,
+            "representative": texts[indexes[0]],
+            "distinct_reasons": len(indexes),
+            "examples": [texts[i] for i in indexes[1:1 + CLUSTER_EXAMPLES]],
+        })
+    clusters.sort(key=lambda c: (-c["size"], c["representative"]))
+
+    return {
+        "rows": total,
+        "cluster_count": len(clusters),
+        "clusters": clusters[:limit] if limit is not None else clusters,
+    }
+
+
+def cluster_failures(dataset, metric: str, rows: Optional[Sequence[int]] = None) -> Dict[str, Any]:
+    """Cluster the reasons of a metric's failed rows, optionally among ``rows``."""
+    columns = dataset.metrics[metric]
+    failed = columns.present & ~columns.passed
+    if rows is not None:
+        selected = np.zeros(len(failed), dtype=bool)
+        selected[np.asarray(rows, dtype=np.int64)] = True
+        failed &= selected
+    return cluster_reasons(columns.reasons, np.flatnonzero(failed))
@@ -0,0 +1,96 @@
+"""
+Conversation JSON helpers shared by every server.
+
+Exports store each conversation as a JSON string in ``inputs.query``. The
+user message is pulled out once per row at ingest, so drilldown requests
+never decode conversation JSON.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+# orjson imports (optional - falls back to the standard library)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Characters of the raw query shown when no user message can be found
+FALLBACK_CHARS = 200
+
+
+def loads(value: Any) -> Any:
+    """Decode JSON with orjson when installed.
+
+    Raises:
+        ValueError: If ``value`` is not valid JSON; ``json.JSONDecodeError``
+            and ``orjson.JSONDecodeError`` both subclass it
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(value)
+    return json.loads(value)
+
+
+def _fallback(query_str: str) -> str:
+    if len(query_str) > FALLBACK_CHARS:
+        return query_str[:FALLBACK_CHARS] + "..."
+    return query_str
+
+
+def extract_user_message(query_str: Any) -> str:
+    """
+    Extract the user message from a conversation JSON string.
+
+    Args:
+        query_str (Any): Raw ``inputs.query`` cell
+
+    Returns:
+        str: Text of the first user turn, or the start of the raw string if
+            it is not a conversation
+    """
+    if not isinstance(query_str, str) or not query_str:
+        return ""
+
+    try:
+        query_obj = loads(query_str)
+    except (ValueError, TypeError):
+        return _fallback(query_str)
+
+    # Look for user role content
+    if isinstance(query_obj, list):
+        for item in query_obj:
+            if isinstance(item, dict) and item.get('role') == 'user':
+                content = item.get('content', '')
+                if isinstance(content, list):
+                    # Extract text from content array
+                    for content_item in content:
+                        if isinstance(content_item, dict) and content_item.get('type') == 'text':
+                            return content_item.get('text', '')
+                elif isinstance(content, str):
+                    return content
+
+    return _fallback(query_str)
+
+
+def extract_user_messages(queries: Iterable[Any]) -> np.ndarray:
+    """
+    Extract the user message of every row, decoding each distinct query once.
+
+    Args:
+        queries (Iterable[Any]): Raw ``inputs.query`` cells
+
+    Returns:
+        np.ndarray: Object array of user messages, one per row
+    """
+    memo: Dict[Any, str] = {}
+    messages: List[str] = []
+    for query in queries:
+        key = query if isinstance(query, str) else None
+        message = memo.get(key)
+        if message is None:
+            message = memo[key] = extract_user_message(query)
+        messages.append(message)
+    return np.array(messages, dtype=object)
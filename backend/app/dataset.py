@@ -0,0 +1,361 @@
+"""
+Columnar in-memory storage for evaluation datasets.
+"""
+
+import sys
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .aggregation import pass_mask, summarize
+from .clusters import cluster_failures
+from .conversation import extract_user_messages, loads
+from .search import SearchIndex
+
+# Dashboard metric keys mapped to the evaluator prefix used in the CSV columns
+METRICS = {
+    "intentResolution": "intent_resolution",
+    "coherence": "coherence",
+    "relevance": "relevance",
+    "groundedness": "groundedness",
+    "toolCallAccuracy": "tool_call_accuracy",
+    "taskAdherence": "task_adherence",
+    "fluency": "fluency",
+}
+
+# Free-text / JSON columns that are kept as raw strings and decoded on demand
+TEXT_COLUMNS = {
+    "query": "inputs.query",
+    "response": "inputs.response",
+    "tool_definitions": "inputs.tool_definitions",
+    "tools_used": "inputs.tools_used",
+}
+
+
+def metric_column(prefix: str, field: str) -> str:
+    """Return the CSV column name for an evaluator field, e.g. ``coherence.coherence.result``."""
+    return f"{prefix}.{prefix}.{field}"
+
+
+# Every raw column EvaluationDataset reads; anything else in an export is ignored.
+# The query is only read to extract the user message; the tool columns are
+# never served, so they are not kept.
+DATASET_COLUMNS = [
+    "inputs.conversation_id",
+    TEXT_COLUMNS["query"],
+    TEXT_COLUMNS["response"],
+    *(metric_column(prefix, field) for prefix in METRICS.values() for field in ("result", "score", "reason")),
+]
+
+
+def resolve_metric(metric: str) -> Optional[str]:
+    """Map a camelCase dashboard metric or a snake_case evaluator prefix to the dashboard key."""
+    if metric in METRICS:
+        return metric
+    for key, prefix in METRICS.items():
+        if prefix == metric:
+            return key
+    return None
+
+
+def _string_nbytes(values) -> int:
+    """Approximate memory held by a sequence of Python strings."""
+    return sum(sys.getsizeof(v) for v in values if isinstance(v, str))
+
+
+class LazyJSONColumn:
+    """Raw JSON strings that are only decoded when a cell is accessed."""
+
+    def __init__(self, values: np.ndarray):
+        self._raw = values
+        self._decoded: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._raw)
+
+    def raw(self, index: int) -> str:
+        """Return the undecoded string stored at ``index``."""
+        value = self._raw[index]
+        return value if isinstance(value, str) else ""
+
+    def __getitem__(self, index: int) -> Any:
+        if index not in self._decoded:
+            value = self.raw(index)
+            try:
+                self._decoded[index] = loads(value) if value else ""
+            except (ValueError, TypeError):
+                self._decoded[index] = value
+        return self._decoded[index]
+
+    def memory_usage(self) -> int:
+        if not isinstance(self._raw, np.ndarray):
+            return int(self._raw.nbytes)
+        return self._raw.nbytes + _string_nbytes(self._raw)
+
+
+class MetricColumns:
+    """Result, score and reason arrays for a single evaluator."""
+
+    def __init__(self, results: pd.Categorical, scores: np.ndarray, reasons: pd.Categorical):
+        self.results = results
+        self.scores = scores
+        self.reasons = reasons
+
+        self.passed = pass_mask(results)
+        self.present = (results.codes >= 0) | ~np.isnan(scores)
+
+    def reason(self, index: int) -> Optional[str]:
+        code = self.reasons.codes[index]
+        return None if code < 0 else self.reasons.categories[code]
+
+    def result(self, index: int) -> str:
+        code = self.results.codes[index]
+        return "" if code < 0 else str(self.results.categories[code])
+
+    def memory_usage(self) -> int:
+        return (
+            self.results.codes.nbytes + _string_nbytes(self.results.categories)
+            + self.scores.nbytes
+            + self.reasons.codes.nbytes + _string_nbytes(self.reasons.categories)
+            + self.passed.nbytes + self.present.nbytes
+        )
+
+
+class _CategoricalBuilder:
+    """Accumulates categorical codes chunk by chunk against one growing category list."""
+
+    def __init__(self):
+        self._categories: Dict[Any, int] = {}
+        self._codes = []
+
+    def add(self, values: pd.Series) -> None:
+        codes, uniques = pd.factorize(values)
+        # The trailing -1 keeps missing values missing
+        remap = np.array([self._categories.setdefault(value, len(self._categories)) for value in uniques] + [-1],
+                         dtype=np.int32)
+        self._codes.append(remap[codes])
+
+    def build(self) -> pd.Categorical:
+        codes = np.concatenate(self._codes) if self._codes else np.empty(0, dtype=np.int32)
+        return pd.Categorical.from_codes(codes, categories=list(self._categories))
+
+
+class DatasetBuilder:
+    """Builds an :class:`EvaluationDataset` from an export one chunk of rows at a time.
+
+    Each chunk is folded into categorical codes, score arrays, extracted user
+    messages and the raw responses as it arrives, so the caller can drop the
+    chunk right away. The query and tool JSON strings are never retained.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self._conversation_ids = []
+        self._responses = []
+        self._prompts = []
+        self._results = {key: _CategoricalBuilder() for key in METRICS}
+        self._reasons = {key: _CategoricalBuilder() for key in METRICS}
+        self._scores = {key: [] for key in METRICS}
+
+    def add(self, df: pd.DataFrame, prompts: Optional[Sequence[str]] = None) -> None:
+        """
+        Fold one chunk of a parsed export into the columns.
+
+        Args:
+            df (pd.DataFrame): Consecutive rows of the export
+            prompts (Optional[Sequence[str]]): User messages already extracted
+                from the chunk's ``inputs.query``, one per row
+        """
+        missing = pd.Series([None] * len(df), dtype=object)
+
+        def column(name):
+            return df[name] if name in df.columns else missing
+
+        self._conversation_ids.append(column("inputs.conversation_id").to_numpy(dtype=object))
+        self._responses.append(column(TEXT_COLUMNS["response"]).to_numpy(dtype=object))
+        # Decode conversation JSON once here rather than per drilldown request
+        if prompts is None:
+            prompts = extract_user_messages(column(TEXT_COLUMNS["query"]))
+        self._prompts.append(np.asarray(prompts, dtype=object))
+
+        for key, prefix in METRICS.items():
+            self._results[key].add(column(metric_column(prefix, "result")))
+            self._reasons[key].add(column(metric_column(prefix, "reason")))
+            scores = pd.to_numeric(column(metric_column(prefix, "score")), errors="coerce")
+            self._scores[key].append(scores.to_numpy(dtype=np.float64))
+        self.rows += len(df)
+
+    def build(self, filename: str = "", version: Optional[str] = None) -> 'EvaluationDataset':
+        """Assemble the dataset from every chunk added so far."""
+        def concat(parts, dtype):
+            return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+        metrics = {
+            key: MetricColumns(
+                results=self._results[key].build(),
+                scores=concat(self._scores[key], np.float64),
+                reasons=self._reasons[key].build(),
+            )
+            for key in METRICS
+        }
+        # Only the response is served; the other JSON columns are left empty
+        empty = np.full(self.rows, None, dtype=object)
+        text = {key: LazyJSONColumn(empty) for key in TEXT_COLUMNS}
+        text["response"] = LazyJSONColumn(concat(self._responses, object))
+        return EvaluationDataset(concat(self._conversation_ids, object), text, metrics, filename, version,
+                                 concat(self._prompts, object))
+
+
+class EvaluationDataset:
+    """Column-oriented view of an evaluation export.
+
+    Each evaluator is stored as categorical results, a float score array
+    (NaN when missing) and deduplicated reasons. The user message of each
+    conversation is extracted once at ingest; the JSON blobs themselves are
+    held as raw strings and only decoded on access.
+    """
+
+    def __init__(self, conversation_ids: np.ndarray, text: Dict[str, LazyJSONColumn],
+                 metrics: Dict[str, MetricColumns], filename: str = "",
+                 version: Optional[str] = None, prompts: Optional[Sequence[str]] = None):
+        self.conversation_ids = conversation_ids
+        self.text = text
+        self.metrics = metrics
+        self.prompts = prompts
+        self.filename = filename
+        self.version = version or uuid.uuid4().hex
+        self.loaded_at = datetime.now().isoformat()
+        self._conversation_index: Optional[Tuple[pd.Index, np.ndarray]] = None
+        self._search_index: Optional[SearchIndex] = None
+        self._failure_clusters: Dict[str, Dict[str, Any]] = {}
+
+        # Materialized once at ingest; the data never changes after this point
+        self.summary = summarize(self)
+
+    @classmethod
+    def empty(cls, filename: str = "") -> 'EvaluationDataset':
+        return cls.from_dataframe(pd.DataFrame(), filename, version="empty")
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, filename: str = "",
+                       version: Optional[str] = None,
+                       prompts: Optional[Sequence[str]] = None) -> 'EvaluationDataset':
+        """
+        Build a dataset from a parsed evaluation export.
+
+        Args:
+            df (pd.DataFrame): Raw export as read by pandas
+            filename (str): Original name of the export
+            version (Optional[str]): Identifier of the dataset contents
+            prompts (Optional[Sequence[str]]): User messages already extracted
+                from ``inputs.query``, one per row
+
+        Returns:
+            EvaluationDataset: Columnar dataset
+        """
+        builder = DatasetBuilder()
+        builder.add(df, prompts)
+        return builder.build(filename, version)
+
+    def __len__(self) -> int:
+        return len(self.conversation_ids)
+
+    def memory_usage(self) -> int:
+        """Approximate number of bytes held by the dataset."""
+        total = self.conversation_ids.nbytes + _string_nbytes(self.conversation_ids)
+        total += sum(column.memory_usage() for column in self.text.values())
+        total += sum(columns.memory_usage() for columns in self.metrics.values())
+        if isinstance(self.prompts, np.ndarray):
+            total += self.prompts.nbytes + _string_nbytes(self.prompts)
+        elif self.prompts is not None:
+            total += int(self.prompts.nbytes)
+        if self._search_index is not None:
+            total += self._search_index.memory_usage()
+        return total
+
+    def metric_detail(self, index: int, metric: str, prompt: Optional[str] = None,
+                      fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Build the drilldown record for one row of one metric, optionally projected to ``fields``."""
+        columns = self.metrics[metric]
+        score = columns.scores[index]
+        reason = columns.reason(index)
+        conversation_id = self.conversation_ids[index]
+        if prompt is None and self.prompts is not None:
+            prompt = self.prompts[index]
+        detail = {
+            "promptId": f"prompt_{index + 1}",
+            "conversationId": conversation_id if isinstance(conversation_id, str) else "",
+            "prompt": prompt,
+            "agentResponse": self.text["response"].raw(index),
+            "passed": bool(columns.passed[index]),
+            "confidence": None if np.isnan(score) else float(score) / 100.0,
+            "reason": reason if reason is not None else "No reason provided",
+        }
+        if fields is None:
+            return detail
+        return {field: detail[field] for field in fields}
+
+    def search_index(self) -> SearchIndex:
+        """Full-text index over prompts, responses and reasons, built on first use."""
+        if self._search_index is None:
+            self._search_index = SearchIndex(self)
+        return self._search_index
+
+    @property
+    def has_search_index(self) -> bool:
+        return self._search_index is not None
+
+    def attach_search_index(self, index: SearchIndex) -> None:
+        """Use an index loaded from disk instead of building one."""
+        self._search_index = index
+
+    def failure_clusters(self, metric: str) -> Dict[str, Any]:
+        """Clusters of near-duplicate failure reasons of ``metric``, computed once."""
+        clusters = self._failure_clusters.get(metric)
+        if clusters is None:
+            clusters = self._failure_clusters[metric] = cluster_failures(self, metric)
+        return clusters
+
+    def attach_failure_clusters(self, clusters: Dict[str, Dict[str, Any]]) -> None:
+        """Use failure clusters loaded from disk, by metric, instead of computing them."""
+        self._failure_clusters.update(clusters)
+
+    def conversation_index(self) -> Tuple[pd.Index, np.ndarray]:
+        """
+        Unique conversation ids and the first row holding each.
+
+        Built once per dataset; the index's hash table is reused by every
+        later lookup, e.g. each diff against another run.
+
+        Returns:
+            Tuple[pd.Index, np.ndarray]: Ids and their row positions
+        """
+        if self._conversation_index is None:
+            ids = pd.Series(self.conversation_ids, dtype=object)
+            rows = np.flatnonzero((ids.notna() & ~ids.duplicated()).to_numpy())
+            self._conversation_index = (pd.Index(self.conversation_ids[rows], dtype=object), rows)
+        return self._conversation_index
+
+    def join(self, other: 'EvaluationDataset') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Hash-join two datasets on conversation id.
+
+        Args:
+            other (EvaluationDataset): Dataset to match rows against
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Matching row positions in this
+                dataset and in ``other``
+        """
+        ids, rows = self.conversation_index()
+        other_ids, other_rows = other.conversation_index()
+        positions = other_ids.get_indexer(ids)
+        matched = positions >= 0
+        return rows[matched], other_rows[positions[matched]]
+
+    def metric_rows(self, metric: str) -> np.ndarray:
+        """Row indexes that carry a result or score for ``metric``."""
+        return np.flatnonzero(self.metrics[metric].present)
@@ -0,0 +1,87 @@
+"""
+Row-level comparison of two evaluation runs.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Flipped conversations listed per metric and direction unless a limit is given
+DEFAULT_FLIP_LIMIT = 100
+
+
+def _flip_records(base, head, metric: str, base_rows: np.ndarray, head_rows: np.ndarray,
+                  limit: int) -> List[Dict[str, Any]]:
+    base_columns = base.metrics[metric]
+    head_columns = head.metrics[metric]
+    records = []
+    for base_row, head_row in zip(base_rows[:limit].tolist(), head_rows[:limit].tolist()):
+        prompt = head.prompts[head_row] if head.prompts is not None else None
+        records.append({
+            "conversationId": base.conversation_ids[base_row],
+            "prompt": prompt,
+            "baseResult": base_columns.result(base_row),
+            "headResult": head_columns.result(head_row),
+            "baseReason": base_columns.reason(base_row),
+            "headReason": head_columns.reason(head_row),
+        })
+    return records
+
+
+def _rate(stats: Dict[str, Any]) -> float:
+    return stats["passed"] / stats["total"] if stats["total"] else 0.0
+
+
+def diff_datasets(base, head, metrics: Optional[Iterable[str]] = None,
+                  limit: int = DEFAULT_FLIP_LIMIT) -> Dict[str, Any]:
+    """
+    Compare two runs conversation by conversation.
+
+    Rows are matched with a hash join on conversation id, so the cost is
+    linear in the number of rows. Only the listed flips look up reasons.
+
+    Args:
+        base (EvaluationDataset): Earlier run
+        head (EvaluationDataset): Later run
+        metrics (Optional[Iterable[str]]): Metric keys to compare, all by default
+        limit (int): Flips listed per metric and direction
+
+    Returns:
+        Dict[str, Any]: Match counts, and per metric the pass rate deltas,
+            flip counts and the first ``limit`` regressions and fixes
+    """
+    base_rows, head_rows = base.join(head)
+    keys = list(metrics) if metrics is not None else [key for key in base.metrics if key in head.metrics]
+
+    result = {
+        "matched": int(len(base_rows)),
+        "only_in_base": int(len(base.conversation_index()[1]) - len(base_rows)),
+        "only_in_head": int(len(head.conversation_index()[1]) - len(head_rows)),
+        "metrics": {},
+    }
+    for key in keys:
+        base_columns = base.metrics[key]
+        head_columns = head.metrics[key]
+        # Only conversations that carry the metric in both runs can flip
+        both = base_columns.present[base_rows] & head_columns.present[head_rows]
+        base_passed = base_columns.passed[base_rows] & both
+        head_passed = head_columns.passed[head_rows] & both
+        regressed = base_passed & ~head_passed
+        fixed = head_passed & ~base_passed
+
+        base_summary = base.summary[key]
+        head_summary = head.summary[key]
+        result["metrics"][key] = {
+            "base": {"passed": base_summary["passed"], "total": base_summary["total"],
+                     "pass_rate": _rate(base_summary), "score": base_summary["score"]},
+            "head": {"passed": head_summary["passed"], "total": head_summary["total"],
+                     "pass_rate": _rate(head_summary), "score": head_summary["score"]},
+            "delta": {"pass_rate": _rate(head_summary) - _rate(base_summary),
+                      "score": head_summary["score"] - base_summary["score"]},
+            "compared": int(both.sum()),
+            "regressions": int(regressed.sum()),
+            "fixes": int(fixed.sum()),
+            "pass_to_fail": _flip_records(base, head, key, base_rows[regressed], head_rows[regressed], limit),
+            "fail_to_pass": _flip_records(base, head, key, base_rows[fixed], head_rows[fixed], limit),
+        }
+    return result
@@ -0,0 +1,232 @@
+"""
+Conditional GET, response compression and serialized-body caching for the
+dashboard read endpoints.
+
+Each server tells the middleware which dataset version a request reads.
+Strong ETags are derived from that version and the request URL, so an
+``If-None-Match`` revalidation is answered with 304 before the endpoint
+runs at all. Bodies that are sent are compressed with brotli or gzip when
+the client accepts it, and hot endpoints reuse their serialized JSON bytes
+for as long as the dataset version is unchanged.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from typing import Any, Callable, Hashable, List, Optional
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+
+from .cache import RESPONSE_CACHE
+from .telemetry import METRICS
+
+# Brotli imports (optional - responses fall back to gzip without it)
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# orjson imports (optional - falls back to the standard library)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Smaller bodies are sent uncompressed; the framing would outweigh the savings
+COMPRESS_MIN_BYTES = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Clients may cache but must revalidate every time
+CACHE_CONTROL = "no-cache"
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def json_bytes(content: Any) -> bytes:
+    """
+    Serialize a response body, with orjson when installed.
+
+    Both paths emit compact UTF-8 JSON like FastAPI's default response and
+    accept NumPy scalars and arrays.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":"),
+                      default=_default).encode("utf-8")
+
+
+def cached_json_response(key: Hashable, build: Callable[[], Any]) -> Response:
+    """
+    Return a JSON response whose serialized bytes are cached under ``key``.
+
+    ``key`` must include the dataset version and every parameter that shapes
+    the body. ``build`` only runs on a miss; exceptions it raises (e.g. an
+    HTTPException for a bad cursor) propagate and nothing is cached.
+
+    Args:
+        key (Hashable): Cache key of the response body
+        build (Callable[[], Any]): Produces the JSON-serializable body
+
+    Returns:
+        Response: Raw response carrying the serialized bytes
+    """
+    body = RESPONSE_CACHE.lookup(key)
+    if body is None:
+        content = build()
+        start = time.perf_counter()
+        body = json_bytes(content)
+        # Keys start with the endpoint name, e.g. ("azure.runs", version)
+        endpoint = key[0] if isinstance(key, tuple) else str(key)
+        METRICS.observe("response_serialization_seconds", time.perf_counter() - start, endpoint=endpoint)
+        RESPONSE_CACHE.put(key, body, len(body))
+    return Response(content=body, media_type="application/json")
+
+
+def file_version(path: str) -> Optional[str]:
+    """Version of a dataset file from its identity on disk, None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def make_etag(version: str, request: Request) -> str:
+    """Strong ETag of the response to ``request`` for a given dataset version."""
+    key = f"{version}|{request.url.path}|{request.url.query}"
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def _encoded_etag(etag: str, encoding: str) -> str:
+    # Each content coding is a different representation, so it gets its own tag
+    return etag[:-1] + "-" + encoding + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether ``If-None-Match`` names ``etag`` in any content coding."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag or (tag.startswith(etag[:-1] + "-") and tag.endswith('"')):
+            return True
+    return False
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick brotli or gzip from an ``Accept-Encoding`` header."""
+    accepted: List[str] = []
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.append(name.strip())
+    if BROTLI_AVAILABLE and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class ConditionalResponseMiddleware:
+    """
+    ASGI middleware adding ETags, 304 responses and compression to GET requests.
+
+    Args:
+        app: Wrapped ASGI application
+        version_for (Callable[[Request], Optional[str]]): Dataset version a
+            request reads, or None for endpoints that are not versioned. It
+            runs on the threadpool and may load the dataset.
+        minimum_size (int): Smallest body that is compressed
+    """
+
+    def __init__(self, app, version_for: Callable[[Request], Optional[str]],
+                 minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.version_for = version_for
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        try:
+            version = await run_in_threadpool(self.version_for, request)
+        except Exception:
+            # Unknown datasets and the like are reported by the endpoint itself
+            version = None
+        etag = make_etag(version, request) if version else None
+
+        if etag is not None and etag_matches(request.headers.get("if-none-match"), etag):
+            await send({
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag.encode()), (b"cache-control", CACHE_CONTROL.encode())],
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        if etag is None and encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        chunks: List[bytes] = []
+
+        async def send_buffered(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = MutableHeaders(scope=start_message)
+            ok = start_message["status"] == 200
+            tag = etag if ok else None
+            if encoding is not None and len(body) >= self.minimum_size and "content-encoding" not in headers:
+                body = compress(body, encoding)
+                headers["content-encoding"] = encoding
+                headers["content-length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                if tag is not None:
+                    tag = _encoded_etag(tag, encoding)
+            if tag is not None:
+                headers["etag"] = tag
+                headers["cache-control"] = CACHE_CONTROL
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_buffered)
@@ -0,0 +1,124 @@
+"""
+Streaming ingestion of uploaded evaluation exports.
+
+An upload is read exactly once, in fixed-size chunks, and copied to a
+storage sink while its content hash is computed. Stored CSV is parsed in
+row chunks that are folded into the dataset columns and dropped, so peak
+memory is bounded by the chunk size plus the retained columns rather than
+by the size of the file.
+"""
+
+import hashlib
+import io
+import time
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+import pandas as pd
+
+from .dataset import DATASET_COLUMNS, DatasetBuilder
+from .storage import CHUNK_SIZE
+
+
+class UploadStream:
+    """
+    Reads an upload once, copying each chunk to a sink as it is consumed.
+
+    ``io_seconds`` accumulates the time spent reading the upload and writing
+    the sink. ``sha256`` digests the content as it streams, unless the caller
+    passes ``digest=False``.
+    """
+
+    def __init__(self, fileobj: BinaryIO, sink, chunk_size: int = CHUNK_SIZE, digest: bool = True):
+        self.fileobj = fileobj
+        self.sink = sink
+        self.chunk_size = chunk_size
+        self.sha256 = hashlib.sha256() if digest else None
+        self.bytes_read = 0
+        self.io_seconds = 0.0
+
+    def chunks(self) -> Iterator[bytes]:
+        while True:
+            start = time.perf_counter()
+            chunk = self.fileobj.read(self.chunk_size)
+            if not chunk:
+                self.io_seconds += time.perf_counter() - start
+                break
+            if self.sha256 is not None:
+                self.sha256.update(chunk)
+            self.bytes_read += len(chunk)
+            self.sink.write(chunk)
+            self.io_seconds += time.perf_counter() - start
+            yield chunk
+
+    def drain(self) -> None:
+        """Copy the rest of the upload to the sink without parsing it."""
+        for _ in self.chunks():
+            pass
+
+
+class ChunkReader(io.RawIOBase):
+    """Read-only binary file over an iterable of byte chunks, for ``pd.read_csv``."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = memoryview(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class MissingColumnsError(ValueError):
+    """An export holds none of the columns the dashboard reads."""
+
+    def __init__(self, missing: Iterable[str]):
+        self.missing = list(missing)
+        super().__init__(f"Missing dataset columns: {', '.join(self.missing)}")
+
+
+def read_csv_chunks(chunks: Iterable[bytes], columns: Optional[Iterable[str]] = None,
+                    rows_per_chunk: int = 10000) -> DatasetBuilder:
+    """
+    Incrementally parse a CSV byte stream into dataset columns.
+
+    Parsing follows ``pd.read_csv`` defaults, so a stream yields the same
+    values as reading the file from disk. Each pandas chunk is folded into a
+    :class:`DatasetBuilder` and released before the next one is parsed.
+
+    Args:
+        chunks (Iterable[bytes]): Raw CSV bytes in arbitrary chunk sizes
+        columns (Optional[Iterable[str]]): Columns to read, defaults to the
+            columns used by :class:`EvaluationDataset`
+        rows_per_chunk (int): Rows parsed per pandas chunk
+
+    Returns:
+        DatasetBuilder: Columns of every row; ``build()`` makes the dataset
+
+    Raises:
+        MissingColumnsError: If the header holds none of the read columns
+    """
+    wanted = list(columns if columns is not None else DATASET_COLUMNS)
+    selected = set(wanted)
+    builder = DatasetBuilder()
+    stream = io.BufferedReader(ChunkReader(chunks), buffer_size=CHUNK_SIZE)
+    try:
+        reader = pd.read_csv(stream, usecols=lambda name: name in selected, chunksize=rows_per_chunk,
+                             encoding="utf-8-sig", encoding_errors="replace")
+    except pd.errors.EmptyDataError:
+        return builder
+    with reader:
+        for frame in reader:
+            if frame.columns.empty:
+                raise MissingColumnsError(wanted)
+            builder.add(frame)
+    return builder
@@ -5,14 +5,27 @@ Main application entry point for the AI Quality Dashboard backend.
 from fastapi import FastAPI, File, UploadFile, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 import pandas as pd
-import json
 import os
 import tempfile
 import shutil
 from typing import Optional
 
+from .cache import DATASET_CACHE
+from .conversation import extract_user_messages
+from .dataset import EvaluationDataset
+from .http_cache import ConditionalResponseMiddleware, cached_json_response, file_version
+from .ingest import UploadStream
+from .registry import DEFAULT_DATASET_ID, DatasetRegistry, dataset_id_for
+from .telemetry import RequestMetricsMiddleware, capture_stages, ingest_stage, record_stages
+from .telemetry import router as internal_router
+from .pagination import MAX_PAGE_SIZE, apply_preview, page_response, paginate, parse_fields
+from .workers import run_cpu, run_io
+
 app = FastAPI()
 
+# ETags, 304s and compression; added before CORS so 304s carry CORS headers
+app.add_middleware(ConditionalResponseMiddleware, version_for=lambda request: response_version(request))
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -20,12 +33,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and in-flight counts; added last so it also times the middleware above
+app.add_middleware(RequestMetricsMiddleware, routes=app.routes)
+app.include_router(internal_router)
+
 # Default data path - can be overridden by file upload
 DEFAULT_DATA_PATH = os.path.join("app", "data", "5Prompts-DSB_WorkloadRCAAgent_quality_quality_en_20251224-055849.csv")
 
 # Store current active dataset path
 current_dataset_path = DEFAULT_DATA_PATH
 
+# Run summary materialized for the active dataset; rebuilt only when it changes
+current_run_summary = None
+
+# Uploaded datasets by id; parsed frames stay resident in DATASET_CACHE
+DATASETS = DatasetRegistry()
+DATASETS.register(DEFAULT_DATASET_ID, os.path.basename(DEFAULT_DATA_PATH), DEFAULT_DATA_PATH)
+
+def dataset_path(dataset_id=None):
+    """Resolve a dataset id to its file, defaulting to the active dataset."""
+    if dataset_id is None:
+        return current_dataset_path
+    entry = DATASETS.get(dataset_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Dataset not found: {dataset_id}")
+    return entry["path"]
+
+def response_version(request):
+    """Version of the dataset file a read endpoint serves, keying its ETag; None if unversioned."""
+    if request.url.path.startswith("/runs"):
+        return file_version(dataset_path(request.query_params.get("dataset_id")))
+    return None
+
+def build_run_summary(df, user_messages, filename):
+    """Build the /runs summary for a parsed dataset and its extracted user messages."""
+    with ingest_stage("normalize", rows=len(df)):
+        dataset = EvaluationDataset.from_dataframe(df, filename, prompts=user_messages)
+    return {"runId": "run_001", "version": dataset.version, **dataset.summary}
+
+def read_dataframe(file_path):
+    """Parse a dataset file based on its extension, extracting user messages once.
+    
+    Returns ``(df, user_messages)``. The messages are kept beside the frame
+    rather than in ``df.attrs``, which pandas deep-copies into every Series
+    it derives from the frame.
+    """
+    with ingest_stage("parse", nbytes=os.path.getsize(file_path)) as timer:
+        if file_path.endswith('.csv'):
+            df = pd.read_csv(file_path)
+        else:
+            df = pd.read_excel(file_path)  # Excel file (.xlsx, .xls)
+        timer.rows = len(df)
+    with ingest_stage("normalize", rows=len(df)):
+        queries = df["inputs.query"] if "inputs.query" in df.columns else [None] * len(df)
+        user_messages = extract_user_messages(queries)
+    return df, user_messages
+
+def ingest_upload(file_path, filename):
+    """Parse an uploaded file and build its summary; runs in a parser process.
+    
+    Returns ``(summary, rows, columns)``. The frame stays in the worker:
+    pickling it back would copy every JSON column across the process
+    boundary, so drilldowns read the file on first use instead.
+    """
+    df, user_messages = read_dataframe(file_path)
+    return build_run_summary(df, user_messages, filename), len(df), list(df.columns)
+
+def cached_frame(file_path):
+    """Return ``(df, user_messages)`` of a dataset, skipping file I/O when the file is unchanged."""
+    return DATASET_CACHE.get(file_path, read_dataframe, kind="main.frame")
+
+def cached_dataframe(file_path):
+    """Return the parsed dataset, skipping file I/O when the file is unchanged."""
+    return cached_frame(file_path)[0]
+
 def load_dataset(file_path):
     """Load and process dataset for the dashboard."""
     if not os.path.exists(file_path):
@@ -41,23 +122,10 @@ def load_dataset(file_path):
         }
     
     try:
-        # Load the file based on its extension
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        else:  # Excel file (.xlsx, .xls)
-            df = pd.read_excel(file_path)
+        df, user_messages = cached_frame(file_path)
         
         # Process the data and return summary
-        return {
-            "runId": "run_001", 
-            "intentResolution": {"score": 85, "passed": 17, "total": 20},
-            "coherence": {"score": 92, "passed": 18, "total": 20}, 
-            "relevance": {"score": 78, "passed": 15, "total": 19},
-            "groundedness": {"score": 88, "passed": 16, "total": 18},
-            "toolCallAccuracy": {"score": 95, "passed": 19, "total": 20},
-            "taskAdherence": {"score": 82, "passed": 16, "total": 19},
-            "fluency": {"score": 90, "passed": 18, "total": 20}
-        }
+        return build_run_summary(df, user_messages, os.path.basename(file_path))
     except Exception as e:
         print(f"Error loading data: {e}")
         return {
@@ -71,40 +139,51 @@ def load_dataset(file_path):
             "fluency": {"score": 0, "passed": 0, "total": 0}
         }
 
+def save_upload(fileobj, suffix):
+    """Copy an upload to a temporary file, returning its path and content hash."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        stream = UploadStream(fileobj, temp_file)
+        stream.drain()
+        return temp_file.name, stream.sha256.hexdigest()
+
 @app.post("/upload-dataset")
 async def upload_dataset(file: UploadFile = File(...)):
     """Upload a new dataset file (CSV or Excel)"""
-    global current_dataset_path
+    global current_dataset_path, current_run_summary
     
     # Validate file type
     if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="File must be a CSV or Excel file")
     
     try:
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-            # Save uploaded file to temporary location
-            shutil.copyfileobj(file.file, temp_file)
-            temp_file_path = temp_file.name
+        # Save uploaded file to a temporary location off the event loop
+        with ingest_stage("storage_io", nbytes=file.size or 0):
+            temp_file_path, sha256 = await run_io(save_upload, file.file, os.path.splitext(file.filename)[1])
         
-        # Test if the file can be loaded
+        # Test if the file can be loaded; parsing runs in a worker process
         try:
-            if file.filename.endswith('.csv'):
-                df = pd.read_csv(temp_file_path)
-            else:  # Excel file
-                df = pd.read_excel(temp_file_path)
+            # Parsing and the summary share one trip to the parser process;
+            # the stages it timed are recorded here
+            (summary, rows, columns), stages = await run_cpu(
+                capture_stages, ingest_upload, temp_file_path, file.filename)
+            record_stages(stages)
             
             # Basic validation - check if it has expected columns (adjust based on your needs)
             # You can add more specific validation here based on your data structure
             
-            # Update current dataset path
+            # Register the upload, make it active and materialize its summary
+            dataset_id = dataset_id_for(sha256)
+            DATASETS.register(dataset_id, file.filename, temp_file_path, rows=rows)
             current_dataset_path = temp_file_path
+            current_run_summary = summary
+            DATASET_CACHE.put_path(temp_file_path, current_run_summary, kind="main.summary")
             
             return {
                 "message": "Dataset uploaded successfully",
                 "filename": file.filename,
-                "rows": len(df),
-                "columns": list(df.columns)
+                "dataset_id": dataset_id,
+                "rows": rows,
+                "columns": columns
             }
             
         except Exception as e:
@@ -116,26 +195,32 @@ async def upload_dataset(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+@app.get("/datasets")
+def list_datasets():
+    """List datasets that can be selected with dataset_id."""
+    return [
+        {**entry, "resident": os.path.exists(entry["path"])
+         and DATASET_CACHE.contains(DATASET_CACHE.key_for(entry["path"], "main.frame"))}
+        for entry in DATASETS.entries()
+    ]
+
 @app.get("/current-dataset-info")
-def get_current_dataset_info():
-    """Get information about the currently loaded dataset"""
-    global current_dataset_path
+def get_current_dataset_info(dataset_id: Optional[str] = None):
+    """Get information about the currently loaded dataset, or the one named by dataset_id"""
+    file_path = dataset_path(dataset_id)
     
-    if not os.path.exists(current_dataset_path):
+    if not os.path.exists(file_path):
         return {"message": "No dataset currently loaded", "path": None}
     
     try:
-        if current_dataset_path.endswith('.csv'):
-            df = pd.read_csv(current_dataset_path)
-        else:
-            df = pd.read_excel(current_dataset_path)
+        df = cached_dataframe(file_path)
             
         return {
-            "filename": os.path.basename(current_dataset_path),
-            "path": current_dataset_path,
+            "filename": os.path.basename(file_path),
+            "path": file_path,
             "rows": len(df),
             "columns": list(df.columns),
-            "is_default": current_dataset_path == DEFAULT_DATA_PATH
+            "is_default": file_path == DEFAULT_DATA_PATH
         }
     except Exception as e:
         return {"error": f"Could not read dataset: {str(e)}"}
@@ -143,112 +228,132 @@ def get_current_dataset_info():
 @app.post("/reset-to-default-dataset")
 def reset_to_default_dataset():
     """Reset to using the default dataset"""
-    global current_dataset_path
+    global current_dataset_path, current_run_summary
     current_dataset_path = DEFAULT_DATA_PATH
+    current_run_summary = load_dataset(current_dataset_path)
     return {"message": "Reset to default dataset", "path": DEFAULT_DATA_PATH}
 
 @app.get("/runs")
-def get_runs():
-    return [load_dataset(current_dataset_path)]
+def get_runs(dataset_id: Optional[str] = None):
+    global current_run_summary
+    if dataset_id is not None:
+        file_path = dataset_path(dataset_id)
+        if not os.path.exists(file_path):
+            return [load_dataset(file_path)]
+        # Summaries of other datasets stay resident alongside their frames
+        summary = DATASET_CACHE.lookup(DATASET_CACHE.key_for(file_path, "main.summary"))
+        if summary is None:
+            summary = load_dataset(file_path)
+            # Error summaries carry no version; they are served but never cached
+            if "version" not in summary:
+                return [summary]
+            DATASET_CACHE.put_path(file_path, summary, kind="main.summary")
+        return cached_json_response(("main.runs", summary["version"]), lambda: [summary])
+    if current_run_summary is None or "version" not in current_run_summary:
+        summary = load_dataset(current_dataset_path)
+        if "version" not in summary:
+            return [summary]
+        current_run_summary = summary
+    return cached_json_response(("main.runs", current_run_summary["version"]), lambda: [current_run_summary])
 
-def extract_user_message(query_str):
-    """Extract user message from JSON query string"""
-    try:
-        if not query_str:
-            return ""
-        
-        import json
-        # Parse the JSON string
-        query_obj = json.loads(query_str)
-        
-        # Look for user role content
-        if isinstance(query_obj, list):
-            for item in query_obj:
-                if isinstance(item, dict) and item.get('role') == 'user':
-                    content = item.get('content', '')
-                    if isinstance(content, list):
-                        # Extract text from content array
-                        for content_item in content:
-                            if isinstance(content_item, dict) and content_item.get('type') == 'text':
-                                return content_item.get('text', '')
-                    elif isinstance(content, str):
-                        return content
-        
-        # If no user role found, return first 200 chars of original
-        return query_str[:200] + "..." if len(query_str) > 200 else query_str
-        
-    except (json.JSONDecodeError, Exception) as e:
-        # If JSON parsing fails, return first 200 chars
-        return query_str[:200] + "..." if len(query_str) > 200 else query_str
+def cell(df, column, index, default):
+    """Value of one cell, read from its column without materializing the row."""
+    if column not in df.columns:
+        return default
+    return df[column].iat[index]
+
+def row_detail(df, user_messages, index, original_metric, fields, preview_chars):
+    """Build the drilldown record for one dataframe row, projected to ``fields``."""
+    result_key = f"{original_metric}.{original_metric}.result"
+    reason_key = f"{original_metric}.{original_metric}.reason"
+    
+    detail = {}
+    for field in fields:
+        if field == "promptId":
+            detail[field] = f"prompt_{index+1}"
+        elif field == "conversationId":
+            detail[field] = cell(df, "inputs.conversation_id", index, "")
+        elif field == "prompt":
+            detail[field] = user_messages[index]
+        elif field == "agentResponse":
+            detail[field] = cell(df, "inputs.response", index, "")
+        elif field == "passed":
+            detail[field] = str(cell(df, result_key, index, "")).lower() == "pass"
+        elif field == "confidence":
+            detail[field] = 0.8  # Default confidence since not in CSV
+        elif field == "reason":
+            detail[field] = cell(df, reason_key, index, "No reason provided")
+    return apply_preview(detail, preview_chars)
 
 @app.get("/runs/{run_id}/metrics/{metric}")
-def metric_details(run_id: str, metric: str):
-    """Get detailed metric information for a specific run"""
-    global current_dataset_path
+def metric_details(
+    run_id: str,
+    metric: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    preview_chars: Optional[int] = Query(None, ge=0),
+    dataset_id: Optional[str] = None
+):
+    """Get detailed metric information for a specific run.
+    
+    With ``limit`` the response is a page ``{"items", "next_cursor", "total"}``;
+    ``fields`` projects the records and ``preview_chars`` truncates long text.
+    """
+    try:
+        selected_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Load actual CSV data
-    if not os.path.exists(current_dataset_path):
-        return []
+    file_path = dataset_path(dataset_id)
+    if not os.path.exists(file_path):
+        return [] if limit is None else page_response([], None, 0)
     
     try:
-        # Load the file based on its extension
-        if current_dataset_path.endswith('.csv'):
-            df = pd.read_csv(current_dataset_path)
-        else:  # Excel file
-            df = pd.read_excel(current_dataset_path)
-        
-        result = []
-        
-        # Metric mapping for column names
-        metric_map = {
-            "intentResolution": "intent_resolution",
-            "toolCallAccuracy": "tool_call_accuracy", 
-            "taskAdherence": "task_adherence"
-        }
-        
-        original_metric = metric_map.get(metric, metric)
-        
-        # Handle aggregated view for all runs
-        if run_id == "all":
-            # Return data for all rows
-            for i, (_, row) in enumerate(df.iterrows()):
-                result_key = f"{original_metric}.{original_metric}.result"
-                reason_key = f"{original_metric}.{original_metric}.reason"
-                
-                detail = {
-                    "promptId": f"prompt_{i+1}",
-                    "conversationId": row.get("inputs.conversation_id", ""),
-                    "prompt": extract_user_message(row.get("inputs.query", "")),
-                    "agentResponse": row.get("inputs.response", ""),
-                    "passed": str(row.get(result_key, "")).lower() == "pass",
-                    "confidence": 0.8,  # Default confidence since not in CSV
-                    "reason": row.get(reason_key, "No reason provided")
-                }
-                result.append(detail)
-        else:
-            # For individual runs, extract the run number and get that specific row
-            try:
-                # Extract number from runId (e.g., "run_001" -> 0, "run_1" -> 0)
-                run_number = int(run_id.replace('run_', '').replace('_', '')) - 1
-                if 0 <= run_number < len(df):
-                    row = df.iloc[run_number]
-                    result_key = f"{original_metric}.{original_metric}.result"
-                    reason_key = f"{original_metric}.{original_metric}.reason"
-                    
-                    detail = {
-                        "promptId": f"prompt_{run_number+1}",
-                        "conversationId": row.get("inputs.conversation_id", ""),
-                        "prompt": extract_user_message(row.get("inputs.query", "")),
-                        "agentResponse": row.get("inputs.response", ""),
-                        "passed": str(row.get(result_key, "")).lower() == "pass",
-                        "confidence": 0.8,
-                        "reason": row.get(reason_key, "No reason provided")
-                    }
-                    result.append(detail)
-            except (ValueError, IndexError):
-                pass
-        
-        return result
+        # Serialized pages are reused until the dataset file changes
+        key = ("main.metric", file_version(file_path), run_id, metric, limit, cursor, selected_fields, preview_chars)
+        return cached_json_response(key, lambda: metric_details_body(
+            file_path, run_id, metric, limit, cursor, selected_fields, preview_chars))
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error loading metric details: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def metric_details_body(file_path, run_id, metric, limit, cursor, selected_fields, preview_chars):
+    """Build the drilldown list, or one page of it when ``limit`` is set."""
+    df, user_messages = cached_frame(file_path)
+    
+    # Metric mapping for column names
+    metric_map = {
+        "intentResolution": "intent_resolution",
+        "toolCallAccuracy": "tool_call_accuracy", 
+        "taskAdherence": "task_adherence"
+    }
+    
+    original_metric = metric_map.get(metric, metric)
+    
+    # Handle aggregated view for all runs
+    if run_id == "all":
+        rows = range(len(df))
+    else:
+        # For individual runs, extract the run number and get that specific row
+        try:
+            # Extract number from runId (e.g., "run_001" -> 0, "run_1" -> 0)
+            run_number = int(run_id.replace('run_', '').replace('_', '')) - 1
+            rows = [run_number] if 0 <= run_number < len(df) else []
+        except ValueError:
+            rows = []
+    
+    if limit is None:
+        return [row_detail(df, user_messages, i, original_metric, selected_fields, preview_chars) for i in rows]
+    
+    version = "-".join(str(part) for part in DATASET_CACHE.key_for(file_path)[2:])
+    try:
+        page, next_cursor = paginate(rows, version, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    items = [row_detail(df, user_messages, i, original_metric, selected_fields, preview_chars) for i in page]
+    return page_response(items, next_cursor, len(rows))
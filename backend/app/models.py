@@ -2,11 +2,24 @@
 Data models for the AI Quality Dashboard.
 """
 
+import math
+from collections.abc import Mapping
+from operator import attrgetter, itemgetter
 from dataclasses import dataclass
-from typing import Dict, Any, Optional
+from types import MappingProxyType
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence
 from datetime import datetime
 
-@dataclass
+import numpy as np
+import pandas as pd
+
+# Columns mapped to EvaluationResult fields; every other column is metadata
+RESULT_FIELDS = ('model', 'prompt', 'response', 'score', 'metric', 'timestamp')
+
+# Shared by results whose file has no metadata columns
+EMPTY_METADATA = MappingProxyType({})
+
+@dataclass(slots=True)
 class EvaluationResult:
     """Model representing an AI evaluation result."""
     
@@ -51,8 +64,7 @@ class EvaluationResult:
                 timestamp = None
         
         # Extract metadata (any additional fields)
-        required_fields = {'model', 'prompt', 'response', 'score', 'metric', 'timestamp'}
-        metadata = {k: v for k, v in data.items() if k not in required_fields}
+        metadata = {k: v for k, v in data.items() if k not in RESULT_FIELDS}
         
         return cls(
             model=data.get('model', ''),
@@ -85,6 +97,106 @@ class EvaluationResult:
         
         return result
 
+class MetadataSchema:
+    """Column layout of one CSV file, shared by every result parsed from it."""
+    
+    __slots__ = ('fields', 'positions', 'index')
+    
+    def __init__(self, header: Sequence[str]):
+        # Later duplicates win, as with csv.DictReader
+        positions = {name: position for position, name in enumerate(header)}
+        self.fields = tuple(name for name in positions if name not in RESULT_FIELDS)
+        self.positions = positions
+        self.index = {name: positions[name] for name in self.fields}
+    
+    def position(self, name: str) -> Optional[int]:
+        return self.positions.get(name)
+
+class MetadataView(Mapping):
+    """Read-only metadata of one row, resolved through the shared schema."""
+    
+    __slots__ = ('schema', 'row')
+    
+    def __init__(self, schema: MetadataSchema, row: Sequence[Any]):
+        self.schema = schema
+        self.row = row
+    
+    def __getitem__(self, key: str) -> Any:
+        position = self.schema.index[key]
+        return self.row[position] if position < len(self.row) else None
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.schema.fields)
+    
+    def __len__(self) -> int:
+        return len(self.schema.fields)
+
+class EvaluationBatch:
+    """
+    Array-backed batch of evaluation results.
+    
+    Rows are kept as the raw CSV value lists and scores as one float array.
+    :class:`EvaluationResult` objects are only built when a row is accessed,
+    and share the batch's metadata schema and load timestamp.
+    """
+    
+    __slots__ = ('schema', 'rows', 'scores', 'loaded_at')
+    
+    def __init__(self, schema: MetadataSchema, rows: List[Sequence[Any]],
+                 loaded_at: Optional[datetime] = None):
+        self.schema = schema
+        self.rows = rows
+        self.loaded_at = loaded_at or datetime.now()
+        
+        raw_scores = pd.Series(self.column('score', None), dtype=object)
+        self.scores = pd.to_numeric(raw_scores, errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+    
+    def column(self, name: str, default: Any = '') -> List[Any]:
+        """Raw values of one CSV column, ``default`` for every row if it is absent."""
+        position = self.schema.position(name)
+        if position is None:
+            return [default] * len(self.rows)
+        try:
+            return list(map(itemgetter(position), self.rows))
+        except IndexError:
+            # Short rows leave trailing columns unset, as with csv.DictReader
+            return [row[position] if position < len(row) else None for row in self.rows]
+    
+    def _value(self, row: Sequence[Any], name: str, default: Any = '') -> Any:
+        position = self.schema.position(name)
+        if position is None:
+            return default
+        # Short rows leave trailing columns unset, as with csv.DictReader
+        return row[position] if position < len(row) else None
+    
+    def __len__(self) -> int:
+        return len(self.rows)
+    
+    def __getitem__(self, index: int) -> EvaluationResult:
+        row = self.rows[index]
+        
+        timestamp = self.loaded_at
+        raw_timestamp = self._value(row, 'timestamp', None)
+        if raw_timestamp:
+            try:
+                timestamp = datetime.fromisoformat(raw_timestamp)
+            except (ValueError, TypeError):
+                pass
+        
+        return EvaluationResult(
+            model=self._value(row, 'model'),
+            prompt=self._value(row, 'prompt'),
+            response=self._value(row, 'response'),
+            score=float(self.scores[index]),
+            metric=self._value(row, 'metric'),
+            timestamp=timestamp,
+            metadata=MetadataView(self.schema, row) if self.schema.fields else EMPTY_METADATA
+        )
+    
+    def __iter__(self) -> Iterator[EvaluationResult]:
+        for index in range(len(self.rows)):
+            yield self[index]
+
 @dataclass
 class DashboardConfig:
     """Configuration model for the dashboard."""
@@ -104,6 +216,18 @@ class DashboardConfig:
                 'factuality'
             ]
 
+def _factorize(values: np.ndarray):
+    """Integer codes and distinct values, keeping missing values as a group of their own."""
+    # The sentinel path skips pandas' slower scan for missing strings
+    codes, uniques = pd.factorize(values)
+    uniques = list(uniques)
+    missing = codes < 0
+    if missing.any():
+        codes = np.where(missing, len(uniques), codes)
+        uniques.append(None)
+    return codes, uniques
+
+
 @dataclass
 class MetricSummary:
     """Summary statistics for a specific metric."""
@@ -115,6 +239,18 @@ class MetricSummary:
     max_score: float
     std_deviation: float
     
+    @classmethod
+    def empty(cls, metric_name: str) -> 'MetricSummary':
+        """Summary of a metric with no evaluations."""
+        return cls(
+            metric_name=metric_name,
+            total_evaluations=0,
+            average_score=0.0,
+            min_score=0.0,
+            max_score=0.0,
+            std_deviation=0.0
+        )
+    
     @classmethod
     def from_results(cls, results: list, metric_name: str) -> 'MetricSummary':
         """
@@ -127,25 +263,96 @@ class MetricSummary:
         Returns:
             MetricSummary: Summary statistics for the metric
         """
-        metric_scores = [r.score for r in results if r.metric == metric_name]
-        
-        if not metric_scores:
-            return cls(
-                metric_name=metric_name,
-                total_evaluations=0,
-                average_score=0.0,
-                min_score=0.0,
-                max_score=0.0,
-                std_deviation=0.0
-            )
+        return cls.from_results_grouped(results, metric_names=[metric_name])[metric_name]
+    
+    @classmethod
+    def from_results_grouped(cls, results: Iterable[Any], metric_names: Optional[Iterable[str]] = None,
+                             by_model: bool = False) -> Dict[Any, 'MetricSummary']:
+        """
+        Calculate summaries for every metric in one pass over the results.
         
-        import statistics
+        Args:
+            results (Iterable[Any]): EvaluationResult objects and/or
+                EvaluationBatch objects from ``DataParser.iter_results``
+            metric_names (Optional[Iterable[str]]): Metrics to summarize, e.g.
+                ``DashboardConfig.supported_metrics``; metrics without results
+                get an empty summary. Defaults to every metric present
+            by_model (bool): Key summaries by ``(model, metric)`` instead of metric
+            
+        Returns:
+            Dict[Any, MetricSummary]: Summaries keyed by metric name, or by
+                ``(model, metric)`` when ``by_model`` is set
+        """
+        results = list(results)
+        batches = []
+        # Checking the set of types is a C-level pass; most callers pass no batches
+        if EvaluationBatch in set(map(type, results)):
+            batches = [item for item in results if isinstance(item, EvaluationBatch)]
+            results = [item for item in results if not isinstance(item, EvaluationBatch)]
         
-        return cls(
-            metric_name=metric_name,
-            total_evaluations=len(metric_scores),
-            average_score=statistics.mean(metric_scores),
-            min_score=min(metric_scores),
-            max_score=max(metric_scores),
-            std_deviation=statistics.stdev(metric_scores) if len(metric_scores) > 1 else 0.0
-        )
\ No newline at end of file
+        # Only the needed attributes are read, each straight into an array;
+        # batches are already columnar
+        metric_parts = [np.array(list(map(attrgetter('metric'), results)), dtype=object)]
+        score_parts = [np.fromiter(map(attrgetter('score'), results), dtype=np.float64, count=len(results))]
+        model_parts = [np.array(list(map(attrgetter('model'), results)), dtype=object)] if by_model else []
+        for batch in batches:
+            metric_parts.append(np.array(batch.column('metric'), dtype=object))
+            score_parts.append(batch.scores)
+            if by_model:
+                model_parts.append(np.array(batch.column('model'), dtype=object))
+        
+        score_array = np.concatenate(score_parts)
+        metric_codes, metric_groups = _factorize(np.concatenate(metric_parts))
+        model_array = np.concatenate(model_parts) if by_model else None
+        if metric_names is not None:
+            metric_names = list(metric_names)
+            selected = np.asarray(pd.Index(metric_groups).isin(metric_names))[metric_codes]
+            score_array, metric_codes = score_array[selected], metric_codes[selected]
+            if by_model:
+                model_array = model_array[selected]
+        
+        if by_model:
+            # Combine integer codes instead of factorizing (model, metric) tuples
+            model_codes, model_groups = _factorize(model_array)
+            codes = model_codes * len(metric_groups) + metric_codes
+            groups = [(model, metric) for model in model_groups for metric in metric_groups]
+        else:
+            codes = metric_codes
+            groups = metric_groups
+        
+        # Per-group reductions over the codes, with no sort and no Python loop over rows
+        size = len(groups)
+        counts = np.bincount(codes, minlength=size)
+        present = counts > 0
+        safe_counts = np.maximum(counts, 1)
+        means = np.bincount(codes, weights=score_array, minlength=size) / safe_counts
+        # One compensation step: the summed residuals recover the rounding
+        # error of the first estimate, like statistics.mean
+        means += np.bincount(codes, weights=score_array - means[codes], minlength=size) / safe_counts
+        deviations = score_array - means[codes]
+        squares = np.bincount(codes, weights=deviations * deviations, minlength=size)
+        variances = np.divide(squares, counts - 1, out=np.zeros(size), where=counts > 1)
+        minimums = np.full(size, np.inf)
+        maximums = np.full(size, -np.inf)
+        np.minimum.at(minimums, codes, score_array)
+        np.maximum.at(maximums, codes, score_array)
+        
+        summaries: Dict[Any, MetricSummary] = {}
+        for index in np.flatnonzero(present):
+            key = groups[index]
+            summaries[key] = cls(
+                metric_name=key[-1] if by_model else key,
+                total_evaluations=int(counts[index]),
+                average_score=float(means[index]),
+                min_score=float(minimums[index]),
+                max_score=float(maximums[index]),
+                std_deviation=math.sqrt(variances[index])
+            )
+        
+        if metric_names is not None:
+            for model in (model_groups if by_model else [None]):
+                for metric_name in metric_names:
+                    key = (model, metric_name) if by_model else metric_name
+                    if key not in summaries:
+                        summaries[key] = cls.empty(metric_name)
+        return summaries
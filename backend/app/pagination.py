@@ -0,0 +1,109 @@
+"""
+Cursor pagination and field projection for drilldown endpoints.
+"""
+
+import base64
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Fields of a drilldown record, in response order
+DETAIL_FIELDS = ("promptId", "conversationId", "prompt", "agentResponse", "passed", "confidence", "reason")
+
+# Text fields that ``preview_chars`` truncates server-side
+PREVIEW_FIELDS = ("prompt", "agentResponse")
+
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(version: str, row: int) -> str:
+    """Encode the next row position together with the dataset version."""
+    return base64.urlsafe_b64encode(f"{version}:{row}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, version: str) -> int:
+    """
+    Decode a cursor produced by :func:`encode_cursor`.
+
+    Args:
+        cursor (str): Opaque cursor from a previous page
+        version (str): Version of the dataset being paged
+
+    Returns:
+        int: Row position to resume from
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another dataset version
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_version, row = base64.urlsafe_b64decode(padded.encode()).decode().rsplit(":", 1)
+        position = int(row)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if cursor_version != version:
+        raise ValueError("Cursor was issued for a different dataset version")
+    return position
+
+
+def parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    """
+    Parse a comma-separated ``fields=`` projection.
+
+    Raises:
+        ValueError: If an unknown field is requested
+    """
+    if not fields:
+        return DETAIL_FIELDS
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in DETAIL_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return tuple(f for f in DETAIL_FIELDS if f in requested)
+
+
+def truncate(text: Any, preview_chars: Optional[int]) -> Any:
+    """Shorten ``text`` to ``preview_chars`` characters, marking the cut with '...'."""
+    if preview_chars is None or not isinstance(text, str) or len(text) <= preview_chars:
+        return text
+    return text[:preview_chars] + "..."
+
+
+def apply_preview(detail: Dict[str, Any], preview_chars: Optional[int]) -> Dict[str, Any]:
+    """Truncate the long text fields of a drilldown record in place."""
+    if preview_chars is not None:
+        for field in PREVIEW_FIELDS:
+            if field in detail:
+                detail[field] = truncate(detail[field], preview_chars)
+    return detail
+
+
+def paginate(rows: Sequence[int], version: str, cursor: Optional[str],
+             limit: int) -> Tuple[List[int], Optional[str]]:
+    """
+    Select one page of row indexes.
+
+    Cursors point at a row index rather than a list offset, so a page stays
+    stable even if the caller filters differently between requests.
+
+    Args:
+        rows (Sequence[int]): Sorted row indexes eligible for the response
+        version (str): Dataset version embedded in the cursor
+        cursor (Optional[str]): Cursor from the previous page
+        limit (int): Maximum number of rows in the page
+
+    Returns:
+        Tuple[List[int], Optional[str]]: Page rows and the cursor for the next page
+    """
+    start = 0
+    if cursor:
+        start = int(np.searchsorted(np.asarray(rows), decode_cursor(cursor, version)))
+    page = list(rows[start:start + limit])
+    next_cursor = None
+    if start + limit < len(rows):
+        next_cursor = encode_cursor(version, page[-1] + 1)
+    return page, next_cursor
+
+
+def page_response(items: Iterable[Dict[str, Any]], next_cursor: Optional[str], total: int) -> Dict[str, Any]:
+    return {"items": list(items), "next_cursor": next_cursor, "total": total}
@@ -3,11 +3,36 @@ Data parsing utilities for the AI Quality Dashboard.
 """
 
 import csv
+import io
+import multiprocessing
 import os
+import numpy as np
 import pandas as pd
-import json
-from typing import List, Dict, Any
-from .models import EvaluationResult
+from collections.abc import Sequence
+from typing import List, Dict, Any, Iterator, Optional
+from .aggregation import normalize_results
+from .conversation import loads
+from .dataset import METRICS, metric_column
+from .models import EvaluationBatch, EvaluationResult, MetadataSchema
+from .workers import PARSE_WORKERS, get_process_pool
+
+# Rows per batch yielded by DataParser.iter_results
+DEFAULT_BATCH_SIZE = 5000
+
+# Files smaller than this are decoded in the calling process; below it the
+# pickled results cost more than the parallel decode saves
+JSON_DECODE_MIN_BYTES = int(os.environ.get("JSON_DECODE_MIN_MB", "16")) * 1024 * 1024
+
+# JSON columns decoded for hover details, by the key load_dataset returns them under
+JSON_COLUMNS = {
+    "query": "inputs.query",
+    "response": "inputs.response",
+    "toolDefinitions": "inputs.tool_definitions",
+    "toolsUsed": "inputs.tools_used",
+}
+
+# Bytes scanned at a time when looking for row boundaries
+SCAN_BLOCK_SIZE = 16 * 1024 * 1024
 
 class DataParser:
     """Parser for evaluation data files."""
@@ -43,6 +68,44 @@ class DataParser:
         
         return data
     
+    def iter_results(self, file_path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[EvaluationBatch]:
+        """
+        Stream evaluation results from a CSV file in batches.
+        
+        Only one batch of raw rows is held at a time, unlike
+        :meth:`load_csv` followed by :meth:`parse_evaluation_results`.
+        
+        Args:
+            file_path (str): Path to the CSV file
+            batch_size (int): Rows per yielded batch
+            
+        Yields:
+            EvaluationBatch: Results sharing the file's metadata schema
+            
+        Raises:
+            FileNotFoundError: If the CSV file doesn't exist
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        
+        with open(file_path, 'r', encoding='utf-8', newline='') as file:
+            reader = csv.reader(file)
+            header = next(reader, None)
+            if header is None:
+                return
+            schema = MetadataSchema(header)
+            
+            rows = []
+            for row in reader:
+                if not row:
+                    continue
+                rows.append(row)
+                if len(rows) >= batch_size:
+                    yield EvaluationBatch(schema, rows)
+                    rows = []
+            if rows:
+                yield EvaluationBatch(schema, rows)
+    
     def parse_evaluation_results(self, raw_data: List[Dict[str, Any]]) -> List[EvaluationResult]:
         """
         Parse raw CSV data into EvaluationResult objects.
@@ -84,75 +147,168 @@ class DataParser:
         except Exception:
             return False
 
-def load_dataset(file_path: str):
-    df = pd.read_csv(file_path)
+def parse_json_safely(value):
+    """Safely parse JSON string, return original if parsing fails"""
+    if pd.isna(value) or value == "":
+        return ""
+    try:
+        return loads(value)
+    except (ValueError, TypeError):
+        return str(value)
 
-    runs = []
+class LazyColumn(Sequence):
+    """Deduplicated text column whose Python list is only built on demand."""
 
-    # Extract run_id from the first row - using conversation_id as run identifier
-    run_id = df["inputs.conversation_id"].iloc[0]
+    def __init__(self, values: pd.Series, fill: Any = ""):
+        self._values = pd.Categorical(values)
+        self._fill = fill
 
-    def parse_json_safely(value):
-        """Safely parse JSON string, return original if parsing fails"""
-        if pd.isna(value) or value == "":
-            return ""
-        try:
-            return json.loads(value)
-        except (json.JSONDecodeError, TypeError):
-            return str(value)
+    def __len__(self) -> int:
+        return len(self._values)
 
-    def metric(name, reason_col):
-        # Convert string values to numeric for calculation
-        metric_values = df[name].fillna("")
-        
-        # Handle string-based pass/fail values
-        numeric_values = []
-        for val in metric_values:
-            if pd.isna(val) or val == "":
-                numeric_values.append(0)
-            elif str(val).lower() in ['pass', 'true', '1']:
-                numeric_values.append(1)
-            elif str(val).lower() in ['fail', 'false', '0']:
-                numeric_values.append(0)
-            else:
-                # Try to convert to float, default to 0 if failed
-                try:
-                    numeric_values.append(float(val))
-                except (ValueError, TypeError):
-                    numeric_values.append(0)
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        code = self._values.codes[index]
+        return self._fill if code < 0 else self._values.categories[code]
+
+    def tolist(self) -> List[Any]:
+        return list(self)
+
+def _decode_batch(values: List[Any]) -> List[Any]:
+    return [parse_json_safely(value) for value in values]
+
+def row_boundaries(file_path: str, parts: int) -> List[int]:
+    """
+    Byte offsets splitting a CSV file into about ``parts`` ranges of whole rows.
+    
+    A newline ends a row when an even number of quote characters precedes
+    it, since quoted fields escape quotes by doubling them.
+    
+    Args:
+        file_path (str): CSV file
+        parts (int): Number of data ranges wanted
         
-        numeric_series = pd.Series(numeric_values)
+    Returns:
+        List[int]: The end of the header row, the range boundaries and the
+            file size; consecutive pairs delimit the data ranges
+    """
+    size = os.path.getsize(file_path)
+    # The first target is the header itself
+    targets = [0] + [size * i // parts for i in range(1, parts)]
+    bounds: List[int] = []
+    parity = 0
+    offset = 0
+    with open(file_path, 'rb') as f:
+        while targets:
+            block = f.read(SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            data = np.frombuffer(block, dtype=np.uint8)
+            quoted = np.bitwise_xor.accumulate((data == ord('"')).view(np.uint8)) ^ np.uint8(parity)
+            row_ends = np.flatnonzero((data == ord('\n')) & (quoted == 0)) + offset + 1
+            while targets:
+                # Each boundary must come after the previous one
+                floor = max(targets[0], bounds[-1] + 1 if bounds else 0)
+                index = int(np.searchsorted(row_ends, floor))
+                if index == len(row_ends):
+                    break
+                bounds.append(int(row_ends[index]))
+                targets.pop(0)
+            parity = int(quoted[-1])
+            offset += len(block)
+    bounds = [bound for bound in bounds if bound < size] or [size]
+    return bounds + [size]
+
+def _decode_frame(df: pd.DataFrame) -> Dict[str, List[Any]]:
+    return {key: _decode_batch(df[column].tolist()) for key, column in JSON_COLUMNS.items()}
+
+def _decode_range(file_path: str, header_end: int, start: int, end: int) -> Dict[str, List[Any]]:
+    """Read the JSON columns of the rows in ``[start, end)`` and decode them; runs in a parser process."""
+    with open(file_path, 'rb') as f:
+        header = f.read(header_end)
+        f.seek(start)
+        body = f.read(end - start)
+    return _decode_frame(pd.read_csv(io.BytesIO(header + body), usecols=list(JSON_COLUMNS.values()), dtype=object))
+
+def json_decode_pool(file_path: str, workers: int):
+    """
+    The shared parser pool when a file is worth decoding in parallel, else None.
+    
+    Small files, a single worker, or a caller that already runs in a parser
+    process decode in-process.
+    """
+    in_worker = multiprocessing.parent_process() is not None
+    if workers > 1 and not in_worker and os.path.getsize(file_path) >= JSON_DECODE_MIN_BYTES:
+        return get_process_pool()
+    return None
+
+def decode_json_file(file_path: str, workers: Optional[int] = None) -> Dict[str, List[Any]]:
+    """
+    Decode the JSON columns of a CSV export, in parallel for large files.
+    
+    Large files are split at row boundaries and each parser process reads
+    and decodes its own byte range, so only file offsets are sent to the
+    workers instead of pickled strings.
+    
+    Args:
+        file_path (str): CSV export
+        workers (Optional[int]): Ranges to split the file into, defaults to
+            the size of the shared parser pool
         
+    Returns:
+        Dict[str, List[Any]]: Decoded values by ``JSON_COLUMNS`` key, in row order
+    """
+    workers = PARSE_WORKERS if workers is None else workers
+    pool = json_decode_pool(file_path, workers)
+    bounds = row_boundaries(file_path, workers if pool is not None else 1)
+    if pool is None or len(bounds) <= 2:
+        return _decode_range(file_path, bounds[0], bounds[0], bounds[-1])
+    
+    futures = [pool.submit(_decode_range, file_path, bounds[0], start, end)
+               for start, end in zip(bounds[:-1], bounds[1:])]
+    decoded: Dict[str, List[Any]] = {key: [] for key in JSON_COLUMNS}
+    for future in futures:
+        for key, values in future.result().items():
+            decoded[key].extend(values)
+    return decoded
+
+def load_dataset(file_path: str, workers: Optional[int] = None):
+    # The JSON columns hold most of the bytes; when they are decoded in
+    # parallel byte ranges the main read skips them
+    workers = PARSE_WORKERS if workers is None else workers
+    parallel = json_decode_pool(file_path, workers) is not None
+    json_columns = set(JSON_COLUMNS.values())
+    df = pd.read_csv(file_path, usecols=(lambda column: column not in json_columns) if parallel else None)
+
+    # Extract run_id from the first row - using conversation_id as run identifier
+    run_id = df["inputs.conversation_id"].iloc[0]
+
+    # Normalize all seven result columns in one bulk pass
+    keys = list(METRICS)
+    numeric = normalize_results(df, [metric_column(METRICS[key], "result") for key in keys])
+
+    def metric(key):
+        values = numeric[:, keys.index(key)]
         return {
-            "score": int(numeric_series.mean() * 100) if len(numeric_series) > 0 else 0,
-            "passed": int(numeric_series.sum()),
-            "total": len(numeric_series),
-            "reasons": df[reason_col].fillna("").tolist()
+            "score": int(values.mean() * 100) if len(values) > 0 else 0,
+            "passed": int(values.sum()),
+            "total": len(values),
+            "reasons": LazyColumn(df[metric_column(METRICS[key], "reason")])
         }
 
-    # Parse query and response as JSON for hover details
-    queries = []
-    responses = []
-    
-    for _, row in df.iterrows():
-        query_data = parse_json_safely(row["inputs.query"])
-        response_data = parse_json_safely(row["inputs.response"])
-        
-        queries.append(query_data)
-        responses.append(response_data)
+    # Parse query, response and tool JSON for hover details
+    decoded = decode_json_file(file_path, workers) if parallel else _decode_frame(df)
+    if len(decoded["query"]) != len(df):
+        # Unbalanced quotes outside quoted fields defeat the row split
+        decoded = _decode_frame(pd.read_csv(file_path, usecols=list(json_columns), dtype=object))
 
     return {
         "runId": run_id,
-        "query": queries,
-        "response": responses,
+        "query": decoded["query"],
+        "response": decoded["response"],
         "passed": df["Passed"].fillna("").tolist(),
-        "toolDefinitions": [parse_json_safely(td) for td in df["inputs.tool_definitions"].fillna("")],
-        "toolsUsed": [parse_json_safely(tu) for tu in df["inputs.tools_used"].fillna("")],
-        "intentResolution": metric("intent_resolution.intent_resolution.result", "intent_resolution.intent_resolution.reason"),
-        "coherence": metric("coherence.coherence.result", "coherence.coherence.reason"),
-        "relevance": metric("relevance.relevance.result", "relevance.relevance.reason"),
-        "groundedness": metric("groundedness.groundedness.result", "groundedness.groundedness.reason"),
-        "toolCallAccuracy": metric("tool_call_accuracy.tool_call_accuracy.result", "tool_call_accuracy.tool_call_accuracy.reason"),
-        "taskAdherence": metric("task_adherence.task_adherence.result", "task_adherence.task_adherence.reason"),
-        "fluency": metric("fluency.fluency.result", "fluency.fluency.reason"),
+        "toolDefinitions": decoded["toolDefinitions"],
+        "toolsUsed": decoded["toolsUsed"],
+        **{key: metric(key) for key in keys},
     }
\ No newline at end of file
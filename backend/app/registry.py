@@ -0,0 +1,64 @@
+"""
+Registry of datasets addressable by id.
+
+Entries only record where each dataset is stored. Parsed forms live in
+``DATASET_CACHE``, so recently used datasets stay resident under its LRU
+memory budget and cold ones are re-parsed from storage on demand.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Id of the dataset bundled with the server
+DEFAULT_DATASET_ID = "default"
+
+# Hex digits of the content hash used as a dataset id
+DATASET_ID_LENGTH = 16
+
+
+def dataset_id_for(sha256: str) -> str:
+    """Dataset id of an upload; identical content always gets the same id."""
+    return sha256[:DATASET_ID_LENGTH]
+
+
+class DatasetRegistry:
+    """Dataset ids mapped to their storage location and upload metadata."""
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, dataset_id: str, filename: str, path: str, **info: Any) -> Dict[str, Any]:
+        """
+        Add or update a dataset.
+
+        Args:
+            dataset_id (str): Id clients pass as ``dataset_id``
+            filename (str): Name the dataset was uploaded under
+            path (str): File path or storage object the dataset is loaded from
+            **info: Extra metadata returned by :meth:`entries`, e.g. ``rows``
+
+        Returns:
+            Dict[str, Any]: The registry entry
+        """
+        with self._lock:
+            entry = self._entries.pop(dataset_id, None) or {"registered_at": datetime.now().isoformat()}
+            entry.update(info, dataset_id=dataset_id, filename=filename, path=path)
+            self._entries[dataset_id] = entry
+            return dict(entry)
+
+    def get(self, dataset_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            return dict(entry) if entry is not None else None
+
+    def __contains__(self, dataset_id: str) -> bool:
+        with self._lock:
+            return dataset_id in self._entries
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """All datasets, most recently registered first."""
+        with self._lock:
+            return [dict(entry) for entry in reversed(self._entries.values())]
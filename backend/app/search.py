@@ -0,0 +1,221 @@
+"""
+In-process inverted index over the text of an evaluation dataset.
+
+Each searchable field is factorized into distinct values, and postings map
+a token to the ids of the distinct values containing it. Repeated reasons
+and prompts are therefore tokenized once, and a query resolves postings to
+rows with one vectorized lookup per field. Indexes are saved as plain NumPy
+archives so a dataset loaded again does not tokenize its text again.
+"""
+
+import logging
+import os
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"[a-z0-9]+")
+
+# Field names; judge reasons are indexed per metric as "reason:<metric>"
+PROMPT_FIELD = "prompt"
+RESPONSE_FIELD = "response"
+REASON_PREFIX = "reason:"
+
+# Bump when the saved layout changes so stale index files are rebuilt
+INDEX_FORMAT = 1
+
+
+def tokenize(text: Any) -> List[str]:
+    """Lower-cased alphanumeric tokens of ``text``."""
+    if not isinstance(text, str):
+        return []
+    return TOKEN.findall(text.lower())
+
+
+class FieldIndex:
+    """Postings of one text field, stored against its distinct values."""
+
+    def __init__(self, codes: np.ndarray, values: Sequence[Any]):
+        self.codes = codes
+        self.value_count = len(values)
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for value_id, value in enumerate(values):
+            for token in set(tokenize(value)):
+                postings[token].append(value_id)
+        self.postings = {token: np.asarray(ids, dtype=np.int32) for token, ids in postings.items()}
+
+    @classmethod
+    def from_postings(cls, codes: np.ndarray, value_count: int,
+                      postings: Dict[str, np.ndarray]) -> "FieldIndex":
+        index = cls.__new__(cls)
+        index.codes = codes
+        index.value_count = value_count
+        index.postings = postings
+        return index
+
+    @classmethod
+    def from_values(cls, values: Iterable[Any]) -> "FieldIndex":
+        codes, uniques = pd.factorize(pd.Series(list(values), dtype=object))
+        return cls(codes, uniques)
+
+    @classmethod
+    def from_categorical(cls, categorical: pd.Categorical) -> "FieldIndex":
+        return cls(np.asarray(categorical.codes), categorical.categories)
+
+    def memory_usage(self) -> int:
+        return int(self.codes.nbytes) + sum(ids.nbytes for ids in self.postings.values())
+
+    def rows(self, token: str) -> np.ndarray:
+        """Boolean mask of rows whose value contains ``token``."""
+        value_ids = self.postings.get(token)
+        if value_ids is None:
+            return np.zeros(len(self.codes), dtype=bool)
+        hits = np.zeros(self.value_count + 1, dtype=bool)
+        hits[value_ids] = True
+        # Missing values have code -1, which picks the trailing False
+        return hits[self.codes]
+
+
+class SearchIndex:
+    """
+    Inverted index over prompts, responses and judge reasons of a dataset.
+
+    Built once per dataset; queries cost one vectorized pass per field and
+    term instead of a substring scan over every row.
+    """
+
+    def __init__(self, dataset):
+        n = len(dataset)
+        self.size = n
+        self.fields: Dict[str, FieldIndex] = {}
+        if dataset.prompts is not None:
+            self.fields[PROMPT_FIELD] = FieldIndex.from_values(dataset.prompts[i] for i in range(n))
+        response = dataset.text["response"]
+        self.fields[RESPONSE_FIELD] = FieldIndex.from_values(response.raw(i) for i in range(n))
+        for key, columns in dataset.metrics.items():
+            self.fields[REASON_PREFIX + key] = FieldIndex.from_categorical(columns.reasons)
+
+    def memory_usage(self) -> int:
+        """Approximate number of bytes held by the postings."""
+        return sum(index.memory_usage() for index in self.fields.values())
+
+    def save(self, path: str) -> None:
+        """
+        Write the index to ``path`` as an uncompressed ``.npz`` archive.
+
+        Each field stores its codes, the ids of every posting list
+        concatenated with their offsets, and its tokens joined by newlines,
+        which never occur in a token.
+        """
+        arrays: Dict[str, np.ndarray] = {
+            "format": np.array(INDEX_FORMAT),
+            "size": np.array(self.size),
+            "fields": np.array(list(self.fields)),
+        }
+        for position, index in enumerate(self.fields.values()):
+            tokens = list(index.postings)
+            lengths = [len(index.postings[token]) for token in tokens]
+            arrays[f"{position}.codes"] = np.asarray(index.codes)
+            arrays[f"{position}.value_count"] = np.array(index.value_count)
+            arrays[f"{position}.tokens"] = np.frombuffer("\n".join(tokens).encode(), dtype=np.uint8)
+            arrays[f"{position}.offsets"] = np.cumsum([0] + lengths, dtype=np.int64)
+            arrays[f"{position}.ids"] = (np.concatenate([index.postings[token] for token in tokens])
+                                         if tokens else np.zeros(0, dtype=np.int32))
+        part_path = path + ".part"
+        with open(part_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(part_path, path)
+
+    @classmethod
+    def load(cls, path: str, size: int) -> Optional["SearchIndex"]:
+        """
+        Read an index written by :meth:`save`.
+
+        Args:
+            path (str): Index file
+            size (int): Row count of the dataset it must belong to
+
+        Returns:
+            Optional[SearchIndex]: None if the file is missing, unreadable or stale
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                if int(archive["format"]) != INDEX_FORMAT or int(archive["size"]) != size:
+                    return None
+                index = cls.__new__(cls)
+                index.size = size
+                index.fields = {}
+                for position, name in enumerate(archive["fields"].tolist()):
+                    raw = archive[f"{position}.tokens"].tobytes().decode()
+                    tokens = raw.split("\n") if raw else []
+                    offsets = archive[f"{position}.offsets"]
+                    ids = archive[f"{position}.ids"]
+                    postings = {token: ids[offsets[i]:offsets[i + 1]] for i, token in enumerate(tokens)}
+                    index.fields[name] = FieldIndex.from_postings(
+                        archive[f"{position}.codes"], int(archive[f"{position}.value_count"]), postings)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable search index %s: %s", path, e)
+            return None
+        return index
+
+    def search(self, query: str, fields: Optional[Sequence[str]] = None,
+               metric: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Find rows containing every query term in at least one field.
+
+        Rows are ranked by the idf-weighted number of (term, field) matches,
+        so rare terms and matches in several fields rank first.
+
+        Args:
+            query (str): Free text; every token must match
+            fields (Optional[Sequence[str]]): Field kinds to search among
+                ``"prompt"``, ``"response"`` and ``"reason"``; all by default
+            metric (Optional[str]): Only search the reasons of this metric
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, Dict[str, np.ndarray]]: Matching rows
+                in rank order, their scores, and per field a mask of rows it matched
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        selected = {}
+        for name, index in self.fields.items():
+            kind = REASON_PREFIX[:-1] if name.startswith(REASON_PREFIX) else name
+            if fields is not None and kind not in fields:
+                continue
+            if metric is not None and kind == REASON_PREFIX[:-1] and name != REASON_PREFIX + metric:
+                continue
+            selected[name] = index
+
+        if not terms or not selected:
+            return np.zeros(0, dtype=np.int64), np.zeros(0), {}
+
+        matched = np.ones(self.size, dtype=bool)
+        scores = np.zeros(self.size)
+        field_hits = {name: np.zeros(self.size, dtype=bool) for name in selected}
+        for term in terms:
+            term_rows = np.zeros(self.size, dtype=bool)
+            hits = {}
+            for name, index in selected.items():
+                hits[name] = index.rows(term)
+                term_rows |= hits[name]
+            frequency = int(term_rows.sum())
+            if frequency == 0:
+                return np.zeros(0, dtype=np.int64), np.zeros(0), {}
+            idf = np.log(1.0 + self.size / frequency)
+            for name, rows in hits.items():
+                scores += rows * idf
+                field_hits[name] |= rows
+            matched &= term_rows
+
+        rows = np.flatnonzero(matched)
+        # Stable sort keeps row order among equal scores
+        order = np.argsort(-scores[rows], kind="stable")
+        rows = rows[order]
+        return rows, scores[rows], {name: mask for name, mask in field_hits.items() if mask[rows].any()}
@@ -0,0 +1,352 @@
+"""
+Binary columnar sidecars for parsed datasets.
+
+The first ingest of an export writes an uncompressed Arrow IPC file holding
+the conversation ids, the extracted user message, the response text and
+every metric column. Later loads memory-map that file instead of parsing
+CSV text and conversation JSON again. The search index and the failure
+clusters are saved beside it, so every load path serves search and
+clusters without tokenizing the text again.
+
+Given a content store, all three files are kept in it beside the stored
+export, keyed by its hash, so restarts and other instances reuse them. On
+remote storage they are downloaded into a local directory that is only a
+size-bounded cache for memory-mapping.
+"""
+
+import json
+import logging
+import os
+import tempfile
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .clusters import CLUSTERS_FORMAT
+from .dataset import METRICS, TEXT_COLUMNS, EvaluationDataset, LazyJSONColumn, MetricColumns
+from .search import SearchIndex
+from .telemetry import ingest_stage
+
+# Arrow imports (optional - datasets are simply re-parsed without it)
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+SIDECAR_SUFFIX = ".arrow"
+INDEX_SUFFIX = ".index.npz"
+CLUSTERS_SUFFIX = ".clusters.json"
+
+# Local cache of sidecars, indexes and clusters read from remote storage, or
+# their only copy when no content store is given
+SIDECAR_DIR = os.environ.get("SIDECAR_DIR", os.path.join(tempfile.gettempdir(), "aiqd-sidecars"))
+
+# Size of the local cache before the least recently used files are evicted
+SIDECAR_CACHE_BYTES = int(os.environ.get("SIDECAR_CACHE_MB", "2048")) * 1024 * 1024
+
+# Bump when the column layout changes so stale sidecars are ignored
+SIDECAR_FORMAT = "2"
+
+
+class ArrowStrings:
+    """Read-only string column backed by a memory-mapped Arrow array."""
+
+    def __init__(self, array):
+        self._array = array
+
+    def __len__(self) -> int:
+        return len(self._array)
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        return self._array[int(index)].as_py()
+
+    @property
+    def nbytes(self) -> int:
+        return self._array.nbytes
+
+
+def _dictionary(categorical: pd.Categorical):
+    indices = pa.array(categorical.codes, mask=categorical.codes < 0, type=pa.int32())
+    categories = pa.array([str(c) for c in categorical.categories], type=pa.string())
+    return pa.DictionaryArray.from_arrays(indices, categories)
+
+
+def _categorical(array) -> pd.Categorical:
+    codes = array.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+    return pd.Categorical.from_codes(codes, categories=array.dictionary.to_pylist())
+
+
+def _strings(values) -> "pa.Array":
+    return pa.array([v if isinstance(v, str) else None for v in values], type=pa.large_string())
+
+
+def write_sidecar(dataset: EvaluationDataset, path: str, metadata: Optional[Dict[str, str]] = None) -> bool:
+    """
+    Write ``dataset`` to an Arrow IPC sidecar at ``path``.
+
+    Args:
+        dataset (EvaluationDataset): Dataset parsed from the source export
+        path (str): Destination file
+        metadata (Optional[Dict[str, str]]): Source fingerprint checked on read
+
+    Returns:
+        bool: True if the sidecar was written
+    """
+    if not PYARROW_AVAILABLE:
+        return False
+
+    n = len(dataset)
+    columns = {
+        "conversation_id": _strings(dataset.conversation_ids),
+        "prompt": _strings(dataset.prompts[i] for i in range(n)),
+        "response": _strings(dataset.text["response"].raw(i) for i in range(n)),
+    }
+    for key, metric in dataset.metrics.items():
+        columns[f"{key}.result"] = _dictionary(metric.results)
+        columns[f"{key}.score"] = pa.array(metric.scores, type=pa.float64())
+        columns[f"{key}.reason"] = _dictionary(metric.reasons)
+
+    table = pa.table(columns)
+    table = table.replace_schema_metadata({
+        "format": SIDECAR_FORMAT,
+        "version": dataset.version,
+        "filename": dataset.filename,
+        **(metadata or {}),
+    })
+
+    part_path = path + ".part"
+    try:
+        with pa.OSFile(part_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(part_path, path)
+    except (OSError, pa.ArrowException) as e:
+        logger.warning("Could not write sidecar %s: %s", path, e)
+        if os.path.exists(part_path):
+            os.unlink(part_path)
+        return False
+    return True
+
+
+def read_sidecar(path: str, expected: Optional[Dict[str, str]] = None) -> Optional[EvaluationDataset]:
+    """
+    Memory-map a sidecar and wrap it as an :class:`EvaluationDataset`.
+
+    Args:
+        path (str): Sidecar file
+        expected (Optional[Dict[str, str]]): Metadata that must match, e.g.
+            the source file size and mtime
+
+    Returns:
+        Optional[EvaluationDataset]: None if the sidecar is missing or stale
+    """
+    if not PYARROW_AVAILABLE or not os.path.exists(path):
+        return None
+
+    try:
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    except (OSError, pa.ArrowException) as e:
+        logger.warning("Ignoring unreadable sidecar %s: %s", path, e)
+        return None
+
+    metadata = {k.decode(): v.decode() for k, v in (table.schema.metadata or {}).items()}
+    wanted = {"format": SIDECAR_FORMAT, **(expected or {})}
+    if any(metadata.get(k) != v for k, v in wanted.items()):
+        return None
+
+    def column(name):
+        return table.column(name).combine_chunks()
+
+    n = table.num_rows
+    metrics = {}
+    for key in METRICS:
+        metrics[key] = MetricColumns(
+            results=_categorical(column(f"{key}.result")),
+            scores=column(f"{key}.score").to_numpy(),
+            reasons=_categorical(column(f"{key}.reason")),
+        )
+
+    # Only the response is kept; the other JSON columns are not needed once
+    # the user message has been extracted
+    empty = np.full(n, None, dtype=object)
+    text = {key: LazyJSONColumn(empty) for key in TEXT_COLUMNS}
+    text["response"] = LazyJSONColumn(ArrowStrings(column("response")))
+
+    return EvaluationDataset(
+        conversation_ids=column("conversation_id").to_numpy(zero_copy_only=False),
+        text=text,
+        metrics=metrics,
+        filename=metadata.get("filename", ""),
+        version=metadata.get("version"),
+        prompts=ArrowStrings(column("prompt")),
+    )
+
+
+def _in_cache(path: str) -> bool:
+    return os.path.dirname(os.path.abspath(path)) == os.path.abspath(SIDECAR_DIR)
+
+
+def artifact_path(sha256: str, suffix: str, store=None, directory: str = SIDECAR_DIR) -> str:
+    """Local file of a derived artifact: the store's own file on local storage, else the cache."""
+    if store is not None:
+        path = store.backend.local_path(store.artifact_name(sha256, suffix))
+        if path is not None:
+            return path
+    return os.path.join(directory, sha256 + suffix)
+
+
+def evict_cache(keep: Optional[str] = None, directory: str = SIDECAR_DIR,
+                budget: int = SIDECAR_CACHE_BYTES) -> None:
+    """Delete the least recently used cached files until the cache fits ``budget``."""
+    try:
+        entries = [(entry.stat().st_mtime, entry.stat().st_size, entry.path)
+                   for entry in os.scandir(directory)
+                   if entry.is_file() and not entry.name.endswith(".part")]
+    except OSError:
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= budget:
+            break
+        if path == keep:
+            continue
+        try:
+            # Datasets already memory-mapped from the file keep their mapping
+            os.unlink(path)
+            total -= size
+        except OSError:
+            pass
+
+
+def fetch_artifact(sha256: str, suffix: str, store=None) -> str:
+    """
+    Local path of a derived artifact, downloading it from the store on a miss.
+
+    Args:
+        sha256 (str): Content hash of the source export
+        suffix (str): Artifact suffix, e.g. ``SIDECAR_SUFFIX``
+        store: Content store holding the durable copy, if any
+
+    Returns:
+        str: Path that holds the artifact if it exists anywhere
+    """
+    path = artifact_path(sha256, suffix, store)
+    if os.path.exists(path):
+        if _in_cache(path):
+            # Mark as recently used for eviction
+            os.utime(path)
+        return path
+    if store is not None and _in_cache(path):
+        try:
+            os.makedirs(SIDECAR_DIR, exist_ok=True)
+            if store.download(store.artifact_name(sha256, suffix), path):
+                evict_cache(keep=path)
+        except Exception as e:
+            logger.warning("Could not download %s%s from storage: %s", sha256, suffix, e)
+    return path
+
+
+def publish_artifact(path: str, sha256: str, suffix: str, store=None) -> None:
+    """Copy a freshly written cache file to the store so restarts and other instances reuse it."""
+    if not _in_cache(path):
+        # Written straight into local storage
+        return
+    if store is not None:
+        try:
+            store.upload(path, store.artifact_name(sha256, suffix))
+        except Exception as e:
+            logger.warning("Could not store %s%s: %s", sha256, suffix, e)
+    evict_cache(keep=path)
+
+
+def sidecar_path(sha256: str, store=None) -> str:
+    return artifact_path(sha256, SIDECAR_SUFFIX, store)
+
+
+def prepare_search_index(dataset: EvaluationDataset, sha256: str, store=None) -> None:
+    """Attach the saved search index of a dataset, building and saving it on a miss."""
+    if dataset.has_search_index:
+        return
+    path = fetch_artifact(sha256, INDEX_SUFFIX, store)
+    index = SearchIndex.load(path, len(dataset))
+    if index is not None:
+        dataset.attach_search_index(index)
+        return
+    with ingest_stage("index_build", rows=len(dataset)):
+        index = dataset.search_index()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        index.save(path)
+    except OSError as e:
+        logger.warning("Could not write search index %s: %s", path, e)
+        return
+    publish_artifact(path, sha256, INDEX_SUFFIX, store)
+
+
+def prepare_failure_clusters(dataset: EvaluationDataset, sha256: str, store=None) -> None:
+    """Attach the saved failure clusters of every metric, computing and saving them on a miss."""
+    path = fetch_artifact(sha256, CLUSTERS_SUFFIX, store)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("format") == CLUSTERS_FORMAT and saved.get("rows") == len(dataset):
+                dataset.attach_failure_clusters(saved["metrics"])
+                return
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable clusters %s: %s", path, e)
+
+    with ingest_stage("index_build", rows=len(dataset)):
+        clusters = {metric: dataset.failure_clusters(metric) for metric in dataset.metrics}
+    part_path = path + ".part"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(part_path, "w", encoding="utf-8") as f:
+            json.dump({"format": CLUSTERS_FORMAT, "rows": len(dataset), "metrics": clusters}, f)
+        os.replace(part_path, path)
+    except OSError as e:
+        logger.warning("Could not write clusters %s: %s", path, e)
+        return
+    publish_artifact(path, sha256, CLUSTERS_SUFFIX, store)
+
+
+def load_with_sidecar(sha256: str, filename: str,
+                      parse: Callable[[], EvaluationDataset], store=None) -> EvaluationDataset:
+    """
+    Load a dataset from its sidecar, parsing the source and writing the
+    sidecar on a miss. Either way the dataset comes with its search index
+    and failure clusters.
+
+    Sidecars are named by the content hash of the source export, so a
+    rewritten or re-uploaded file can never be served a stale sidecar.
+
+    Args:
+        sha256 (str): Content hash of the source export
+        filename (str): Name the dataset is currently known by
+        parse (Callable[[], EvaluationDataset]): Parses the source export
+        store: Content store that keeps the sidecar, index and clusters;
+            without one they only live in ``SIDECAR_DIR``
+
+    Returns:
+        EvaluationDataset: Parsed or memory-mapped dataset
+    """
+    path = fetch_artifact(sha256, SIDECAR_SUFFIX, store)
+    dataset = read_sidecar(path, {"version": sha256})
+    if dataset is not None:
+        logger.info("Loaded %d records from sidecar %s", len(dataset), path)
+        # Identical content may have been uploaded under another name
+        dataset.filename = filename
+    else:
+        dataset = parse()
+        if PYARROW_AVAILABLE:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if write_sidecar(dataset, path):
+                publish_artifact(path, sha256, SIDECAR_SUFFIX, store)
+    prepare_search_index(dataset, sha256, store)
+    prepare_failure_clusters(dataset, sha256, store)
+    return dataset
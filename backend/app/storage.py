@@ -0,0 +1,603 @@
+"""
+Dataset storage: pluggable local, in-memory and Azure Blob backends plus a
+content-addressed store.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Azure imports (optional - will work without Azure SDK)
+try:
+    import requests
+    from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
+    from azure.core.pipeline.transport import RequestsTransport
+    from azure.storage.blob import BlobBlock, BlobServiceClient
+    AZURE_STORAGE_AVAILABLE = True
+except ImportError:
+    AZURE_STORAGE_AVAILABLE = False
+    ResourceExistsError = FileExistsError
+    ResourceNotFoundError = FileNotFoundError
+
+# zstd compresses evaluation exports better and faster than gzip when installed
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+# Connections kept open to Azure Storage by the shared blob client
+BLOB_POOL_SIZE = int(os.environ.get("BLOB_POOL_SIZE", "16"))
+
+# Seconds between status checks of a server-side blob copy that is still pending
+COPY_POLL_SECONDS = 0.5
+
+
+class LocalFileSink:
+    """Writes chunks to a ``.part`` file and moves it into place on commit."""
+
+    def __init__(self, path: str, name: Optional[str] = None):
+        self.path = path
+        self.name = name or path
+        self._part_path = path + ".part"
+        self._file = open(self._part_path, 'wb')
+
+    def write(self, chunk: bytes) -> None:
+        self._file.write(chunk)
+
+    def commit(self) -> str:
+        self._file.close()
+        os.replace(self._part_path, self.path)
+        print(f"File saved locally: {self.path}")
+        return self.name
+
+    def abort(self) -> None:
+        self._file.close()
+        if os.path.exists(self._part_path):
+            os.unlink(self._part_path)
+
+
+class BlobBlockSink:
+    """Streams chunks to Azure Blob Storage as staged blocks."""
+
+    def __init__(self, blob_client, blob_name: str):
+        self.blob_client = blob_client
+        self.blob_name = blob_name
+        self._blocks = []
+
+    def write(self, chunk: bytes) -> None:
+        # Block ids must all have the same length within a blob
+        block_id = base64.b64encode(f"{len(self._blocks):08d}".encode()).decode()
+        self.blob_client.stage_block(block_id=block_id, data=chunk)
+        self._blocks.append(BlobBlock(block_id=block_id) if AZURE_STORAGE_AVAILABLE else block_id)
+
+    def commit(self) -> str:
+        self.blob_client.commit_block_list(self._blocks)
+        print(f"File saved to Azure Storage: {self.blob_name}")
+        return self.blob_name
+
+    def abort(self) -> None:
+        # Uncommitted blocks are discarded by the storage service
+        self._blocks = []
+
+
+class StorageBackend(ABC):
+    """Interface shared by the storage backends.
+
+    Objects are addressed by ``/``-separated names, as blobs are in a
+    container. Backends are long-lived and safe to share between requests.
+    ``shared`` tells whether a backend opened in another process, such as a
+    parser worker, sees the same objects.
+    """
+
+    shared = True
+
+    @abstractmethod
+    def exists(self, name: str) -> bool:
+        """Whether an object is stored under ``name``."""
+
+    @abstractmethod
+    def open_writer(self, name: str):
+        """Return a sink with ``write(chunk)``, ``commit()`` and ``abort()``."""
+
+    @abstractmethod
+    def read_chunks(self, name: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield the stored bytes of an object in chunks."""
+
+    @abstractmethod
+    def read_bytes(self, name: str) -> bytes:
+        """Return the stored bytes of an object."""
+
+    @abstractmethod
+    def write_bytes(self, name: str, data: bytes) -> None:
+        """Store ``data`` under ``name``, replacing any previous object."""
+
+    @abstractmethod
+    def delete(self, name: str) -> None:
+        """Remove the object stored under ``name``."""
+
+    @abstractmethod
+    def move(self, source: str, name: str) -> None:
+        """Rename an object, replacing any object already stored under ``name``."""
+
+    def local_path(self, name: str) -> Optional[str]:
+        """File holding the object on this machine, or None if it is remote."""
+        return None
+
+    def close(self) -> None:
+        """Release connections or handles held by the backend."""
+
+
+class LocalStorage(StorageBackend):
+    """Named objects stored as files under a root directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def local_path(self, name: str) -> str:
+        return self.path(name)
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self.path(name))
+
+    def open_writer(self, name: str) -> LocalFileSink:
+        os.makedirs(os.path.dirname(self.path(name)) or ".", exist_ok=True)
+        return LocalFileSink(self.path(name), name)
+
+    def read_chunks(self, name: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        with open(self.path(name), 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def read_bytes(self, name: str) -> bytes:
+        with open(self.path(name), 'rb') as f:
+            return f.read()
+
+    def write_bytes(self, name: str, data: bytes) -> None:
+        sink = self.open_writer(name)
+        sink.write(data)
+        sink.commit()
+
+    def delete(self, name: str) -> None:
+        os.unlink(self.path(name))
+
+    def move(self, source: str, name: str) -> None:
+        os.makedirs(os.path.dirname(self.path(name)) or ".", exist_ok=True)
+        os.replace(self.path(source), self.path(name))
+
+
+class AzureBlobStorage(StorageBackend):
+    """Named objects stored as blobs in one Azure Storage container.
+
+    Works with a real ``BlobServiceClient`` or with
+    :class:`MemoryBlobServiceClient`. The service client is shared and owned
+    by the caller, so :meth:`close` leaves it open.
+    """
+
+    def __init__(self, blob_service_client, container: str):
+        self.blob_service_client = blob_service_client
+        self.container_client = blob_service_client.get_container_client(container)
+        # In-memory blobs only exist in the process that holds the client
+        self.shared = not isinstance(blob_service_client, MemoryBlobServiceClient)
+
+    def exists(self, name: str) -> bool:
+        return self.container_client.get_blob_client(name).exists()
+
+    def open_writer(self, name: str) -> BlobBlockSink:
+        return BlobBlockSink(self.container_client.get_blob_client(name), name)
+
+    def read_chunks(self, name: str, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        return self.container_client.get_blob_client(name).download_blob().chunks()
+
+    def read_bytes(self, name: str) -> bytes:
+        return self.container_client.get_blob_client(name).download_blob().readall()
+
+    def write_bytes(self, name: str, data: bytes) -> None:
+        self.container_client.get_blob_client(name).upload_blob(data, overwrite=True)
+
+    def delete(self, name: str) -> None:
+        self.container_client.get_blob_client(name).delete_blob()
+
+    def move(self, source: str, name: str) -> None:
+        # Blobs cannot be renamed; copy server-side within the account, then delete
+        source_client = self.container_client.get_blob_client(source)
+        target_client = self.container_client.get_blob_client(name)
+        status = target_client.start_copy_from_url(source_client.url)["copy_status"]
+        while status == "pending":
+            time.sleep(COPY_POLL_SECONDS)
+            status = target_client.get_blob_properties().copy.status
+        if status != "success":
+            raise OSError(f"Copying blob {source} to {name} ended with status {status}")
+        source_client.delete_blob()
+
+
+def create_blob_service_client(connection_string: str, pool_size: int = BLOB_POOL_SIZE):
+    """
+    Create one connection-pooled Azure Blob service client.
+
+    The client is meant to be created once per process and shared; every
+    container and blob client derived from it reuses the same HTTP session.
+
+    Args:
+        connection_string (str): Azure Storage connection string
+        pool_size (int): Maximum number of pooled connections
+
+    Returns:
+        BlobServiceClient: Shared client; close it together with its session
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    client = BlobServiceClient.from_connection_string(
+        connection_string,
+        transport=RequestsTransport(session=session, session_owner=False),
+    )
+    client.pooled_session = session
+    return client
+
+
+def close_blob_service_client(client) -> None:
+    """Close a client created by :func:`create_blob_service_client`."""
+    client.close()
+    session = getattr(client, "pooled_session", None)
+    if session is not None:
+        session.close()
+
+
+class _MemoryDownload:
+    def __init__(self, data: bytes, chunk_size: int):
+        self._data = data
+        self._chunk_size = chunk_size
+        self.size = len(data)
+
+    def readall(self) -> bytes:
+        return self._data
+
+    def chunks(self) -> Iterator[bytes]:
+        for start in range(0, len(self._data), self._chunk_size):
+            yield self._data[start:start + self._chunk_size]
+
+
+class MemoryBlobClient:
+    """In-memory blob with the subset of the ``BlobClient`` API used here."""
+
+    def __init__(self, service, container: str, blob: str):
+        self._service = service
+        self.container_name = container
+        self.blob_name = blob
+
+    def exists(self) -> bool:
+        self._service.round_trip()
+        return self._service.get(self.container_name, self.blob_name) is not None
+
+    def upload_blob(self, data, overwrite: bool = False) -> None:
+        self._service.round_trip()
+        if not overwrite and self._service.get(self.container_name, self.blob_name) is not None:
+            raise ResourceExistsError(f"Blob already exists: {self.blob_name}")
+        self._service.set(self.container_name, self.blob_name, bytes(data))
+
+    def stage_block(self, block_id: str, data) -> None:
+        self._service.round_trip()
+        self._service.stage(self.container_name, self.blob_name, block_id, bytes(data))
+
+    def commit_block_list(self, block_list: List[Any]) -> None:
+        self._service.round_trip()
+        block_ids = [getattr(block, "id", block) for block in block_list]
+        self._service.commit(self.container_name, self.blob_name, block_ids)
+
+    @property
+    def url(self) -> str:
+        return f"memory://{self.container_name}/{self.blob_name}"
+
+    def delete_blob(self) -> None:
+        self._service.round_trip()
+        if not self._service.delete(self.container_name, self.blob_name):
+            raise ResourceNotFoundError(f"Blob not found: {self.blob_name}")
+
+    def start_copy_from_url(self, source_url: str) -> Dict[str, str]:
+        """Copy another blob of the same service; in memory the copy completes at once."""
+        self._service.round_trip()
+        container, blob = source_url[len("memory://"):].split("/", 1)
+        data = self._service.get(container, blob)
+        if data is None:
+            raise ResourceNotFoundError(f"Blob not found: {blob}")
+        self._service.set(self.container_name, self.blob_name, data)
+        return {"copy_status": "success"}
+
+    def download_blob(self) -> _MemoryDownload:
+        self._service.round_trip()
+        data = self._service.get(self.container_name, self.blob_name)
+        if data is None:
+            raise ResourceNotFoundError(f"Blob not found: {self.blob_name}")
+        return _MemoryDownload(data, self._service.chunk_size)
+
+
+class MemoryContainerClient:
+    def __init__(self, service, container: str):
+        self._service = service
+        self.container_name = container
+
+    def get_blob_client(self, blob: str) -> MemoryBlobClient:
+        return MemoryBlobClient(self._service, self.container_name, blob)
+
+    def list_blob_names(self) -> Iterator[str]:
+        return iter(self._service.names(self.container_name))
+
+
+class MemoryBlobServiceClient:
+    """In-memory stand-in for ``BlobServiceClient``.
+
+    Lets the Azure storage path, including staged block uploads and chunked
+    downloads, run offline. ``latency`` adds a fixed delay per call to
+    approximate service round trips under load.
+    """
+
+    def __init__(self, latency: float = 0.0, chunk_size: int = 4 * CHUNK_SIZE):
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._blobs: Dict[str, Dict[str, bytes]] = {}
+        self._blocks: Dict[Any, Dict[str, bytes]] = {}
+
+    def round_trip(self) -> None:
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get(self, container: str, blob: str) -> Optional[bytes]:
+        with self._lock:
+            return self._blobs.get(container, {}).get(blob)
+
+    def set(self, container: str, blob: str, data: bytes) -> None:
+        with self._lock:
+            self._blobs.setdefault(container, {})[blob] = data
+
+    def stage(self, container: str, blob: str, block_id: str, data: bytes) -> None:
+        with self._lock:
+            self._blocks.setdefault((container, blob), {})[block_id] = data
+
+    def delete(self, container: str, blob: str) -> bool:
+        with self._lock:
+            return self._blobs.get(container, {}).pop(blob, None) is not None
+
+    def commit(self, container: str, blob: str, block_ids: List[str]) -> None:
+        with self._lock:
+            staged = self._blocks.pop((container, blob), {})
+            self._blobs.setdefault(container, {})[blob] = b"".join(staged[i] for i in block_ids)
+
+    def names(self, container: str) -> List[str]:
+        with self._lock:
+            return sorted(self._blobs.get(container, {}))
+
+    def get_container_client(self, container: str) -> MemoryContainerClient:
+        return MemoryContainerClient(self, container)
+
+    def get_blob_client(self, container: str, blob: str) -> MemoryBlobClient:
+        return MemoryBlobClient(self, container, blob)
+
+    def close(self) -> None:
+        pass
+
+
+class GzipCodec:
+    suffix = ".gz"
+
+    @staticmethod
+    def compressor():
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    @staticmethod
+    def decompressor():
+        return zlib.decompressobj(47)
+
+
+class ZstdCodec:
+    suffix = ".zst"
+
+    @staticmethod
+    def compressor():
+        return zstandard.ZstdCompressor(level=3).compressobj()
+
+    @staticmethod
+    def decompressor():
+        return zstandard.ZstdDecompressor().decompressobj()
+
+
+DEFAULT_CODEC = ZstdCodec if ZSTD_AVAILABLE else GzipCodec
+
+
+def codec_for(name: str):
+    """Pick the codec from an object name, or None for uncompressed objects."""
+    if name.endswith(ZstdCodec.suffix):
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError(f"zstandard is required to read {name}")
+        return ZstdCodec
+    if name.endswith(GzipCodec.suffix):
+        return GzipCodec
+    return None
+
+
+class CompressingSink:
+    """Compresses chunks before handing them to another sink in CHUNK_SIZE pieces."""
+
+    def __init__(self, sink, codec=DEFAULT_CODEC):
+        self.sink = sink
+        self._compressor = codec.compressor()
+        self._buffer = bytearray()
+        self.bytes_written = 0
+
+    def _emit(self, data: bytes, final: bool = False) -> None:
+        self._buffer += data
+        if self._buffer and (final or len(self._buffer) >= CHUNK_SIZE):
+            self.bytes_written += len(self._buffer)
+            self.sink.write(bytes(self._buffer))
+            self._buffer.clear()
+
+    def write(self, chunk: bytes) -> None:
+        self._emit(self._compressor.compress(chunk))
+
+    def commit(self) -> str:
+        self._emit(self._compressor.flush(), final=True)
+        return self.sink.commit()
+
+    def abort(self) -> None:
+        self.sink.abort()
+
+
+class ContentStore:
+    """Content-addressed dataset storage with transparent compression.
+
+    Objects are named by the SHA-256 of their uncompressed bytes, so identical
+    uploads are stored once. New content is written under a staging name
+    while it is hashed and filed under its hash by :meth:`commit`.
+    ``manifest.json`` maps each hash to the original filenames it was
+    uploaded under.
+    """
+
+    def __init__(self, backend, prefix: str = "store", codec=DEFAULT_CODEC):
+        self.backend = backend
+        self.prefix = prefix
+        self.codec = codec
+        self._lock = threading.Lock()
+        self._manifest: Optional[Dict[str, Dict[str, Any]]] = None
+
+    @property
+    def manifest_name(self) -> str:
+        return f"{self.prefix}/manifest.json"
+
+    def manifest(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return dict(self._load_manifest())
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if self._manifest is None:
+            if self.backend.exists(self.manifest_name):
+                self._manifest = json.loads(self.backend.read_bytes(self.manifest_name))
+            else:
+                self._manifest = {}
+        return self._manifest
+
+    def is_object(self, name: str) -> bool:
+        return name.startswith(f"{self.prefix}/")
+
+    def find(self, sha256: str) -> Optional[str]:
+        """Return the stored object name for a content hash, if it exists."""
+        with self._lock:
+            entry = self._load_manifest().get(sha256)
+        if entry and self.backend.exists(entry["object"]):
+            return entry["object"]
+        return None
+
+    def entry(self, sha256: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._load_manifest().get(sha256)
+
+    def writer(self, extension: str) -> CompressingSink:
+        """Open a compressing writer for new content under a staging name."""
+        name = f"{self.prefix}/incoming/{uuid.uuid4().hex}{extension}{self.codec.suffix}"
+        return CompressingSink(self.backend.open_writer(name), self.codec)
+
+    def commit(self, writer: CompressingSink, sha256: str, extension: str) -> Tuple[str, bool]:
+        """
+        Commit a staged writer and file its object under the content hash.
+
+        Args:
+            writer (CompressingSink): Writer returned by :meth:`writer`
+            sha256 (str): Hash of the uncompressed content written
+            extension (str): Original file extension, e.g. ``.csv``
+
+        Returns:
+            Tuple[str, bool]: Object name, and whether the content was already
+                stored; the staged copy of known content is discarded
+        """
+        staged = writer.commit()
+        existing = self.find(sha256)
+        if existing is not None:
+            self.backend.delete(staged)
+            return existing, True
+        name = f"{self.prefix}/{sha256}{extension}{self.codec.suffix}"
+        self.backend.move(staged, name)
+        return name, False
+
+    def record(self, sha256: str, filename: str, name: str, size: int, stored_size: int) -> None:
+        """Add ``filename`` to the manifest entry of ``sha256``."""
+        with self._lock:
+            manifest = self._load_manifest()
+            entry = manifest.setdefault(sha256, {
+                "object": name,
+                "size": size,
+                "stored_size": stored_size,
+                "filenames": [],
+                "uploaded_at": datetime.now().isoformat(),
+            })
+            if filename not in entry["filenames"]:
+                entry["filenames"].append(filename)
+            self.backend.write_bytes(self.manifest_name, json.dumps(manifest, indent=2).encode())
+
+    def artifact_name(self, sha256: str, suffix: str) -> str:
+        """Name of a file derived from stored content, e.g. its sidecar, kept beside the object."""
+        return f"{self.prefix}/{sha256}{suffix}"
+
+    def download(self, name: str, path: str) -> bool:
+        """Copy an uncompressed object to a local file; False if it is not stored."""
+        if not self.backend.exists(name):
+            return False
+        part_path = f"{path}.{uuid.uuid4().hex}.part"
+        try:
+            with open(part_path, 'wb') as f:
+                for chunk in self.backend.read_chunks(name):
+                    f.write(chunk)
+            os.replace(part_path, path)
+        finally:
+            if os.path.exists(part_path):
+                os.unlink(part_path)
+        return True
+
+    def upload(self, path: str, name: str) -> None:
+        """Store a local file uncompressed under ``name``, replacing any previous object."""
+        sink = self.backend.open_writer(name)
+        try:
+            with open(path, 'rb') as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    sink.write(chunk)
+            sink.commit()
+        except Exception:
+            sink.abort()
+            raise
+
+    def read_chunks(self, name: str) -> Iterator[bytes]:
+        """Yield the decompressed content of a stored object."""
+        codec = codec_for(name)
+        if codec is None:
+            yield from self.backend.read_chunks(name)
+            return
+        decompressor = codec.decompressor()
+        for chunk in self.backend.read_chunks(name):
+            data = decompressor.decompress(chunk)
+            if data:
+                yield data
+        tail = decompressor.flush()
+        if tail:
+            yield tail
+
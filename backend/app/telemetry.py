@@ -0,0 +1,475 @@
+"""
+Request latency, ingest-stage timings and a sampling profiler.
+
+Everything is kept in process and exposed on ``/internal/stats`` in the
+Prometheus text format, so a scraper or a plain ``curl`` shows where time
+goes:
+
+* ``http_request_duration_seconds`` - latency histogram per method, route
+  template and status, including ETag and compression time
+* ``http_requests_in_flight`` - requests currently being served per route
+* ``ingest_stage_duration_seconds`` - time per ingest stage (storage I/O,
+  parse, normalize, index build, warehouse), with row and byte counters and
+  the throughput of the latest ingest
+* ``response_serialization_seconds`` - JSON encoding time of response bodies
+* ``cache_*`` - occupancy, hits and misses of the dataset and response caches
+
+The profiler samples the stacks of every thread on a background thread
+while it is running and serves them as collapsed stacks, the input format
+of flame graph tools. It is started and stopped at runtime through
+``/internal/profiler``.
+"""
+
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+
+from .cache import DATASET_CACHE, RESPONSE_CACHE
+
+# Upper bounds of the latency buckets in seconds; ingest stages run longer than requests
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Route label of requests that match no route, keeping label cardinality bounded
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Ingest stages in pipeline order
+STAGES = ("storage_io", "parse", "normalize", "index_build", "warehouse")
+
+# When set, /internal endpoints require it in the X-Internal-Token header;
+# otherwise they are only served to loopback clients
+INTERNAL_TOKEN = os.environ.get("INTERNAL_TOKEN")
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+# Profiler sampling interval and the deepest stack kept per sample
+PROFILER_MIN_INTERVAL_MS = 1.0
+PROFILER_INTERVAL_MS = max(float(os.environ.get("PROFILER_INTERVAL_MS", "10")), PROFILER_MIN_INTERVAL_MS)
+PROFILER_MAX_DEPTH = 64
+
+# Prometheus text exposition format; the response adds the charset
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative histogram of observations in fixed buckets."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float, bounds: Sequence[float]) -> None:
+        for i, bound in enumerate(bounds):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of histograms, counters and gauges.
+
+    Series are created on first use and keyed by metric name and labels.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._values: Dict[str, Dict[Labels, float]] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, text: str) -> None:
+        self._help[name] = (kind, text)
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(len(self.buckets))
+            histogram.observe(value, self.buckets)
+
+    def inc(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+
+    def render(self) -> List[str]:
+        """Exposition lines of every series."""
+        with self._lock:
+            histograms = {name: {k: (list(h.counts), h.sum, h.count) for k, h in series.items()}
+                          for name, series in self._histograms.items()}
+            values = {name: dict(series) for name, series in self._values.items()}
+
+        lines: List[str] = []
+        for name in sorted(set(histograms) | set(values)):
+            kind, text = self._help.get(name, ("histogram" if name in histograms else "gauge", name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, (counts, total, count) in sorted(histograms.get(name, {}).items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', repr(bound)))} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {repr(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+            for labels, value in sorted(values.get(name, {}).items()):
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+METRICS = MetricsRegistry()
+METRICS.describe("http_request_duration_seconds", "histogram", "Latency of HTTP requests by route template.")
+METRICS.describe("http_requests_in_flight", "gauge", "HTTP requests currently being served.")
+METRICS.describe("response_serialization_seconds", "histogram", "JSON encoding time of cached response bodies.")
+METRICS.describe("ingest_stage_duration_seconds", "histogram", "Time spent per ingest stage.")
+METRICS.describe("ingest_stage_rows_total", "counter", "Rows processed per ingest stage.")
+METRICS.describe("ingest_stage_bytes_total", "counter", "Bytes processed per ingest stage.")
+METRICS.describe("ingest_stage_rows_per_second", "gauge", "Row throughput of the latest run of each ingest stage.")
+METRICS.describe("ingest_stage_bytes_per_second", "gauge", "Byte throughput of the latest run of each ingest stage.")
+
+
+def route_template(routes: Sequence[Any], scope: Dict[str, Any]) -> str:
+    """Path template of the route serving ``scope``, e.g. ``/runs/{run_id}``."""
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", UNMATCHED_ROUTE)
+        if match == Match.PARTIAL and partial is None:
+            partial = getattr(route, "path", None)
+    return partial or UNMATCHED_ROUTE
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency and in-flight requests.
+
+    Added last, it wraps the other middleware so latency covers ETag checks
+    and compression too.
+
+    Args:
+        app: Wrapped ASGI application
+        routes (Sequence): Routes of the application, used to label requests
+            by path template instead of by raw path
+        registry (MetricsRegistry): Where the series are recorded
+    """
+
+    def __init__(self, app, routes: Sequence[Any], registry: MetricsRegistry = METRICS):
+        self.app = app
+        self.routes = routes
+        self.registry = registry
+        self._in_flight: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def _track(self, method: str, route: str, delta: int) -> None:
+        with self._lock:
+            self._in_flight[(method, route)] += delta
+            current = self._in_flight[(method, route)]
+        self.registry.set("http_requests_in_flight", current, method=method, route=route)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = route_template(self.routes, scope)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self._track(method, route, 1)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.registry.observe("http_request_duration_seconds", time.perf_counter() - start,
+                                  method=method, route=route, status=str(status))
+            self._track(method, route, -1)
+
+
+class StageTimer:
+    """One timed ingest stage; set ``rows`` and ``bytes`` once they are known."""
+
+    __slots__ = ("stage", "rows", "bytes", "seconds")
+
+    def __init__(self, stage: str, rows: int = 0, nbytes: int = 0, seconds: float = 0.0):
+        self.stage = stage
+        self.rows = rows
+        self.bytes = nbytes
+        self.seconds = seconds
+
+
+# Stages timed inside capture_stages are collected here instead of recorded
+_capture = threading.local()
+
+
+def record_stage(stage: str, seconds: float, rows: int = 0, nbytes: int = 0,
+                 registry: MetricsRegistry = METRICS) -> None:
+    """Record a finished ingest stage, or collect it if called under :func:`capture_stages`."""
+    captured = getattr(_capture, "stages", None)
+    if captured is not None:
+        captured.append((stage, rows, nbytes, seconds))
+        return
+    registry.observe("ingest_stage_duration_seconds", seconds, stage=stage)
+    if rows:
+        registry.inc("ingest_stage_rows_total", rows, stage=stage)
+    if nbytes:
+        registry.inc("ingest_stage_bytes_total", nbytes, stage=stage)
+    if seconds > 0:
+        if rows:
+            registry.set("ingest_stage_rows_per_second", rows / seconds, stage=stage)
+        if nbytes:
+            registry.set("ingest_stage_bytes_per_second", nbytes / seconds, stage=stage)
+
+
+@contextmanager
+def ingest_stage(stage: str, rows: int = 0, nbytes: int = 0) -> Iterator[StageTimer]:
+    """
+    Time one ingest stage.
+
+    The stage is recorded when the block exits, including on errors::
+
+        with ingest_stage("parse", nbytes=size) as timer:
+            df = pd.read_csv(path)
+            timer.rows = len(df)
+
+    Args:
+        stage (str): One of ``STAGES``
+        rows (int): Rows processed, if known up front
+        nbytes (int): Bytes processed, if known up front
+
+    Yields:
+        StageTimer: Timer whose ``rows`` and ``bytes`` may be updated in the block
+    """
+    timer = StageTimer(stage, rows, nbytes)
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.seconds = time.perf_counter() - start
+        record_stage(timer.stage, timer.seconds, timer.rows, timer.bytes)
+
+
+def capture_stages(func: Callable[..., Any], *args, **kwargs) -> Tuple[Any, List[Tuple[str, int, int, float]]]:
+    """
+    Call ``func`` and return its result with the stages it timed.
+
+    Parser processes have their own registry, so work sent to them is
+    wrapped in this and the stages are recorded by the caller with
+    :func:`record_stages`.
+    """
+    outer = getattr(_capture, "stages", None)
+    _capture.stages = []
+    try:
+        result = func(*args, **kwargs)
+        return result, _capture.stages
+    finally:
+        _capture.stages = outer
+
+
+def record_stages(stages: Sequence[Tuple[str, int, int, float]]) -> None:
+    """Record stages returned by :func:`capture_stages`."""
+    for stage, rows, nbytes, seconds in stages:
+        record_stage(stage, seconds, rows, nbytes)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the stacks of all threads.
+
+    A daemon thread reads ``sys._current_frames()`` every interval and
+    counts each distinct stack, so the overhead is independent of how much
+    Python code runs and nothing is installed on the profiled threads.
+    """
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.interval = PROFILER_INTERVAL_MS / 1000.0
+        self.started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms: Optional[float] = None, reset: bool = True) -> None:
+        """Start sampling every ``interval_ms`` milliseconds; no-op if already running."""
+        with self._lock:
+            if self.running:
+                return
+            if interval_ms is not None:
+                self.interval = max(interval_ms, PROFILER_MIN_INTERVAL_MS) / 1000.0
+            if reset:
+                self.stacks = Counter()
+                self.samples = 0
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            sampled = []
+            for thread_id, frame in frames.items():
+                if thread_id == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < PROFILER_MAX_DEPTH:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                sampled.append(";".join(reversed(stack)))
+            with self._lock:
+                self.stacks.update(sampled)
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        """Sampled stacks in collapsed format, one ``frame;frame;... count`` line each."""
+        with self._lock:
+            stacks = self.stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "running": self.running,
+                "interval_ms": self.interval * 1000.0,
+                "samples": self.samples,
+                "distinct_stacks": len(self.stacks),
+                "started_at": self.started_at,
+            }
+
+
+PROFILER = SamplingProfiler()
+
+
+def render_stats() -> str:
+    """Every metric of the process in the Prometheus text format."""
+    lines = METRICS.render()
+    for kind, text in (("gauge", "entries"), ("gauge", "bytes"), ("counter", "hits"), ("counter", "misses")):
+        name = f"cache_{text}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# HELP {name} Cache {text}.")
+        lines.append(f"# TYPE {name} {kind}")
+        for cache_name, cache in (("dataset", DATASET_CACHE), ("response", RESPONSE_CACHE)):
+            lines.append(f'{name}{{cache="{cache_name}"}} {cache.stats()[text]}')
+    status = PROFILER.status()
+    lines.append("# HELP profiler_running Whether the sampling profiler is running.")
+    lines.append("# TYPE profiler_running gauge")
+    lines.append(f"profiler_running {int(status['running'])}")
+    lines.append("# HELP profiler_samples_total Samples taken by the sampling profiler.")
+    lines.append("# TYPE profiler_samples_total counter")
+    lines.append(f"profiler_samples_total {status['samples']}")
+    return "\n".join(lines) + "\n"
+
+
+def check_token(request: Request, x_internal_token: Optional[str] = Header(None)) -> None:
+    """
+    Guard the /internal endpoints.
+
+    With ``INTERNAL_TOKEN`` set, the X-Internal-Token header must match it
+    (compared in constant time). Without it, only loopback clients are
+    served; behind a reverse proxy on the same host, set a token instead.
+    """
+    if INTERNAL_TOKEN:
+        if x_internal_token is None or not hmac.compare_digest(x_internal_token, INTERNAL_TOKEN):
+            raise HTTPException(status_code=403, detail="Invalid internal token")
+        return
+    host = request.client.host if request.client else None
+    if host not in LOOPBACK_HOSTS:
+        raise HTTPException(status_code=403, detail="Internal endpoints are only served to localhost")
+
+
+# Shared by every server; mounted with app.include_router
+router = APIRouter(prefix="/internal", dependencies=[Depends(check_token)])
+
+
+@router.get("/stats")
+def get_stats():
+    """Request, ingest and cache metrics in the Prometheus text format"""
+    return PlainTextResponse(render_stats(), media_type=CONTENT_TYPE)
+
+
+@router.get("/profiler")
+def get_profile():
+    """Collapsed stacks sampled so far, ready for a flame graph"""
+    return PlainTextResponse(PROFILER.collapsed())
+
+
+@router.get("/profiler/status")
+def get_profiler_status():
+    return PROFILER.status()
+
+
+@router.post("/profiler/start")
+def start_profiler(
+    interval_ms: Optional[float] = Query(None, ge=PROFILER_MIN_INTERVAL_MS, le=1000),
+    reset: bool = True
+):
+    """Start the sampling profiler; ``reset=false`` keeps earlier samples"""
+    PROFILER.start(interval_ms, reset)
+    return PROFILER.status()
+
+
+@router.post("/profiler/stop")
+def stop_profiler():
+    PROFILER.stop()
+    return PROFILER.status()
@@ -0,0 +1,306 @@
+"""
+Append-only store of per-run metric rollups.
+
+Every export is ingested once into a small JSON rollup partitioned by agent
+and run date::
+
+    <WAREHOUSE_DIR>/agent=<agent>/date=<YYYY-MM-DD>/<dataset_id>.json
+
+Rollups hold mergeable :class:`RunningStats`, so trends over months of runs
+are served from these files and days are combined without re-reading CSV.
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .aggregation import MetricAccumulator, RunningStats
+from .registry import dataset_id_for
+
+WAREHOUSE_DIR = os.environ.get(
+    "WAREHOUSE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "warehouse")
+)
+
+# e.g. "..._DSB_WorkloadRCAAgent_quality_quality_en_20251224-055849_Output_Table_..."
+EXPORT_NAME = re.compile(r"([A-Za-z0-9]+)_quality_.*?(\d{8}-\d{6})")
+
+# Agent names given explicitly; they also name a partition directory
+AGENT_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]*")
+
+ROLLUP_SUFFIX = ".json"
+
+# Append-only log of every export name and the run it was ingested as
+NAMES_LOG = "filenames.jsonl"
+
+
+def parse_export_name(filename: str) -> Tuple[Optional[str], Optional[datetime]]:
+    """
+    Extract the agent name and run timestamp from an export filename.
+
+    Args:
+        filename (str): Export name, e.g.
+            ``DSB_WorkloadRCAAgent_quality_quality_en_20251224-055849.csv``
+
+    Returns:
+        Tuple[Optional[str], Optional[datetime]]: Agent and run time, None
+            for whichever the name does not carry
+    """
+    match = EXPORT_NAME.search(os.path.basename(filename))
+    if match is None:
+        return None, None
+    try:
+        return match.group(1), datetime.strptime(match.group(2), "%Y%m%d-%H%M%S")
+    except ValueError:
+        return match.group(1), None
+
+
+def resolve_run(filename: str, agent: Optional[str] = None,
+                run_at: Optional[datetime] = None) -> Tuple[str, datetime]:
+    """
+    Agent and run time a rollup is filed under.
+
+    Values given explicitly win over those parsed from the export name.
+
+    Args:
+        filename (str): Export name
+        agent (Optional[str]): Agent, required if the name does not carry one
+        run_at (Optional[datetime]): Run time, required if the name does not carry one
+
+    Returns:
+        Tuple[str, datetime]: Agent and naive run time
+
+    Raises:
+        ValueError: If the agent or run time is neither given nor in the name,
+            or the agent is not a valid partition name
+    """
+    named_agent, named_run_at = parse_export_name(filename)
+    agent = agent or named_agent
+    run_at = run_at or named_run_at
+    missing = [field for field, value in (("agent", agent), ("run_at", run_at)) if value is None]
+    if missing:
+        raise ValueError(f"{filename} does not name its {' and '.join(missing)}; "
+                         f"pass {', '.join(missing)} with the upload")
+    if not AGENT_NAME.fullmatch(agent):
+        raise ValueError(f"Invalid agent name: {agent}")
+    if run_at.tzinfo is not None:
+        # Names carry naive timestamps; aware ones are compared in UTC
+        run_at = run_at.astimezone(timezone.utc).replace(tzinfo=None)
+    return agent, run_at
+
+
+def _stats_from_dict(data: Dict[str, Any]) -> RunningStats:
+    return RunningStats(**{field: data[field] for field in RunningStats.__slots__})
+
+
+def _stats_to_dict(stats: RunningStats) -> Dict[str, Any]:
+    return {field: getattr(stats, field) for field in RunningStats.__slots__}
+
+
+def trend_metrics(accumulator: MetricAccumulator) -> Dict[str, Dict[str, float]]:
+    """Pass rate, counts and mean score per metric of a run or day."""
+    return {
+        key: {
+            "pass_rate": stats.passed / stats.total if stats.total else 0.0,
+            "passed": stats.passed,
+            "total": stats.total,
+            "scored": stats.count,
+            "mean": stats.to_dict()["mean"],
+        }
+        for key, stats in accumulator.stats.items()
+    }
+
+
+class Warehouse:
+    """Append-only rollups of every ingested run, indexed in memory."""
+
+    def __init__(self, root: str = WAREHOUSE_DIR):
+        self.root = root
+        self._rollups: Optional[Dict[str, Dict[str, Any]]] = None
+        self._names: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        # Scan the partitions once; later ingests are added to the index directly
+        if self._rollups is None:
+            rollups = {}
+            for directory, _, names in os.walk(self.root):
+                for name in names:
+                    if not name.endswith(ROLLUP_SUFFIX):
+                        continue
+                    try:
+                        with open(os.path.join(directory, name), "r", encoding="utf-8") as f:
+                            rollup = json.load(f)
+                        rollups[rollup["dataset_id"]] = rollup
+                    except (OSError, ValueError, KeyError) as e:
+                        print(f"Ignoring unreadable rollup {name}: {e}")
+            self._rollups = rollups
+            self._names = {}
+            names_path = os.path.join(self.root, NAMES_LOG)
+            if os.path.exists(names_path):
+                with open(names_path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                            self._names[entry["filename"]] = entry["dataset_id"]
+                        except (ValueError, KeyError):
+                            continue
+        return self._rollups
+
+    def _record_name(self, filename: str, dataset_id: str) -> None:
+        # Caller holds the lock
+        if self._names.get(filename) == dataset_id:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, NAMES_LOG), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"filename": filename, "dataset_id": dataset_id}) + "\n")
+        self._names[filename] = dataset_id
+
+    def partition_path(self, agent: str, run_at: datetime, dataset_id: str) -> str:
+        return os.path.join(self.root, f"agent={agent}", f"date={run_at.date().isoformat()}",
+                            dataset_id + ROLLUP_SUFFIX)
+
+    @property
+    def revision(self) -> int:
+        """Number of stored runs; grows with every new rollup."""
+        with self._lock:
+            return len(self._load())
+
+    def __contains__(self, dataset_id: str) -> bool:
+        with self._lock:
+            return dataset_id in self._load()
+
+    def filenames(self) -> set:
+        """Every export name a stored run has been ingested under."""
+        with self._lock:
+            self._load()
+            return set(self._names)
+
+    def ingest(self, dataset, filename: str, agent: Optional[str] = None,
+               run_at: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Roll up a parsed export and append it to its partition.
+
+        Content already in the warehouse is not rolled up again; only the new
+        filename is logged so that :meth:`backfill` skips it.
+
+        Args:
+            dataset (EvaluationDataset): Parsed export; ``version`` is its content hash
+            filename (str): Name the export was uploaded under
+            agent (Optional[str]): Agent, if the name does not carry it
+            run_at (Optional[datetime]): Run time, if the name does not carry it
+
+        Returns:
+            Dict[str, Any]: The run's rollup
+
+        Raises:
+            ValueError: If the agent or run time is unknown, see :func:`resolve_run`
+        """
+        agent, run_at = resolve_run(filename, agent, run_at)
+        dataset_id = dataset_id_for(dataset.version)
+        with self._lock:
+            rollups = self._load()
+            rollup = rollups.get(dataset_id)
+            if rollup is not None:
+                self._record_name(filename, dataset_id)
+                return rollup
+
+        accumulator = MetricAccumulator().update_dataset(dataset)
+        rollup = {
+            "dataset_id": dataset_id,
+            "agent": agent,
+            "run_at": run_at.isoformat(),
+            "filename": filename,
+            "rows": len(dataset),
+            "ingested_at": datetime.now().isoformat(),
+            "metrics": {key: _stats_to_dict(stats) for key, stats in accumulator.stats.items()},
+        }
+
+        path = self.partition_path(agent, run_at, dataset_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        part_path = path + ".part"
+        with open(part_path, "w", encoding="utf-8") as f:
+            json.dump(rollup, f)
+        os.replace(part_path, path)
+
+        with self._lock:
+            self._load()[dataset_id] = rollup
+            self._record_name(filename, dataset_id)
+        print(f"Ingested run {dataset_id} of {agent} at {run_at.isoformat()} into the warehouse")
+        return rollup
+
+    def backfill(self, paths: Iterable[str], load) -> int:
+        """
+        Ingest local exports whose names have not been seen yet.
+
+        Files whose names carry no agent and run time are skipped.
+
+        Args:
+            paths (Iterable[str]): Export files
+            load (Callable[[str, str], EvaluationDataset]): Parses ``(path, filename)``
+
+        Returns:
+            int: Number of exports parsed
+        """
+        known = self.filenames()
+        parsed = 0
+        for path in paths:
+            filename = os.path.basename(path)
+            if filename in known or parse_export_name(filename)[1] is None:
+                continue
+            try:
+                self.ingest(load(path, filename), filename)
+                parsed += 1
+            except Exception as e:
+                print(f"Could not ingest {filename}: {e}")
+        return parsed
+
+    def trends(self, agent: Optional[str] = None, metric: Optional[str] = None,
+               start: Optional[datetime] = None, end: Optional[datetime] = None,
+               granularity: str = "run") -> List[Dict[str, Any]]:
+        """
+        Per-metric pass rates over time from the stored rollups.
+
+        Args:
+            agent (Optional[str]): Only runs of this agent
+            metric (Optional[str]): Only this metric key
+            start (Optional[datetime]): Earliest run time, inclusive
+            end (Optional[datetime]): Latest run time, inclusive
+            granularity (str): ``"run"`` for one point per run, ``"day"`` to
+                merge the runs of each agent and date
+
+        Returns:
+            List[Dict[str, Any]]: Points ordered by time
+        """
+        with self._lock:
+            rollups = list(self._load().values())
+
+        points: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for rollup in rollups:
+            run_at = datetime.fromisoformat(rollup["run_at"])
+            if (agent is not None and rollup["agent"] != agent) or \
+                    (start is not None and run_at < start) or (end is not None and run_at > end):
+                continue
+
+            accumulator = MetricAccumulator()
+            for key, stats in rollup["metrics"].items():
+                if metric is None or key == metric:
+                    accumulator.stats[key] = _stats_from_dict(stats)
+
+            key = (rollup["agent"], run_at.date().isoformat() if granularity == "day" else rollup["run_at"])
+            point = points.get(key)
+            if point is None:
+                points[key] = {"agent": rollup["agent"], "time": key[1], "runs": [rollup["dataset_id"]],
+                               "rows": rollup["rows"], "accumulator": accumulator}
+            else:
+                point["runs"].append(rollup["dataset_id"])
+                point["rows"] += rollup["rows"]
+                point["accumulator"].merge(accumulator)
+
+        return [
+            {**{k: v for k, v in point.items() if k != "accumulator"},
+             "metrics": trend_metrics(point["accumulator"])}
+            for point in sorted(points.values(), key=lambda p: (p["time"], p["agent"]))
+        ]
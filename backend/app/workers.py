@@ -0,0 +1,76 @@
+"""
+Executors that keep blocking work off the event loop.
+
+Storage I/O runs on the threadpool shared with FastAPI's sync endpoints.
+CPU-bound parsing runs in a process pool so it does not hold the GIL while
+other requests are served.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+# Parser processes; 0 parses on the threadpool instead
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the shared parser pool, starting it on first use."""
+    global _process_pool
+    if PARSE_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+        return _process_pool
+
+
+def shutdown_process_pool(wait: bool = True) -> None:
+    """Stop the parser pool; waiting lets idle workers exit instead of being orphaned."""
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=wait, cancel_futures=True)
+            _process_pool = None
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run blocking storage or file I/O on the threadpool."""
+    return await run_in_threadpool(func, *args, **kwargs)
+
+
+async def run_cpu(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run CPU-bound work in the parser process pool.
+
+    ``func`` and its arguments must be picklable, i.e. module-level
+    functions and plain data. Falls back to the threadpool when no pool is
+    configured or a worker died.
+
+    Args:
+        func (Callable[..., Any]): Module-level function to call
+        *args: Positional arguments for ``func``
+        **kwargs: Keyword arguments for ``func``
+
+    Returns:
+        Any: Return value of ``func``
+    """
+    pool = get_process_pool()
+    if pool is None:
+        return await run_in_threadpool(func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, functools.partial(func, *args, **kwargs))
+    except BrokenProcessPool:
+        print("Parser process pool broke; parsing on the threadpool")
+        shutdown_process_pool(wait=False)
+        return await run_in_threadpool(func, *args, **kwargs)
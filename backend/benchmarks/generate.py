@@ -0,0 +1,219 @@
+"""
+Synthetic evaluation exports for benchmarking.
+
+Rows follow the schema of the real quality exports: conversation ids, the
+conversation JSON in ``inputs.query`` and ``inputs.response``, tool
+definitions, the tools used, and a ``result``/``reason`` pair for each of
+the seven evaluators. Text is drawn from small template pools so prompts and
+reasons repeat and vary the way judge output does. ``--unique-reasons``
+replaces that share of failure reasons with free-form text that is almost
+never repeated, as long judge explanations are in practice.
+
+Usage::
+
+    python -m benchmarks.generate --rows 100000 --output /tmp/export.csv
+    python -m benchmarks.generate --rows 100000 --unique-reasons 0.9 --output /tmp/unique.csv
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import string
+from typing import Iterator, List, Optional
+
+# Evaluator prefixes in column order, as written by the evaluation pipeline
+EVALUATORS = [
+    "intent_resolution",
+    "coherence",
+    "relevance",
+    "groundedness",
+    "tool_call_accuracy",
+    "task_adherence",
+    "fluency",
+]
+
+COLUMNS = (
+    ["index", "inputs.conversation_id", "inputs.query", "inputs.response",
+     "inputs.tool_definitions", "inputs.tools_used", "Passed"]
+    + [f"{e}.{e}.{field}" for e in EVALUATORS for field in ("result", "reason")]
+    + ["rating", "index.1", "rating.1"]
+)
+
+# Share of evaluator results that fail
+FAIL_RATE = 0.2
+
+SYSTEM_PROMPT = (
+    "# **Role:** You are a **Workloads RCA Agent** who can help provide the **blast radius** and "
+    "**reason for impact (RCA)** for workloads impacted by an Azure outage. Extract the resource, "
+    "region and time from the user input and call the tools with programmatic region names."
+)
+
+TOOLS = [
+    {"name": "WorkloadRCAAgent", "description": SYSTEM_PROMPT,
+     "parameters": {"type": "object", "properties": {"query": {"type": "string"}}}},
+    {"name": "fetch_workload_rca_details", "description": "Fetch blast radius and reason for impact details.",
+     "parameters": {"type": "object", "properties": {
+         "resource_id": {"type": "string"}, "region": {"type": "string"}, "time": {"type": "string"}}}},
+]
+
+REGIONS = ["eastus", "westeurope", "southcentralus", "northeurope", "ussouth", "europenorth", "japaneast"]
+
+PROMPTS = [
+    "Summarize the number of impacted systems grouped by WVI in {region} around {time}.",
+    "What is the complete blast radius of /subscriptions/{sub}/resourceGroups/rg-{word}/providers/"
+    "Microsoft.Compute/virtualMachines/vm-{word} impacted at {time}?",
+    "Why was workload {word} impacted in {region} on {time}? Give the reason for impact.",
+    "List every resource affected by the outage in {region} near {time} with its current health.",
+]
+
+ANSWERS = [
+    "The outage in {region} impacted {count} systems across {groups} workload groups. The primary cause "
+    "was a storage cluster failover that degraded dependent virtual machines.",
+    "| Resource | Type | Region | Health |\n|---|---|---|---|\n| vm-{word} | Virtual machine | {region} | Degraded |",
+    "Workload {word} was impacted because its dependency in {region} lost connectivity during a network "
+    "maintenance event at {time}.",
+]
+
+PASS_REASONS = [
+    "The RESPONSE is coherent, logically organized, and directly addresses the QUERY with clear connections.",
+    "The response fully addresses the user's query by providing a detailed blast radius and reason for impact.",
+    "The assistant correctly followed the predefined steps for extraction and tool usage.",
+    "The RESPONSE demonstrates competent fluency with clear communication and logical organization.",
+]
+
+FAIL_REASONS = [
+    "Let's think step by step: the region parameter was not converted to the Azure programmatic name "
+    "('{region}' should have been converted), so the tool call failed to retrieve the required information.",
+    "The response hallucinated a tool result for {word} that does not appear in any tool output.",
+    "The agent made an unnecessary duplicate call to WorkloadRCAAgent and never retried after the error.",
+    "The RESPONSE omits the reason for impact and only partially answers the QUERY about {region}.",
+]
+
+
+# Phrases free-form reasons are assembled from
+REASON_OPENINGS = ["The response", "The agent", "The assistant", "The tool call", "The RESPONSE", "The answer"]
+REASON_PHRASES = [
+    "did not convert the region {region}", "omitted the blast radius for {word}",
+    "called fetch_workload_rca_details with {word} instead of the resource id",
+    "repeated the system prompt", "ignored the time window around {time}",
+    "listed {count} resources without their health", "never retried after the tool error",
+    "invented a dependency named {word}", "answered a different question about {region}",
+    "mixed up workload groups {groups} and {count}", "cited a tool output that does not exist",
+]
+
+
+def _free_reason(rng: random.Random) -> str:
+    """A failure explanation unlikely to repeat: several phrases and fresh identifiers."""
+    phrases = [_fill(phrase, rng) for phrase in rng.sample(REASON_PHRASES, rng.randint(2, 4))]
+    return f"{rng.choice(REASON_OPENINGS)} {', then '.join(phrases)}; see case {_word(rng)}{rng.randint(0, 99999)}."
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=6))
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        region=rng.choice(REGIONS),
+        time=f"2025-12-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00Z",
+        sub="8d52cb5d-c5bb-4273-b81d-bb0da5ff6e8e",
+        word=_word(rng),
+        count=rng.randint(1, 500),
+        groups=rng.randint(1, 12),
+    )
+
+
+def generate_rows(rows: int, seed: int = 0, unique_reasons: float = 0.0) -> Iterator[List[str]]:
+    """
+    Yield synthetic export rows in ``COLUMNS`` order.
+
+    Args:
+        rows (int): Number of rows
+        seed (int): Seed; the same seed always yields the same export
+        unique_reasons (float): Share of failure reasons written as free-form text
+
+    Yields:
+        List[str]: One CSV row
+    """
+    rng = random.Random(seed)
+    tool_definitions = json.dumps(TOOLS, separators=(",", ":"))
+    # A bounded pool of prompts repeats the way reruns of a test set do
+    prompt_pool = [_fill(rng.choice(PROMPTS), rng) for _ in range(min(max(rows // 10, 1), 5000))]
+
+    for index in range(1, rows + 1):
+        prompt = rng.choice(prompt_pool)
+        query = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": [{"type": "text", "text": prompt}]},
+        ]
+        response = [
+            {"createdAt": "2025-12-24T05:58:50.896429Z", "run_id": f"run_0_{index}", "role": "assistant",
+             "content": [{"type": "tool_call", "tool_call_id": f"call_{index:08x}",
+                          "name": "fetch_workload_rca_details", "arguments": {"region": rng.choice(REGIONS)}}]},
+            {"role": "assistant", "content": [{"type": "text", "text": _fill(rng.choice(ANSWERS), rng)}]},
+        ]
+
+        evaluations: List[str] = []
+        passed = 0
+        for _ in EVALUATORS:
+            if rng.random() < FAIL_RATE:
+                free = unique_reasons and rng.random() < unique_reasons
+                evaluations += ["Fail", _free_reason(rng) if free else _fill(rng.choice(FAIL_REASONS), rng)]
+            else:
+                evaluations += ["Pass", rng.choice(PASS_REASONS)]
+                passed += 1
+
+        yield (
+            [str(index), f"{_word(rng)}{index:010d}-us", json.dumps(query, separators=(",", ":")),
+             json.dumps(response, separators=(",", ":")), tool_definitions,
+             json.dumps(["WorkloadRCAAgent", "fetch_workload_rca_details"]), f"{passed}/{len(EVALUATORS)}"]
+            + evaluations
+            + ["-", str(index), "-"]
+        )
+
+
+def write_export(path: str, rows: int, seed: int = 0, unique_reasons: float = 0.0) -> str:
+    """Write a synthetic export of ``rows`` rows to ``path``, streaming row by row."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    part_path = path + ".part"
+    with open(part_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        writer.writerows(generate_rows(rows, seed, unique_reasons))
+    os.replace(part_path, path)
+    return path
+
+
+def export_path(directory: str, rows: int, seed: int = 0, unique_reasons: float = 0.0) -> str:
+    """Path of a cached export; names follow the real ``<agent>_quality_..._<run>`` scheme."""
+    suffix = f"_u{unique_reasons:g}" if unique_reasons else ""
+    return os.path.join(directory,
+                        f"Bench-DSB_SyntheticAgent_quality_quality_en_20250101-000000_{rows}_{seed}{suffix}.csv")
+
+
+def cached_export(directory: str, rows: int, seed: int = 0, unique_reasons: float = 0.0) -> str:
+    """Return a synthetic export of ``rows`` rows, generating it on first use."""
+    path = export_path(directory, rows, seed, unique_reasons)
+    if not os.path.exists(path):
+        write_export(path, rows, seed, unique_reasons)
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic evaluation export")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--unique-reasons", type=float, default=0.0,
+                        help="Share of failure reasons written as free-form text, 0 to 1")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args(argv)
+    write_export(args.output, args.rows, args.seed, args.unique_reasons)
+    print(f"Wrote {args.rows} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Benchmark suite for ingest and the dashboard endpoints.
+
+Every (target, size) pair runs in a fresh worker process against a
+synthetic export from :mod:`benchmarks.generate`, so peak memory is that
+pair's own and no cache survives from one measurement to the next. Targets:
+
+* ``ingest`` - parsing an export with ``server.parse_dataset_file``,
+  ``app.parser.load_dataset`` and ``EvaluationDataset.from_dataframe``, and
+  clustering the failure reasons of every metric
+* ``server``, ``server_azure``, ``main`` - an upload followed by ``/runs``
+  and the drilldown endpoints, through an in-process test client
+
+Each step records its first ("cold") call and the median of the repeated
+("warm") calls. Results go to a JSON file that ``--compare`` diffs against
+another run, e.g. from the previous commit::
+
+    python -m benchmarks.run --sizes 1000,10000,100000 --output bench_results.json
+    python -m benchmarks.run --compare baseline.json bench_results.json
+
+``--unique-reasons 0.9`` runs against exports whose failure reasons are
+mostly free-form text instead of a few templates.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .generate import cached_export
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = ["ingest", "server", "server_azure", "main"]
+DEFAULT_SIZES = [1000, 10000]
+DEFAULT_REPEAT = 5
+
+# Metric every drilldown step reads; present in every export
+DRILLDOWN_METRIC = "coherence"
+PAGE_SIZE = 50
+
+# Regressions beyond this ratio of the baseline are flagged by --compare
+REGRESSION_RATIO = 1.2
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(call: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Time a first call and ``repeat`` further calls of ``call``."""
+    start = time.perf_counter()
+    call()
+    cold = time.perf_counter() - start
+    warm = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        warm.append(time.perf_counter() - start)
+    return {
+        "cold_s": cold,
+        "warm_median_s": statistics.median(warm) if warm else None,
+        "warm_min_s": min(warm) if warm else None,
+    }
+
+
+def _checked(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.url} returned {response.status_code}: {response.text[:200]}")
+    return response
+
+
+def _upload(client, path: str, route: str) -> Callable[[], Any]:
+    def call():
+        with open(path, "rb") as f:
+            return _checked(client.post(route, files={"file": (os.path.basename(path), f, "text/csv")}))
+    return call
+
+
+def _get(client, route: str) -> Callable[[], Any]:
+    return lambda: _checked(client.get(route))
+
+
+def bench_ingest(path: str, repeat: int) -> Dict[str, Dict[str, Any]]:
+    import pandas as pd
+    import server
+    from app.clusters import cluster_failures
+    from app.dataset import EvaluationDataset
+    from app.parser import load_dataset
+
+    filename = os.path.basename(path)
+    dataset = EvaluationDataset.from_dataframe(pd.read_csv(path), filename, "")
+    return {
+        "server.parse_dataset_file": measure(lambda: server.parse_dataset_file(path), repeat),
+        "parser.load_dataset": measure(lambda: load_dataset(path), repeat),
+        "read_csv": measure(lambda: pd.read_csv(path), repeat),
+        "EvaluationDataset.from_dataframe": measure(
+            lambda: EvaluationDataset.from_dataframe(pd.read_csv(path), filename, ""), repeat),
+        "cluster_failures": measure(lambda: [cluster_failures(dataset, metric) for metric in dataset.metrics], repeat),
+    }
+
+
+def bench_app(module: str, path: str, repeat: int) -> Dict[str, Dict[str, Any]]:
+    import importlib
+    from fastapi.testclient import TestClient
+
+    app = importlib.import_module(module).app
+    drilldown = f"/runs/all/metrics/{DRILLDOWN_METRIC}"
+    if module == "server":
+        upload, reads = "/upload", {
+            "runs": "/runs",
+            "metrics": "/metrics",
+            "run": "/runs/run_unknown",
+        }
+    else:
+        upload, reads = "/upload-dataset", {
+            "runs": "/runs",
+            "drilldown": drilldown,
+            "drilldown_page": f"{drilldown}?limit={PAGE_SIZE}",
+            "drilldown_page_preview": f"{drilldown}?limit={PAGE_SIZE}&fields=promptId,passed,reason&preview_chars=200",
+        }
+        if module == "server_azure":
+            reads["clusters"] = f"{drilldown}/clusters"
+
+    results = {}
+    with TestClient(app) as client:
+        # Repeated uploads of the same content are timed too; server_azure
+        # answers them from its content store
+        results["upload"] = measure(_upload(client, path, upload), repeat)
+        for name, route in reads.items():
+            results[name] = measure(_get(client, route), repeat)
+    return results
+
+
+def run_worker(target: str, rows: int, path: str, repeat: int) -> Dict[str, Any]:
+    """Run one target in the current process; called in a fresh worker."""
+    start = time.perf_counter()
+    if target == "ingest":
+        steps = bench_ingest(path, repeat)
+    else:
+        steps = bench_app("app.main" if target == "main" else target, path, repeat)
+    return {
+        "target": target,
+        "rows": rows,
+        "file_bytes": os.path.getsize(path),
+        "total_s": time.perf_counter() - start,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "steps": steps,
+    }
+
+
+def spawn_worker(target: str, rows: int, path: str, repeat: int, scratch: str) -> Dict[str, Any]:
+    """Benchmark one target in a child process with isolated state directories."""
+    result_path = os.path.join(scratch, f"{target}_{rows}.json")
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+        "STORAGE_BACKEND": "memory",
+        "WAREHOUSE_DIR": tempfile.mkdtemp(prefix="warehouse_", dir=scratch),
+        "SIDECAR_DIR": tempfile.mkdtemp(prefix="sidecar_", dir=scratch),
+    })
+    command = [sys.executable, "-m", "benchmarks.run", "--worker", target,
+               "--rows", str(rows), "--export", path, "--repeat", str(repeat), "--output", result_path]
+    completed = subprocess.run(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.PIPE, text=True)
+    if completed.returncode != 0:
+        return {"target": target, "rows": rows, "error": completed.stderr.strip().splitlines()[-1:]}
+    with open(result_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """Machine and commit the results were measured on."""
+    return {
+        "commit": git_revision(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_suite(sizes: List[int], targets: List[str], repeat: int, export_dir: str,
+              unique_reasons: float = 0.0) -> Dict[str, Any]:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_") as scratch:
+        for rows in sizes:
+            path = cached_export(export_dir, rows, unique_reasons=unique_reasons)
+            for target in targets:
+                print(f"Benchmarking {target} at {rows} rows")
+                result = spawn_worker(target, rows, path, repeat, scratch)
+                if "error" in result:
+                    print(f"  failed: {result['error']}")
+                else:
+                    print(f"  {result['total_s']:.2f}s, peak RSS {result['peak_rss_bytes'] / 2**20:.0f} MB")
+                results.append(result)
+    return {"environment": environment(), "repeat": repeat, "unique_reasons": unique_reasons, "results": results}
+
+
+def _step_times(report: Dict[str, Any]) -> Dict[tuple, float]:
+    times = {}
+    for result in report["results"]:
+        for step, timing in result.get("steps", {}).items():
+            times[(result["target"], result["rows"], step)] = timing["warm_median_s"] or timing["cold_s"]
+    return times
+
+
+def compare(baseline_path: str, current_path: str) -> int:
+    """Print warm timings of two result files side by side; returns the regression count."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = _step_times(json.load(f))
+    with open(current_path, "r", encoding="utf-8") as f:
+        current = _step_times(json.load(f))
+
+    regressions = 0
+    print(f"{'target':<14}{'rows':>9}  {'step':<34}{'before':>10}{'after':>10}{'ratio':>8}")
+    for key in sorted(set(baseline) & set(current)):
+        before, after = baseline[key], current[key]
+        ratio = after / before if before else float("inf")
+        flag = " !" if ratio > REGRESSION_RATIO else ""
+        regressions += bool(flag)
+        print(f"{key[0]:<14}{key[1]:>9}  {key[2]:<34}{before:>10.4f}{after:>10.4f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark ingest and the dashboard endpoints")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="Comma-separated export sizes in rows, e.g. 1000,100000,1000000")
+    parser.add_argument("--targets", default=",".join(TARGETS))
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--export-dir", default=os.path.join(tempfile.gettempdir(), "quality_bench_exports"),
+                        help="Where generated exports are kept between runs")
+    parser.add_argument("--unique-reasons", type=float, default=0.0,
+                        help="Share of failure reasons written as free-form text, 0 to 1")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"))
+    parser.add_argument("--worker", choices=TARGETS, help=argparse.SUPPRESS)
+    parser.add_argument("--rows", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--export", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+
+    if args.worker:
+        result = run_worker(args.worker, args.rows, args.export, args.repeat)
+    else:
+        targets = [t for t in args.targets.split(",") if t]
+        unknown = set(targets) - set(TARGETS)
+        if unknown:
+            parser.error(f"unknown targets: {', '.join(sorted(unknown))}")
+        sizes = [int(s) for s in args.sizes.split(",") if s]
+        result = run_suite(sizes, targets, args.repeat, args.export_dir, args.unique_reasons)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    if not args.worker:
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
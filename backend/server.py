@@ -4,18 +4,31 @@ Azure-optimized FastAPI server for AI Quality Dashboard
 """
 
 import csv
-import json
 import os
 import tempfile
 import shutil
 from datetime import datetime
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+import numpy as np
 import pandas as pd
 from typing import Optional
 
+from app.aggregation import aggregate, pass_mask
+from app.cache import DATASET_CACHE
+from app.conversation import extract_user_message
+from app.http_cache import ConditionalResponseMiddleware, cached_json_response, file_version
+from app.ingest import UploadStream
+from app.registry import DEFAULT_DATASET_ID, DatasetRegistry, dataset_id_for
+from app.telemetry import RequestMetricsMiddleware, capture_stages, ingest_stage, record_stages
+from app.telemetry import router as internal_router
+from app.workers import run_cpu, run_io
+
 app = FastAPI(title="AI Quality Dashboard API")
 
+# ETags, 304s and compression; added before CORS so 304s carry CORS headers
+app.add_middleware(ConditionalResponseMiddleware, version_for=lambda request: response_version(request))
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -25,34 +38,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def extract_user_message(query_str):
-    """Extract user message from JSON query string"""
-    try:
-        if not query_str:
-            return ""
-        
-        # Parse the JSON string
-        query_obj = json.loads(query_str)
-        
-        # Look for user role content
-        if isinstance(query_obj, list):
-            for item in query_obj:
-                if isinstance(item, dict) and item.get('role') == 'user':
-                    content = item.get('content', '')
-                    if isinstance(content, list):
-                        # Extract text from content array
-                        for content_item in content:
-                            if isinstance(content_item, dict) and content_item.get('type') == 'text':
-                                return content_item.get('text', '')
-                    elif isinstance(content, str):
-                        return content
-        
-        # If no user role found, return first 200 chars of original
-        return query_str[:200] + "..." if len(query_str) > 200 else query_str
-        
-    except (json.JSONDecodeError, Exception) as e:
-        # If JSON parsing fails, return first 200 chars
-        return query_str[:200] + "..." if len(query_str) > 200 else query_str
+# Per-route latency and in-flight counts; added last so it also times the middleware above
+app.add_middleware(RequestMetricsMiddleware, routes=app.routes)
+app.include_router(internal_router)
 
 # Default data path - adjusted for Azure
 DEFAULT_CSV_PATH = os.path.join("app", "data", "5Prompts-DSB_WorkloadRCAAgent_quality_quality_en_20251224-055849.csv")
@@ -61,61 +49,56 @@ DEFAULT_CSV_PATH = os.path.join("app", "data", "5Prompts-DSB_WorkloadRCAAgent_qu
 current_dataset_path = DEFAULT_CSV_PATH
 current_dataset_filename = os.path.basename(DEFAULT_CSV_PATH)
 
-def load_csv_data():
-    """Load and parse the CSV data"""
-    global current_dataset_path
-    data = []
-    
-    if not os.path.exists(current_dataset_path):
-        print(f"CSV file not found at {current_dataset_path}")
+# Uploaded datasets by id; parsed rows stay resident in DATASET_CACHE
+DATASETS = DatasetRegistry()
+DATASETS.register(DEFAULT_DATASET_ID, current_dataset_filename, DEFAULT_CSV_PATH)
+
+def dataset_path(dataset_id=None):
+    """Resolve a dataset id to its file, defaulting to the active dataset"""
+    if dataset_id is None:
+        return current_dataset_path
+    entry = DATASETS.get(dataset_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Dataset not found: {dataset_id}")
+    return entry["path"]
+
+def response_version(request):
+    """Version of the dataset file a read endpoint serves, keying its ETag; None if unversioned"""
+    path = request.url.path
+    if path.startswith("/runs") or path == "/metrics":
+        return file_version(dataset_path(request.query_params.get("dataset_id")))
+    return None
+
+def load_csv_data(file_path=None):
+    """Load the parsed CSV data, reusing the cached parse when the file is unchanged"""
+    file_path = file_path or current_dataset_path
+    if not os.path.exists(file_path):
+        print(f"CSV file not found at {file_path}")
         return []
     
     try:
-        # Load the file based on its extension  
-        if current_dataset_path.endswith('.csv'):
-            with open(current_dataset_path, 'r', encoding='utf-8') as file:
-                csv_reader = csv.DictReader(file)
-                for row in csv_reader:
-                    # Extract the relevant data from CSV
-                    query_raw = row.get("inputs.query", "")
-                    user_message = extract_user_message(query_raw)
-                    
-                    run_data = {
-                        "runId": f"run_{row.get('id', 'unknown')}",
-                        "conversation_id": row.get("inputs.conversation_id", ""),
-                        "user_message": user_message,
-                        "agent_response": row.get("inputs.response", "")
-                    }
-                    
-                    # Parse evaluation metrics
-                    metrics = ["intent_resolution", "coherence", "relevance", "groundedness", "tool_call_accuracy", "task_adherence", "fluency"]
-                    
-                    for metric in metrics:
-                        result_key = f"{metric}.{metric}.result"
-                        score_key = f"{metric}.{metric}.score" 
-                        reason_key = f"{metric}.{metric}.reason"
-                        
-                        result = row.get(result_key, "")
-                        score_str = row.get(score_key, "0")
-                        reason = row.get(reason_key, "")
-                        
-                        # Parse score
-                        try:
-                            score = float(score_str) if score_str else 0.0
-                        except ValueError:
-                            score = 0.0
-                        
-                        run_data[f"{metric}_result"] = result
-                        run_data[f"{metric}_score"] = score  
-                        run_data[f"{metric}_reason"] = reason
-                    
-                    data.append(run_data)
-        
-        elif current_dataset_path.endswith(('.xlsx', '.xls')):
-            # Read Excel file
-            df = pd.read_excel(current_dataset_path)
-            for _, row in df.iterrows():
-                # Process Excel data similar to CSV
+        return DATASET_CACHE.get(file_path, parse_dataset_file, kind="server.rows")
+    except Exception as e:
+        print(f"Error loading CSV data: {str(e)}")
+        return []
+
+def parse_dataset_file(file_path):
+    """Read and parse a dataset file into run records"""
+    with ingest_stage("parse", nbytes=os.path.getsize(file_path)) as timer:
+        data = read_run_records(file_path)
+        timer.rows = len(data)
+    return data
+
+def read_run_records(file_path):
+    """Build one run record per row of a CSV or Excel file"""
+    data = []
+    
+    # Load the file based on its extension  
+    if file_path.endswith('.csv'):
+        with open(file_path, 'r', encoding='utf-8') as file:
+            csv_reader = csv.DictReader(file)
+            for row in csv_reader:
+                # Extract the relevant data from CSV
                 query_raw = row.get("inputs.query", "")
                 user_message = extract_user_message(query_raw)
                 
@@ -135,7 +118,7 @@ def load_csv_data():
                     reason_key = f"{metric}.{metric}.reason"
                     
                     result = row.get(result_key, "")
-                    score_str = str(row.get(score_key, "0"))
+                    score_str = row.get(score_key, "0")
                     reason = row.get(reason_key, "")
                     
                     # Parse score
@@ -149,10 +132,45 @@ def load_csv_data():
                     run_data[f"{metric}_reason"] = reason
                 
                 data.append(run_data)
+    
+    elif file_path.endswith(('.xlsx', '.xls')):
+        # Read Excel file
+        df = pd.read_excel(file_path)
+        for _, row in df.iterrows():
+            # Process Excel data similar to CSV
+            query_raw = row.get("inputs.query", "")
+            user_message = extract_user_message(query_raw)
+            
+            run_data = {
+                "runId": f"run_{row.get('id', 'unknown')}",
+                "conversation_id": row.get("inputs.conversation_id", ""),
+                "user_message": user_message,
+                "agent_response": row.get("inputs.response", "")
+            }
+            
+            # Parse evaluation metrics
+            metrics = ["intent_resolution", "coherence", "relevance", "groundedness", "tool_call_accuracy", "task_adherence", "fluency"]
+            
+            for metric in metrics:
+                result_key = f"{metric}.{metric}.result"
+                score_key = f"{metric}.{metric}.score" 
+                reason_key = f"{metric}.{metric}.reason"
                 
-    except Exception as e:
-        print(f"Error loading CSV data: {str(e)}")
-        return []
+                result = row.get(result_key, "")
+                score_str = str(row.get(score_key, "0"))
+                reason = row.get(reason_key, "")
+                
+                # Parse score
+                try:
+                    score = float(score_str) if score_str else 0.0
+                except ValueError:
+                    score = 0.0
+                
+                run_data[f"{metric}_result"] = result
+                run_data[f"{metric}_score"] = score  
+                run_data[f"{metric}_reason"] = reason
+            
+            data.append(run_data)
     
     return data
 
@@ -164,59 +182,73 @@ def read_root():
 @app.get("/health")
 def health_check():
     """Health check endpoint"""
-    return {"status": "ok", "timestamp": datetime.now().isoformat()}
+    return {"status": "ok", "timestamp": datetime.now().isoformat(), "dataset_cache": DATASET_CACHE.stats()}
+
+@app.get("/datasets")
+def list_datasets():
+    """List datasets that can be selected with dataset_id"""
+    return [
+        {**entry, "resident": os.path.exists(entry["path"])
+         and DATASET_CACHE.contains(DATASET_CACHE.key_for(entry["path"], "server.rows"))}
+        for entry in DATASETS.entries()
+    ]
 
 @app.get("/runs")
-def get_runs():
+def get_runs(dataset_id: Optional[str] = None):
     """Get all evaluation runs"""
+    file_path = dataset_path(dataset_id)
     try:
-        data = load_csv_data()
-        return {"runs": data}
+        data = load_csv_data(file_path)
+        # Serialized once per version of the dataset file
+        return cached_json_response(("server.runs", file_version(file_path)), lambda: {"runs": data})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading data: {str(e)}")
 
+def summarize_runs(data):
+    """Calculate all metrics in one vectorized pass over the run records"""
+    metrics = ["intent_resolution", "coherence", "relevance", "groundedness", "tool_call_accuracy", "task_adherence", "fluency"]
+    frame = pd.DataFrame(data)
+    scores = frame[[f"{metric}_score" for metric in metrics]].to_numpy(dtype=np.float64)
+    scores = np.where(scores > 0, scores, np.nan)  # only positive scores count as valid
+    passed = np.column_stack([pass_mask(frame[f"{metric}_result"]) for metric in metrics])
+    stats = aggregate(metrics, scores, passed, np.ones_like(passed))
+    
+    return [
+        {
+            "name": metric.replace("_", " ").title(),
+            "value": round(stats[metric]["mean"], 2),
+            "total_runs": len(data),
+            "valid_scores": stats[metric]["scored"],
+            "passed": stats[metric]["passed"],
+            "min": stats[metric]["min"],
+            "max": stats[metric]["max"],
+            "stddev": stats[metric]["stddev"]
+        }
+        for metric in metrics
+    ]
+
 @app.get("/metrics")
-def get_metrics():
+def get_metrics(dataset_id: Optional[str] = None):
     """Get aggregated metrics"""
+    file_path = dataset_path(dataset_id)
     try:
-        data = load_csv_data()
+        data = load_csv_data(file_path)
         
         if not data:
             return {"metrics": []}
         
-        # Calculate metrics
-        metrics_data = {}
-        metrics = ["intent_resolution", "coherence", "relevance", "groundedness", "tool_call_accuracy", "task_adherence", "fluency"]
-        
-        for metric in metrics:
-            scores = [run.get(f"{metric}_score", 0) for run in data]
-            valid_scores = [s for s in scores if isinstance(s, (int, float)) and s > 0]
-            
-            if valid_scores:
-                avg_score = sum(valid_scores) / len(valid_scores)
-                metrics_data[metric] = {
-                    "name": metric.replace("_", " ").title(),
-                    "value": round(avg_score, 2),
-                    "total_runs": len(data),
-                    "valid_scores": len(valid_scores)
-                }
-            else:
-                metrics_data[metric] = {
-                    "name": metric.replace("_", " ").title(),
-                    "value": 0,
-                    "total_runs": len(data),
-                    "valid_scores": 0
-                }
-        
-        return {"metrics": list(metrics_data.values())}
+        # Summaries are cached alongside the parsed rows for the same file version
+        metrics = DATASET_CACHE.get(file_path, lambda _: summarize_runs(data), kind="server.metrics")
+        return cached_json_response(("server.metrics", file_version(file_path)), lambda: {"metrics": metrics})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calculating metrics: {str(e)}")
 
 @app.get("/runs/{run_id}")
-def get_run(run_id: str):
+def get_run(run_id: str, dataset_id: Optional[str] = None):
     """Get specific run details"""
+    file_path = dataset_path(dataset_id)
     try:
-        data = load_csv_data()
+        data = load_csv_data(file_path)
         
         run = next((r for r in data if r["runId"] == run_id), None)
         if not run:
@@ -228,6 +260,13 @@ def get_run(run_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting run: {str(e)}")
 
+def save_upload(fileobj, suffix):
+    """Copy an upload to a temporary file, returning its path and content hash"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+        stream = UploadStream(fileobj, temp_file)
+        stream.drain()
+        return temp_file.name, stream.sha256.hexdigest()
+
 @app.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
     """Upload CSV/Excel file"""
@@ -238,25 +277,27 @@ async def upload_file(file: UploadFile = File(...)):
         if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
             raise HTTPException(status_code=400, detail="Only CSV and Excel files are supported")
         
-        # Create temporary file
+        # Save uploaded file to a temporary file off the event loop
         suffix = '.csv' if file.filename.endswith('.csv') else '.xlsx'
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+        with ingest_stage("storage_io", nbytes=file.size or 0):
+            temp_path, sha256 = await run_io(save_upload, file.file, suffix)
         
-        # Save uploaded file
-        content = await file.read()
-        temp_file.write(content)
-        temp_file.close()
+        # Parse in a worker process and seed the cache with the result;
+        # stages timed in the worker are recorded here
+        test_data, stages = await run_cpu(capture_stages, parse_dataset_file, temp_path)
+        record_stages(stages)
+        DATASET_CACHE.put_path(temp_path, test_data, kind="server.rows")
         
-        # Update current dataset path
-        current_dataset_path = temp_file.name
+        # Register the upload under its own id and make it the active dataset
+        dataset_id = dataset_id_for(sha256)
+        DATASETS.register(dataset_id, file.filename, temp_path, rows=len(test_data))
+        current_dataset_path = temp_path
         current_dataset_filename = file.filename
         
-        # Test load the data
-        test_data = load_csv_data()
-        
         return {
             "message": f"File uploaded successfully: {file.filename}",
             "filename": file.filename,
+            "dataset_id": dataset_id,
             "rows_loaded": len(test_data)
         }
         
@@ -266,8 +307,16 @@ async def upload_file(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
 
 @app.get("/current-dataset")
-def get_current_dataset():
-    """Get info about currently loaded dataset"""
+def get_current_dataset(dataset_id: Optional[str] = None):
+    """Get info about currently loaded dataset, or the one named by dataset_id"""
+    if dataset_id is not None:
+        file_path = dataset_path(dataset_id)
+        return {
+            "dataset_id": dataset_id,
+            "filename": DATASETS.get(dataset_id)["filename"],
+            "path": file_path,
+            "exists": os.path.exists(file_path)
+        }
     return {
         "filename": current_dataset_filename,
         "path": current_dataset_path,
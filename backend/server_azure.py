@@ -3,25 +3,120 @@
 Azure-optimized FastAPI server for AI Quality Dashboard
 """
 
-import csv
-import json
+import glob
+import hashlib
+import io
 import os
 import tempfile
 import shutil
+from contextlib import asynccontextmanager
 from datetime import datetime
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 import pandas as pd
 from typing import Optional
 
-# Azure imports (optional - will work without Azure SDK)
-try:
-    from azure.storage.blob import BlobServiceClient
-    AZURE_STORAGE_AVAILABLE = True
-except ImportError:
-    AZURE_STORAGE_AVAILABLE = False
+from app.clusters import cluster_failures
+from app.dataset import EvaluationDataset, resolve_metric
+from app.http_cache import ConditionalResponseMiddleware, cached_json_response
+from app.diff import DEFAULT_FLIP_LIMIT, diff_datasets
+from app.cache import DATASET_CACHE
+from app.ingest import MissingColumnsError, UploadStream, read_csv_chunks
+from app.registry import DEFAULT_DATASET_ID, DatasetRegistry, dataset_id_for
+from app.pagination import (
+    MAX_PAGE_SIZE,
+    apply_preview,
+    decode_cursor,
+    encode_cursor,
+    page_response,
+    paginate,
+    parse_fields,
+    truncate,
+)
+from app.sidecar import load_with_sidecar, sidecar_path
+from app.telemetry import RequestMetricsMiddleware, capture_stages, ingest_stage, record_stage, record_stages
+from app.telemetry import router as internal_router
+from app.warehouse import Warehouse, resolve_run
+from app.workers import run_cpu, run_io, shutdown_process_pool
+from app.storage import (
+    AZURE_STORAGE_AVAILABLE,
+    AzureBlobStorage,
+    ContentStore,
+    LocalStorage,
+    MemoryBlobServiceClient,
+    close_blob_service_client,
+    create_blob_service_client,
+)
+
+# Azure Storage configuration
+AZURE_STORAGE_CONNECTION_STRING = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
+STORAGE_CONTAINER_NAME = "uploads"
+
+# "azure", "local" or "memory"; defaults to Azure when a connection string is set
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "")
+
+blob_service_client = None
+storage_backend = None
+content_store = None
+
+def get_blob_service_client():
+    """Get the shared, connection-pooled Azure Blob Storage client if available"""
+    global blob_service_client
+    if blob_service_client is None and AZURE_STORAGE_AVAILABLE and AZURE_STORAGE_CONNECTION_STRING:
+        try:
+            blob_service_client = create_blob_service_client(AZURE_STORAGE_CONNECTION_STRING)
+        except Exception as e:
+            print(f"Azure Storage not available: {e}")
+    return blob_service_client
+
+def get_storage_backend():
+    """Get the configured storage backend, creating it on first use"""
+    global storage_backend
+    if storage_backend is None:
+        backend = STORAGE_BACKEND or ("azure" if AZURE_STORAGE_CONNECTION_STRING else "local")
+        if backend == "memory":
+            # Offline stand-in that exercises the blob code path
+            storage_backend = AzureBlobStorage(MemoryBlobServiceClient(), STORAGE_CONTAINER_NAME)
+        elif backend == "azure" and get_blob_service_client():
+            storage_backend = AzureBlobStorage(blob_service_client, STORAGE_CONTAINER_NAME)
+        else:
+            storage_backend = LocalStorage(DATA_DIR)
+        print(f"Using {type(storage_backend).__name__} storage backend")
+    return storage_backend
+
+def get_content_store():
+    """Content-addressed dataset store on the configured storage backend"""
+    global content_store
+    if content_store is None:
+        content_store = ContentStore(get_storage_backend())
+    return content_store
 
-app = FastAPI(title="AI Quality Dashboard API")
+def close_storage():
+    """Close the storage backend and the shared blob client"""
+    global blob_service_client, storage_backend, content_store
+    if storage_backend is not None:
+        storage_backend.close()
+    if blob_service_client is not None:
+        close_blob_service_client(blob_service_client)
+    blob_service_client = storage_backend = content_store = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open storage once at startup, load the default dataset and release pooled connections at shutdown"""
+    get_content_store()
+    # Loaded here rather than at import, so importing the module (tests,
+    # parser processes) does no I/O and storage is owned by the lifespan
+    await run_io(load_default_dataset)
+    # Roll up exports already on disk; each one is only parsed the first time
+    await run_io(WAREHOUSE.backfill, sorted(glob.glob(os.path.join(DATA_DIR, "*.csv"))), load_dataset_path)
+    yield
+    close_storage()
+    shutdown_process_pool()
+
+app = FastAPI(title="AI Quality Dashboard API", lifespan=lifespan)
+
+# ETags, 304s and compression; added before CORS so 304s carry CORS headers
+app.add_middleware(ConditionalResponseMiddleware, version_for=lambda request: response_version(request))
 
 # Configure CORS - more permissive for Azure Static Web Apps
 app.add_middleware(
@@ -36,170 +131,221 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Azure Storage configuration
-AZURE_STORAGE_CONNECTION_STRING = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
-STORAGE_CONTAINER_NAME = "uploads"
-
-def get_blob_service_client():
-    """Get Azure Blob Storage client if available"""
-    if AZURE_STORAGE_AVAILABLE and AZURE_STORAGE_CONNECTION_STRING:
-        try:
-            return BlobServiceClient.from_connection_string(AZURE_STORAGE_CONNECTION_STRING)
-        except Exception as e:
-            print(f"Azure Storage not available: {e}")
-    return None
-
-def save_file_to_azure(file_content: bytes, filename: str) -> str:
-    """Save file to Azure Blob Storage"""
-    blob_service_client = get_blob_service_client()
-    
-    if blob_service_client:
-        try:
-            # Create a unique filename with timestamp
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            blob_name = f"uploaded_{timestamp}_{filename}"
-            
-            # Upload to blob storage
-            blob_client = blob_service_client.get_blob_client(
-                container=STORAGE_CONTAINER_NAME,
-                blob=blob_name
-            )
-            blob_client.upload_blob(file_content, overwrite=True)
-            
-            print(f"File saved to Azure Storage: {blob_name}")
-            return blob_name
-        except Exception as e:
-            print(f"Failed to save to Azure Storage: {e}")
-    
-    # Fallback to local storage
-    return save_file_locally(file_content, filename)
-
-def save_file_locally(file_content: bytes, filename: str) -> str:
-    """Fallback: save file to local filesystem"""
-    os.makedirs("app/data", exist_ok=True)
-    
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    unique_filename = f"uploaded_{timestamp}_{filename}"
-    file_path = os.path.join("app/data", unique_filename)
-    
-    with open(file_path, 'wb') as f:
-        f.write(file_content)
-    
-    print(f"File saved locally: {file_path}")
-    return file_path
+# Per-route latency and in-flight counts; added last so it also times the middleware above
+app.add_middleware(RequestMetricsMiddleware, routes=app.routes)
+app.include_router(internal_router)
 
 def load_file_content(file_path: str) -> bytes:
-    """Load file content from Azure Storage or local filesystem"""
-    blob_service_client = get_blob_service_client()
+    """Load file content from the storage backend or local filesystem"""
+    backend = get_storage_backend()
     
-    # Try Azure Storage first
-    if blob_service_client and not os.path.exists(file_path):
+    # Try the storage backend first
+    if not isinstance(backend, LocalStorage) and not os.path.exists(file_path):
         try:
-            blob_client = blob_service_client.get_blob_client(
-                container=STORAGE_CONTAINER_NAME,
-                blob=file_path
-            )
-            return blob_client.download_blob().readall()
+            with ingest_stage("storage_io") as timer:
+                content = backend.read_bytes(file_path)
+                timer.bytes = len(content)
+            return content
         except Exception as e:
-            print(f"Failed to load from Azure Storage: {e}")
+            print(f"Failed to load from storage: {e}")
     
     # Fallback to local file
     if os.path.exists(file_path):
-        with open(file_path, 'rb') as f:
-            return f.read()
+        with ingest_stage("storage_io") as timer, open(file_path, 'rb') as f:
+            content = f.read()
+            timer.bytes = len(content)
+        return content
     
     raise FileNotFoundError(f"File not found: {file_path}")
 
-def extract_user_message(query_str):
-    """Extract user message from JSON query string"""
-    try:
-        if not query_str:
-            return ""
-        
-        # Parse the JSON string
-        query_obj = json.loads(query_str)
-        
-        # Look for user role content
-        if isinstance(query_obj, list):
-            for item in query_obj:
-                if isinstance(item, dict) and item.get('role') == 'user':
-                    content = item.get('content', '')
-                    if isinstance(content, list):
-                        # Extract text from content array
-                        for content_item in content:
-                            if isinstance(content_item, dict) and content_item.get('type') == 'text':
-                                return content_item.get('text', '')
-                    elif isinstance(content, str):
-                        return content
-        
-        # If no user role found, return first 200 chars of original
-        return str(query_obj)[:200] if query_obj else ""
-    except Exception as e:
-        print(f"Error parsing query: {e}")
-        return str(query_str)[:200] if query_str else ""
-
 # Default data path - can be overridden by file upload
-DEFAULT_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "data", "5Prompts-DSB_WorkloadRCAAgent_quality_quality_en_20251224-055849.csv")
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "data")
+DEFAULT_CSV_PATH = os.path.join(DATA_DIR, "5Prompts-DSB_WorkloadRCAAgent_quality_quality_en_20251224-055849.csv")
 
 # Store current active dataset path and original filename
 current_dataset_path = DEFAULT_CSV_PATH
 current_dataset_filename = os.path.basename(DEFAULT_CSV_PATH)
 
+# Every dataset that can be requested by id; the active one is used when
+# no dataset_id is given
+DATASETS = DatasetRegistry()
+DATASETS.register(DEFAULT_DATASET_ID, current_dataset_filename, DEFAULT_CSV_PATH)
+
+# Per-run rollups of every export seen, partitioned by agent and run date
+WAREHOUSE = Warehouse()
+
 def load_csv_data():
     """Load and parse the CSV data"""
-    global current_dataset_path
+    try:
+        if not current_dataset_path:
+            print("No dataset path set")
+            return EvaluationDataset.empty()
+        return load_dataset_path(current_dataset_path, current_dataset_filename)
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        return EvaluationDataset.empty()
+
+def load_dataset_path(path, filename):
+    """Load a dataset from a store object, local file or blob, reusing resident datasets"""
+    store = get_content_store()
+    if store.is_object(path):
+        return load_stored_dataset(store, path, filename)
+    
+    def load(file_path):
+        # Load file content from local disk or Azure Storage
+        file_content = load_file_content(file_path)
+        version = hashlib.sha256(file_content).hexdigest()
+        return load_with_sidecar(version, filename,
+                                 lambda: parse_file_content(file_content, version, file_path, filename), store)
+    
+    if os.path.exists(path):
+        # Local files stay resident until they change on disk
+        return DATASET_CACHE.get(path, load, kind="azure.dataset")
+    return load(path)
+
+def parse_file_content(file_content, version, path, filename):
+    """Parse raw CSV or Excel bytes into a columnar dataset"""
+    # Create temporary file for pandas to read
+    suffix = os.path.splitext(path)[1] or '.csv'
+    with ingest_stage("storage_io", nbytes=len(file_content)), \
+            tempfile.NamedTemporaryFile(mode='wb', suffix=suffix, delete=False) as temp_file:
+        temp_file.write(file_content)
+        temp_path = temp_file.name
     
     try:
-        # Check if file exists
-        if not current_dataset_path or not os.path.exists(current_dataset_path):
-            print(f"File not found: {current_dataset_path}")
-            return []
-            
-        # Try to load file content
-        file_content = load_file_content(current_dataset_path)
-        
-        # Create temporary file for pandas to read
-        with tempfile.NamedTemporaryFile(mode='wb', suffix='.csv', delete=False) as temp_file:
-            temp_file.write(file_content)
-            temp_path = temp_file.name
-        
-        try:
-            if current_dataset_path.endswith('.csv') or temp_path.endswith('.csv'):
+        with ingest_stage("parse", nbytes=len(file_content)) as timer:
+            if temp_path.endswith('.csv'):
                 df = pd.read_csv(temp_path)
             else:
                 df = pd.read_excel(temp_path)
-            
-            print(f"Loaded {len(df)} records from {current_dataset_filename}")
-            
-            # Process the data into the expected format
-            runs_data = []
-            for i, (_, row) in enumerate(df.iterrows()):
-                run_data = {
-                    "runId": f"run_{i+1}",
-                    "raw_data": row.to_dict()
-                }
-                runs_data.append(run_data)
-            
-            return runs_data
-        finally:
-            # Clean up temporary file
-            os.unlink(temp_path)
-            
+            timer.rows = len(df)
+        
+        print(f"Loaded {len(df)} records from {filename}")
+        
+        # Keep the data columnar instead of one dict per row; summaries
+        # are materialized here and versioned by the file contents
+        with ingest_stage("normalize", rows=len(df)):
+            return EvaluationDataset.from_dataframe(df, filename, version)
+    finally:
+        # Clean up temporary file
+        os.unlink(temp_path)
+
+def parse_stored_dataset(store, name, filename, sha256):
+    """Decompress and parse a content-addressed dataset object into a columnar dataset"""
+    # Stored objects are decompressed while they are parsed, so both count as parsing
+    # CSV chunks are folded into the dataset columns as they are parsed
+    with ingest_stage("parse") as timer:
+        if '.csv' in os.path.basename(name):
+            builder = read_csv_chunks(store.read_chunks(name))
+            timer.rows = builder.rows
+        else:
+            df = pd.read_excel(io.BytesIO(b"".join(store.read_chunks(name))))
+            timer.rows = len(df)
+    print(f"Loaded {timer.rows} records from {filename}")
+    with ingest_stage("normalize", rows=timer.rows):
+        if '.csv' in os.path.basename(name):
+            return builder.build(filename, sha256)
+        return EvaluationDataset.from_dataframe(df, filename, sha256)
+
+def load_stored_dataset(store, name, filename):
+    """Load a content-addressed dataset object, from its sidecar when one exists"""
+    sha256 = os.path.basename(name).split('.', 1)[0]
+    cached = DATASET_CACHE.lookup(("content", sha256))
+    if cached is not None:
+        return cached
+    
+    dataset = load_with_sidecar(sha256, filename, lambda: parse_stored_dataset(store, name, filename, sha256), store)
+    DATASET_CACHE.put(("content", sha256), dataset, dataset.memory_usage())
+    return dataset
+
+# Active dataset; empty until lifespan loads the default one after storage is open
+EVALUATION_DATA = EvaluationDataset.empty()
+
+def load_default_dataset():
+    """Load the default dataset at startup - with safe error handling for Azure deployment"""
+    global EVALUATION_DATA
+    try:
+        EVALUATION_DATA = load_csv_data()
+        print(f"Successfully loaded default dataset with {len(EVALUATION_DATA)} runs")
     except Exception as e:
-        print(f"Error loading data: {e}")
-        return []
+        print(f"Could not load default dataset: {e}")
+        print("Starting with empty dataset - will load data when file is uploaded")
+        EVALUATION_DATA = EvaluationDataset.empty()
 
-# Load data from CSV - with safe error handling for Azure deployment
-try:
-    EVALUATION_DATA = load_csv_data()
-    print(f"Successfully loaded default dataset with {len(EVALUATION_DATA)} runs")
-except Exception as e:
-    print(f"Could not load default dataset: {e}")
-    print("Starting with empty dataset - will load data when file is uploaded")
-    EVALUATION_DATA = []
+def find_dataset(dataset_id):
+    """Look up a dataset id, falling back to the content store manifest after a restart"""
+    entry = DATASETS.get(dataset_id)
+    if entry is not None:
+        return entry
+    store = get_content_store()
+    for sha256, stored in store.manifest().items():
+        if dataset_id_for(sha256) == dataset_id:
+            return DATASETS.register(dataset_id, stored["filenames"][-1], stored["object"],
+                                     sha256=sha256, uploaded_at=stored["uploaded_at"])
+    return None
+
+def response_version(request):
+    """Version of the data a read endpoint serves, keying its ETag; None if unversioned"""
+    path = request.url.path
+    params = request.query_params
+    if path == "/diff":
+        return f"{get_dataset(params['base']).version}:{get_dataset(params['head']).version}"
+    if path == "/trends":
+        return f"warehouse:{WAREHOUSE.revision}"
+    if path.startswith("/runs") or path == "/search":
+        return get_dataset(params.get("dataset_id")).version
+    return None
+
+def get_dataset(dataset_id: Optional[str] = None):
+    """Resolve a dataset id to a parsed dataset, defaulting to the active dataset"""
+    if dataset_id is None:
+        return EVALUATION_DATA
+    entry = find_dataset(dataset_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Dataset not found: {dataset_id}")
+    try:
+        return load_dataset_path(entry["path"], entry["filename"])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading dataset {dataset_id}: {str(e)}")
+
+def store_upload(store, file, extension):
+    """Stream an upload to the content store, hashing it in the same pass
+    
+    Returns ``(sha256, name, reused)``. Content that is already stored is
+    recognized once the write completes and its staged copy discarded.
+    """
+    writer = store.writer(extension)
+    stream = UploadStream(file.file, writer)
+    try:
+        stream.drain()
+    except Exception:
+        writer.abort()
+        raise
+    sha256 = stream.sha256.hexdigest()
+    file_path, reused = store.commit(writer, sha256, extension)
+    store.record(sha256, file.filename, file_path, stream.bytes_read, writer.bytes_written)
+    record_stage("storage_io", stream.io_seconds, nbytes=stream.bytes_read)
+    return sha256, file_path, reused
+
+def build_dataset(name, filename, sha256):
+    """Parse a stored upload into the columnar dataset and its sidecar; runs in a parser process
+    
+    The worker reads the object through its own storage backend, so neither
+    the raw bytes nor a parsed frame cross the process boundary. Returns the
+    dataset only when no sidecar could be written. Otherwise the parent
+    memory-maps the sidecar, which is far cheaper than unpickling every
+    column sent back from the worker.
+    """
+    store = get_content_store()
+    dataset = load_with_sidecar(sha256, filename, lambda: parse_stored_dataset(store, name, filename, sha256), store)
+    return None if os.path.exists(sidecar_path(sha256, store)) else dataset
 
 @app.post("/upload-dataset")
-async def upload_dataset(file: UploadFile = File(...)):
+async def upload_dataset(
+    file: UploadFile = File(...),
+    agent: Optional[str] = Form(None, description="Agent, if the file name does not carry it"),
+    run_at: Optional[datetime] = Form(None, description="Run time, if the file name does not carry it"),
+):
     """Upload a new dataset file (CSV or Excel)"""
     global current_dataset_path, current_dataset_filename, EVALUATION_DATA
     
@@ -207,35 +353,99 @@ async def upload_dataset(file: UploadFile = File(...)):
     if not file.filename.endswith(('.csv', '.xlsx', '.xls')):
         raise HTTPException(status_code=400, detail="File must be a CSV or Excel file")
     
+    # Every upload is filed in the warehouse by agent and run time
     try:
-        # Read file content
-        content = await file.read()
+        agent, run_at = resolve_run(file.filename, agent, run_at)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        # Uploads are stored by content hash, computed while they stream to
+        # storage; known content skips parsing. Storage I/O runs on the
+        # threadpool and parsing of the stored object in a worker process,
+        # so the event loop keeps serving other requests and the server
+        # process never tokenizes CSV during ingestion.
+        store = get_content_store()
+        extension = os.path.splitext(file.filename)[1].lower()
+        sha256, file_path, reused = await run_io(store_upload, store, file, extension)
         
-        # Save file (Azure Storage or local)
-        file_path = save_file_to_azure(content, file.filename)
+        if reused:
+            dataset = await run_io(load_stored_dataset, store, file_path, file.filename)
+        else:
+            # Parser processes open their own backend; an in-memory one is
+            # only visible to this process, so it is parsed on the threadpool
+            run_parse = run_cpu if get_storage_backend().shared else run_io
+            # Stages timed in the parser process are recorded here
+            dataset, stages = await run_parse(capture_stages, build_dataset, file_path, file.filename, sha256)
+            record_stages(stages)
+            if dataset is None:
+                dataset = await run_io(load_stored_dataset, store, file_path, file.filename)
+            else:
+                DATASET_CACHE.put(("content", sha256), dataset, dataset.memory_usage())
         
-        # Update current dataset path and filename
+        # Register the upload under its own id and make it the active dataset
+        dataset_id = dataset_id_for(sha256)
+        DATASETS.register(dataset_id, file.filename, file_path, sha256=sha256, rows=len(dataset))
         current_dataset_path = file_path
         current_dataset_filename = file.filename
+        EVALUATION_DATA = dataset
         
-        # Reload data
-        EVALUATION_DATA = load_csv_data()
+        try:
+            with ingest_stage("warehouse", rows=len(dataset)):
+                await run_io(WAREHOUSE.ingest, dataset, file.filename, agent, run_at)
+        except OSError as e:
+            print(f"Could not add {file.filename} to the warehouse: {e}")
         
         return {
             "message": f"Dataset {file.filename} uploaded successfully", 
             "filename": file.filename,
-            "rows": len(EVALUATION_DATA)
+            "dataset_id": dataset_id,
+            "rows": len(EVALUATION_DATA),
+            "sha256": sha256,
+            "reused": reused
         }
+    except MissingColumnsError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
 
+@app.get("/datasets")
+def list_datasets():
+    """List datasets that can be selected with dataset_id"""
+    store = get_content_store()
+    for sha256 in store.manifest():
+        find_dataset(dataset_id_for(sha256))
+    return [{**entry, "resident": is_resident(entry)} for entry in DATASETS.entries()]
+
+def is_resident(entry):
+    """Whether a registered dataset is parsed and held in memory"""
+    if "sha256" in entry:
+        return DATASET_CACHE.contains(("content", entry["sha256"]))
+    if os.path.exists(entry["path"]):
+        return DATASET_CACHE.contains(DATASET_CACHE.key_for(entry["path"], "azure.dataset"))
+    return False
+
 @app.get("/current-dataset-info")
-def get_current_dataset_info():
-    """Get information about the currently loaded dataset"""
+def get_current_dataset_info(dataset_id: Optional[str] = None):
+    """Get information about the currently loaded dataset, or the one named by dataset_id"""
+    if dataset_id is not None:
+        dataset = get_dataset(dataset_id)
+        entry = DATASETS.get(dataset_id)
+        return {
+            "dataset_id": dataset_id,
+            "filename": entry["filename"],
+            "path": entry["path"],
+            "rows": len(dataset),
+            "version": dataset.version,
+            "loaded_at": dataset.loaded_at,
+            "is_default": dataset_id == DEFAULT_DATASET_ID
+        }
     return {
         "filename": current_dataset_filename,
         "path": current_dataset_path,
         "rows": len(EVALUATION_DATA),
+        "version": EVALUATION_DATA.version,
+        "loaded_at": EVALUATION_DATA.loaded_at,
         "is_default": current_dataset_path == DEFAULT_CSV_PATH
     }
 
@@ -258,112 +468,234 @@ def health_check():
     return {
         "status": "healthy",
         "dataset_loaded": len(EVALUATION_DATA) > 0,
-        "azure_storage": AZURE_STORAGE_AVAILABLE and bool(AZURE_STORAGE_CONNECTION_STRING)
+        "dataset_memory_bytes": EVALUATION_DATA.memory_usage(),
+        "azure_storage": AZURE_STORAGE_AVAILABLE and bool(AZURE_STORAGE_CONNECTION_STRING),
+        "storage_backend": type(get_storage_backend()).__name__
     }
 
-@app.get("/runs")
-def get_runs():
-    """Get all run summaries"""
-    if not EVALUATION_DATA:
-        return []
+@app.get("/trends")
+def get_trends(
+    agent: Optional[str] = None,
+    metric: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = Query("run", pattern="^(run|day)$")
+):
+    """Get per-metric pass rates over time from the per-run rollups
+    
+    ``granularity=day`` merges the runs of each agent and date. No export
+    is re-read; every point comes from the warehouse.
+    """
+    metric_key = None
+    if metric is not None:
+        metric_key = resolve_metric(metric)
+        if metric_key is None:
+            raise HTTPException(status_code=400, detail=f"Unknown metric: {metric}")
+    return {
+        "granularity": granularity,
+        "points": WAREHOUSE.trends(agent, metric_key, start, end, granularity)
+    }
+
+@app.get("/diff")
+def get_diff(
+    base: str,
+    head: str,
+    metric: Optional[str] = None,
+    limit: int = Query(DEFAULT_FLIP_LIMIT, ge=0, le=MAX_PAGE_SIZE)
+):
+    """Compare two datasets joined on conversation id
     
-    # Aggregate metrics across all runs
-    metrics = {
-        "intentResolution": {"score": 0, "passed": 0, "total": 0},
-        "coherence": {"score": 0, "passed": 0, "total": 0},
-        "relevance": {"score": 0, "passed": 0, "total": 0},
-        "groundedness": {"score": 0, "passed": 0, "total": 0},
-        "toolCallAccuracy": {"score": 0, "passed": 0, "total": 0},
-        "taskAdherence": {"score": 0, "passed": 0, "total": 0},
-        "fluency": {"score": 0, "passed": 0, "total": 0}
+    Returns pass->fail and fail->pass flips with reasons for each metric,
+    plus pass rate and score deltas. ``limit`` caps the flips listed per
+    metric and direction; the counts always cover every conversation.
+    """
+    metrics = None
+    if metric is not None:
+        metric_key = resolve_metric(metric)
+        if metric_key is None:
+            raise HTTPException(status_code=400, detail=f"Unknown metric: {metric}")
+        metrics = [metric_key]
+    return {
+        "base": base,
+        "head": head,
+        **diff_datasets(get_dataset(base), get_dataset(head), metrics, limit)
     }
+
+@app.get("/search")
+def search(
+    q: str,
+    metric: Optional[str] = None,
+    fields: Optional[str] = None,
+    passed: Optional[bool] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    preview_chars: Optional[int] = Query(None, ge=0),
+    dataset_id: Optional[str] = None
+):
+    """Full-text search over prompts, responses and judge reasons
     
-    # Process each run to calculate metrics
-    for run_data in EVALUATION_DATA:
-        raw_data = run_data.get("raw_data", {})
-        
-        # Map metrics to their CSV column patterns
-        metric_mappings = {
-            "intentResolution": "intent_resolution",
-            "coherence": "coherence", 
-            "relevance": "relevance",
-            "groundedness": "groundedness",
-            "toolCallAccuracy": "tool_call_accuracy",
-            "taskAdherence": "task_adherence",
-            "fluency": "fluency"
+    Every term of ``q`` must match. ``fields`` restricts the search to a
+    comma-separated subset of prompt, response and reason; ``metric`` limits
+    reasons and rows to one metric and ``passed`` filters on its result.
+    Results are ranked and paged like the drilldown endpoints.
+    """
+    field_kinds = None
+    if fields:
+        field_kinds = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in field_kinds if f not in ("prompt", "response", "reason")]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    metric_key = None
+    if metric is not None:
+        metric_key = resolve_metric(metric)
+        if metric_key is None:
+            raise HTTPException(status_code=400, detail=f"Unknown metric: {metric}")
+    elif passed is not None:
+        raise HTTPException(status_code=400, detail="passed requires a metric")
+    
+    dataset = get_dataset(dataset_id)
+    rows, scores, matches = dataset.search_index().search(q, field_kinds, metric_key)
+    if metric_key is not None:
+        columns = dataset.metrics[metric_key]
+        keep = columns.present[rows]
+        if passed is not None:
+            keep &= columns.passed[rows] == passed
+        rows, scores = rows[keep], scores[keep]
+    
+    try:
+        start = decode_cursor(cursor, dataset.version) if cursor else 0
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    end = start + limit
+    
+    items = []
+    for row, score in zip(rows[start:end].tolist(), scores[start:end].tolist()):
+        conversation_id = dataset.conversation_ids[row]
+        item = {
+            "promptId": f"prompt_{row + 1}",
+            "conversationId": conversation_id if isinstance(conversation_id, str) else "",
+            "prompt": truncate(dataset.prompts[row] if dataset.prompts is not None else None, preview_chars),
+            "score": score,
+            "matches": [name for name, mask in matches.items() if mask[row]],
         }
-        
-        for metric_key, csv_prefix in metric_mappings.items():
-            score_key = f"{csv_prefix}.{csv_prefix}.score"
-            result_key = f"{csv_prefix}.{csv_prefix}.result"
-            
-            if score_key in raw_data:
-                try:
-                    score = float(raw_data[score_key])
-                    metrics[metric_key]["score"] += score
-                    metrics[metric_key]["total"] += 1
-                    
-                    # Check if passed
-                    result = raw_data.get(result_key, "").lower()
-                    if result == "pass":
-                        metrics[metric_key]["passed"] += 1
-                except (ValueError, TypeError):
-                    pass
+        if metric_key is not None:
+            detail = dataset.metric_detail(row, metric_key, fields=("passed", "reason"))
+            item.update(detail)
+        items.append(item)
     
-    # Calculate averages
-    for metric in metrics.values():
-        if metric["total"] > 0:
-            metric["score"] = round(metric["score"] / metric["total"], 1)
-        else:
-            metric["score"] = 0
+    next_cursor = encode_cursor(dataset.version, end) if end < len(rows) else None
+    return page_response(items, next_cursor, len(rows))
+
+@app.get("/runs")
+def get_runs(dataset_id: Optional[str] = None):
+    """Get all run summaries"""
+    dataset = get_dataset(dataset_id)
+    if not dataset:
+        return []
     
-    return [{
+    # Summaries are materialized when the dataset is loaded, and serialized
+    # once per dataset version
+    return cached_json_response(("azure.runs", dataset.version), lambda: [{
         "runId": "all",
-        **metrics
-    }]
+        **dataset.summary
+    }])
+
+def build_metric_detail(dataset, index, metric_key, fields, preview_chars):
+    """Build one drilldown record from the columns extracted at ingest"""
+    detail = dataset.metric_detail(index, metric_key, fields=fields)
+    return apply_preview(detail, preview_chars)
 
 @app.get("/runs/{run_id}/metrics/{metric}")
-def get_metric_details(run_id: str, metric: str):
-    """Get detailed metric information for a specific run"""
-    if not EVALUATION_DATA:
-        return []
+def get_metric_details(
+    run_id: str,
+    metric: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    preview_chars: Optional[int] = Query(None, ge=0),
+    dataset_id: Optional[str] = None
+):
+    """Get detailed metric information for a specific run
     
-    # Convert camelCase metric names back to snake_case for data lookup
-    metric_map = {
-        "intentResolution": "intent_resolution",
-        "toolCallAccuracy": "tool_call_accuracy", 
-        "taskAdherence": "task_adherence"
-    }
+    Without ``limit`` the full list is returned. With ``limit`` the response is
+    a page ``{"items", "next_cursor", "total"}``; pass ``next_cursor`` back as
+    ``cursor`` to fetch the following page. ``fields`` is a comma-separated
+    projection and ``preview_chars`` truncates prompt and response text.
+    """
+    try:
+        selected_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    dataset = get_dataset(dataset_id)
+    metric_key = resolve_metric(metric)
     
-    original_metric = metric_map.get(metric, metric)
-    result = []
+    # Serialized pages are reused until the dataset version changes
+    key = ("azure.metric", dataset.version, run_id, metric_key, limit, cursor, selected_fields, preview_chars)
+    return cached_json_response(key, lambda: metric_details_body(
+        dataset, run_id, metric_key, limit, cursor, selected_fields, preview_chars))
+
+def metric_details_body(dataset, run_id, metric_key, limit, cursor, selected_fields, preview_chars):
+    """Build the drilldown list, or one page of it when ``limit`` is set"""
+    rows = []
+    if dataset and metric_key is not None:
+        if run_id == "all":
+            # Handle aggregated view for all runs
+            rows = dataset.metric_rows(metric_key)
+        else:
+            # Individual runs map to a single row, e.g. "run_3" -> row 2
+            try:
+                row = int(run_id.replace('run_', '').replace('_', '')) - 1
+                if 0 <= row < len(dataset) and dataset.metrics[metric_key].present[row]:
+                    rows = [row]
+            except ValueError:
+                pass
+    
+    if limit is None:
+        return [build_metric_detail(dataset, int(i), metric_key, selected_fields, preview_chars) for i in rows]
+    
+    try:
+        page, next_cursor = paginate(rows, dataset.version, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    items = [build_metric_detail(dataset, int(i), metric_key, selected_fields, preview_chars) for i in page]
+    return page_response(items, next_cursor, len(rows))
+
+@app.get("/runs/{run_id}/metrics/{metric}/clusters")
+def get_failure_clusters(
+    run_id: str,
+    metric: str,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    dataset_id: Optional[str] = None
+):
+    """Get clusters of near-duplicate failure reasons for a metric
+    
+    Clusters of the aggregated run are computed at ingest. ``limit`` returns
+    only the largest clusters.
+    """
+    metric_key = resolve_metric(metric)
+    if metric_key is None:
+        raise HTTPException(status_code=400, detail=f"Unknown metric: {metric}")
+    dataset = get_dataset(dataset_id)
     
-    # Handle aggregated view for all runs
     if run_id == "all":
-        for i, run_data in enumerate(EVALUATION_DATA):
-            raw_data = run_data.get("raw_data", {})
-            
-            # Look for metric data
-            score_key = f"{original_metric}.{original_metric}.score"
-            result_key = f"{original_metric}.{original_metric}.result"
-            reason_key = f"{original_metric}.{original_metric}.reason"
-            
-            if score_key in raw_data:
-                try:
-                    score = float(raw_data[score_key])
-                    detail = {
-                        "promptId": f"prompt_{i+1}",
-                        "prompt": extract_user_message(raw_data.get("inputs.query", "")),
-                        "agentResponse": raw_data.get("inputs.response", ""),
-                        "passed": raw_data.get(result_key, "").lower() == "pass",
-                        "confidence": score / 100.0,
-                        "reason": raw_data.get(reason_key, "No reason provided")
-                    }
-                    result.append(detail)
-                except (ValueError, TypeError):
-                    pass
+        result = dataset.failure_clusters(metric_key)
+    else:
+        # Individual runs map to a single row, e.g. "run_3" -> row 2
+        try:
+            row = int(run_id.replace('run_', '').replace('_', '')) - 1
+        except ValueError:
+            row = -1
+        rows = [row] if 0 <= row < len(dataset) else []
+        result = cluster_failures(dataset, metric_key, rows)
     
-    return result
+    return {
+        "runId": run_id,
+        "metric": metric_key,
+        **result,
+        "clusters": result["clusters"][:limit] if limit is not None else result["clusters"]
+    }
 
 if __name__ == "__main__":
     import uvicorn
@@ -96,7 +96,7 @@ function App() {
             borderRadius: "12px",
             border: "1px solid #e9ecef"
           }}>
-            <div onClick={() => setSelected({ runId: "all", metric: "tool_call_accuracy", data: runs })} style={{
+            <div onClick={() => setSelected({ runId: "all", metric: "tool_call_accuracy" })} style={{
               background: getColor(Math.round(((aggregatedData.toolCallAccuracy?.passed || 0) / (aggregatedData.toolCallAccuracy?.total || 1)) * 100)),
               padding: "12px",
               borderRadius: "8px",
@@ -125,7 +125,7 @@ function App() {
                 {aggregatedData.toolCallAccuracy?.passed || 0}/{aggregatedData.toolCallAccuracy?.total || 0}
               </div>
             </div>
-            <div onClick={() => setSelected({ runId: "all", metric: "task_adherence", data: runs })} style={{
+            <div onClick={() => setSelected({ runId: "all", metric: "task_adherence" })} style={{
               background: getColor(Math.round(((aggregatedData.taskAdherence?.passed || 0) / (aggregatedData.taskAdherence?.total || 1)) * 100)),
               padding: "12px",
               borderRadius: "8px",
@@ -154,7 +154,7 @@ function App() {
                 {aggregatedData.taskAdherence?.passed || 0}/{aggregatedData.taskAdherence?.total || 0}
               </div>
             </div>
-            <div onClick={() => setSelected({ runId: "all", metric: "intent_resolution",data: runs })} style={{
+            <div onClick={() => setSelected({ runId: "all", metric: "intent_resolution" })} style={{
               background: getColor(Math.round(((aggregatedData.intentResolution?.passed || 0) / (aggregatedData.intentResolution?.total || 1)) * 100)),
               padding: "12px",
               borderRadius: "8px",
@@ -183,7 +183,7 @@ function App() {
                 {aggregatedData.intentResolution?.passed || 0}/{aggregatedData.intentResolution?.total || 0}
               </div>
             </div>
-            <div onClick={() => setSelected({ runId: "all", metric: "groundedness",data: runs })} style={{
+            <div onClick={() => setSelected({ runId: "all", metric: "groundedness" })} style={{
               background: getColor(Math.round(((aggregatedData.groundedness?.passed || 0) / (aggregatedData.groundedness?.total || 1)) * 100)),
               padding: "12px",
               borderRadius: "8px",
@@ -212,7 +212,7 @@ function App() {
                 {aggregatedData.groundedness?.passed || 0}/{aggregatedData.groundedness?.total || 0}
               </div>
             </div>
-            <div onClick={() => setSelected({ runId: "all", metric: "relevance",data: runs })} style={{
+            <div onClick={() => setSelected({ runId: "all", metric: "relevance" })} style={{
               background: getColor(Math.round(((aggregatedData.relevance?.passed || 0) / (aggregatedData.relevance?.total || 1)) * 100)),
               padding: "12px",
               borderRadius: "8px",
@@ -241,7 +241,7 @@ function App() {
                 {aggregatedData.relevance?.passed || 0}/{aggregatedData.relevance?.total || 0}
               </div>
             </div>
-            <div onClick={() => setSelected({ runId: "all", metric: "coherence", data: runs })} style={{
+            <div onClick={() => setSelected({ runId: "all", metric: "coherence" })} style={{
               background: getColor(Math.round(((aggregatedData.coherence?.passed || 0) / (aggregatedData.coherence?.total || 1)) * 100)),
               padding: "12px",
               borderRadius: "8px",
@@ -270,7 +270,7 @@ function App() {
                 {aggregatedData.coherence?.passed || 0}/{aggregatedData.coherence?.total || 0}
               </div>
             </div>
-            <div onClick={() => setSelected({ runId: "all", metric: "fluency", data: runs })} style={{
+            <div onClick={() => setSelected({ runId: "all", metric: "fluency" })} style={{
               background: getColor(Math.round(((aggregatedData.fluency?.passed || 0) / (aggregatedData.fluency?.total || 1)) * 100)),
               padding: "12px",
               borderRadius: "8px",
@@ -361,19 +361,19 @@ function App() {
                 </button>
               </div>
               <MetricTile title="Tool Acc" data={run.toolCallAccuracy || {score: 0, passed: 0, total: 0}}
-                onClick={() => setSelected({ runId: run.runId, metric: "tool_call_accuracy", data: [run] })} />
+                onClick={() => setSelected({ runId: run.runId, metric: "tool_call_accuracy" })} />
               <MetricTile title="Task Adh" data={run.taskAdherence || {score: 0, passed: 0, total: 0}}
-                onClick={() => setSelected({ runId: run.runId, metric: "task_adherence", data: [run] })} />
+                onClick={() => setSelected({ runId: run.runId, metric: "task_adherence" })} />
               <MetricTile title="Intent" data={run.intentResolution || {score: 0, passed: 0, total: 0}}
-                onClick={() => setSelected({ runId: run.runId, metric: "intent_resolution", data: [run] })} />
+                onClick={() => setSelected({ runId: run.runId, metric: "intent_resolution" })} />
               <MetricTile title="Grounded" data={run.groundedness || {score: 0, passed: 0, total: 0}}
-                onClick={() => setSelected({ runId: run.runId, metric: "groundedness", data: [run] })} />
+                onClick={() => setSelected({ runId: run.runId, metric: "groundedness" })} />
               <MetricTile title="Relevance" data={run.relevance || {score: 0, passed: 0, total: 0}}
-                onClick={() => setSelected({ runId: run.runId, metric: "relevance", data: [run] })} />
+                onClick={() => setSelected({ runId: run.runId, metric: "relevance" })} />
               <MetricTile title="Coherence" data={run.coherence || {score: 0, passed: 0, total: 0}}
-                onClick={() => setSelected({ runId: run.runId, metric: "coherence", data: [run] })} />
+                onClick={() => setSelected({ runId: run.runId, metric: "coherence" })} />
               <MetricTile title="Fluency" data={run.fluency || {score: 0, passed: 0, total: 0}}
-                onClick={() => setSelected({ runId: run.runId, metric: "fluency", data: [run] })} />
+                onClick={() => setSelected({ runId: run.runId, metric: "fluency" })} />
             </div>
           ))}
         </div>
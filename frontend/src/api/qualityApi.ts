@@ -2,12 +2,102 @@ import axios from "axios";
 
 const API = process.env.REACT_APP_API_URL || "http://localhost:8000";
 
-export const getRunSummaries = async () => {
-  const res = await axios.get(`${API}/runs`);
+export const getDatasets = async () => {
+  const res = await axios.get(`${API}/datasets`);
   return res.data;
 };
 
-export const getMetricDetails = async (runId: string, metric: string) => {
-  const res = await axios.get(`${API}/runs/${runId}/metrics/${metric}`);
+export const getRunSummaries = async (datasetId?: string) => {
+  const res = await axios.get(`${API}/runs`, { params: { dataset_id: datasetId } });
   return res.data;
-};
\ No newline at end of file
+};
+
+export const getMetricDetails = async (runId: string, metric: string, datasetId?: string) => {
+  const res = await axios.get(`${API}/runs/${runId}/metrics/${metric}`, {
+    params: { dataset_id: datasetId },
+  });
+  return res.data;
+};
+
+export interface MetricDetailsPageOptions {
+  limit?: number;
+  cursor?: string | null;
+  fields?: string[];
+  previewChars?: number;
+  datasetId?: string;
+}
+
+export const getMetricDetailsPage = async (
+  runId: string,
+  metric: string,
+  { limit = 50, cursor, fields, previewChars, datasetId }: MetricDetailsPageOptions = {}
+) => {
+  const res = await axios.get(`${API}/runs/${runId}/metrics/${metric}`, {
+    params: {
+      limit,
+      cursor: cursor || undefined,
+      fields: fields ? fields.join(",") : undefined,
+      preview_chars: previewChars,
+      dataset_id: datasetId,
+    },
+  });
+  return res.data as { items: any[]; next_cursor: string | null; total: number };
+};
+
+export interface TrendOptions {
+  agent?: string;
+  metric?: string;
+  start?: string;
+  end?: string;
+  granularity?: "run" | "day";
+}
+
+export const getTrends = async ({ agent, metric, start, end, granularity }: TrendOptions = {}) => {
+  const res = await axios.get(`${API}/trends`, {
+    params: { agent, metric, start, end, granularity },
+  });
+  return res.data;
+};
+
+export const getDiff = async (baseId: string, headId: string, metric?: string, limit?: number) => {
+  const res = await axios.get(`${API}/diff`, {
+    params: { base: baseId, head: headId, metric, limit },
+  });
+  return res.data;
+};
+
+export interface SearchOptions {
+  metric?: string;
+  fields?: Array<"prompt" | "response" | "reason">;
+  passed?: boolean;
+  limit?: number;
+  cursor?: string | null;
+  previewChars?: number;
+  datasetId?: string;
+}
+
+export const searchRows = async (
+  query: string,
+  { metric, fields, passed, limit = 50, cursor, previewChars, datasetId }: SearchOptions = {}
+) => {
+  const res = await axios.get(`${API}/search`, {
+    params: {
+      q: query,
+      metric,
+      fields: fields ? fields.join(",") : undefined,
+      passed,
+      limit,
+      cursor: cursor || undefined,
+      preview_chars: previewChars,
+      dataset_id: datasetId,
+    },
+  });
+  return res.data as { items: any[]; next_cursor: string | null; total: number };
+};
+
+export const getFailureClusters = async (runId: string, metric: string, limit?: number, datasetId?: string) => {
+  const res = await axios.get(`${API}/runs/${runId}/metrics/${metric}/clusters`, {
+    params: { limit, dataset_id: datasetId },
+  });
+  return res.data;
+};
@@ -16,6 +16,9 @@ const DatasetUploader: React.FC<DatasetUploaderProps> = ({ onDatasetUpdated }) =
   const [uploading, setUploading] = useState(false);
   const [currentDataset, setCurrentDataset] = useState<DatasetInfo | null>(null);
   const [error, setError] = useState<string | null>(null);
+  // Only needed when the file name does not carry the agent and run time
+  const [agent, setAgent] = useState('');
+  const [runAt, setRunAt] = useState('');
   const fileInputRef = useRef<HTMLInputElement>(null);
 
   const fetchCurrentDatasetInfo = async () => {
@@ -49,6 +52,8 @@ const DatasetUploader: React.FC<DatasetUploaderProps> = ({ onDatasetUpdated }) =
 
     const formData = new FormData();
     formData.append('file', file);
+    if (agent) formData.append('agent', agent);
+    if (runAt) formData.append('run_at', runAt);
 
     try {
       const response = await fetch('http://localhost:8002/upload-dataset', {
@@ -163,6 +168,23 @@ const DatasetUploader: React.FC<DatasetUploaderProps> = ({ onDatasetUpdated }) =
         </span>
       </div>
 
+      <div style={{ display: 'flex', gap: '10px', flexWrap: 'wrap', alignItems: 'center', marginTop: '10px', fontSize: '0.85em', color: '#666' }}>
+        <span>For files not named like an evaluation export:</span>
+        <input
+          type="text"
+          placeholder="Agent"
+          value={agent}
+          onChange={(e) => setAgent(e.target.value)}
+          style={{ padding: '4px 8px', border: '1px solid #ccc', borderRadius: '4px' }}
+        />
+        <input
+          type="datetime-local"
+          value={runAt}
+          onChange={(e) => setRunAt(e.target.value)}
+          style={{ padding: '4px 8px', border: '1px solid #ccc', borderRadius: '4px' }}
+        />
+      </div>
+
       {error && (
         <div style={{ 
           marginTop: '10px', 
@@ -1,85 +1,148 @@
-import { useEffect, useState } from "react";
-// import { getMetricDetails } from "../api/qualityApi";
+import { useCallback, useEffect, useState } from "react";
+import { getMetricDetailsPage } from "../api/qualityApi";
 
-export default function MetricDrilldownDrawer({ runId, metric, data, onClose }: any) {
-  const [rows, setRows] = useState<any[]>([]);
-  const [loading, setLoading] = useState(true);
+// Records fetched per "Load more" click
+const PAGE_SIZE = 50;
 
-  useEffect(() => {
-    console.log("Fetching metric details for", runId, metric);
-    setLoading(true);
-    console.log("metric", metric);
+// Only the fields the cards render are requested from the server
+const PAGE_FIELDS = ["promptId", "prompt", "agentResponse", "passed", "confidence", "reason"];
+
+// Pages carry this much of the prompt and response; the full text is
+// fetched for a card only when it is expanded
+const PREVIEW_CHARS = 300;
+
+// Extract the final assistant text from a serialized conversation
+const extractAgentResponse = (raw: any) => {
+  if (!raw) return 'No response data available';
+  try {
+    const parsedResponse = typeof raw === 'string' ? JSON.parse(raw) : raw;
     
-    const details = data.map((item : any, index: number) => {
-      // Extract user message and agent response from the actual data structure
-      const userMessage = item.user_message || 'No prompt available';
-      let agentResponse = '';
-      
-      // Parse the agent_response JSON string to extract the actual response text
-      try {
-        if (item.agent_response) {
-          const parsedResponse = JSON.parse(item.agent_response);
-          
-          // Look for the final assistant response (usually the last message with role "assistant" and text content)
-          if (Array.isArray(parsedResponse)) {
-            for (let i = parsedResponse.length - 1; i >= 0; i--) {
-              const message = parsedResponse[i];
-              if (message.role === 'assistant' && message.content) {
-                if (Array.isArray(message.content)) {
-                  // Find text content in the content array
-                  for (const content of message.content) {
-                    if (content.type === 'text' && content.text) {
-                      agentResponse = content.text;
-                      break;
-                    }
-                  }
-                } else if (typeof message.content === 'string') {
-                  agentResponse = message.content;
-                }
-                if (agentResponse) break;
+    // Look for the final assistant response (usually the last message with role "assistant" and text content)
+    if (Array.isArray(parsedResponse)) {
+      for (let i = parsedResponse.length - 1; i >= 0; i--) {
+        const message = parsedResponse[i];
+        if (message.role === 'assistant' && message.content) {
+          if (Array.isArray(message.content)) {
+            // Find text content in the content array
+            for (const content of message.content) {
+              if (content.type === 'text' && content.text) {
+                return content.text;
               }
             }
+          } else if (typeof message.content === 'string') {
+            return message.content;
           }
         }
-      } catch (e) {
-        console.error('Error parsing agent response:', e);
-        agentResponse = 'Error parsing response data';
       }
-      
-      if (!agentResponse) {
-        agentResponse = 'No response data available';
-      }
-      
-      // Map metric names to get the correct data
-      const metricMap: { [key: string]: string } = {
-        'tool_call_accuracy': 'toolCallAccuracy',
-        'task_adherence': 'taskAdherence', 
-        'intent_resolution': 'intentResolution',
-        'groundedness': 'groundedness',
-        'relevance': 'relevance',
-        'coherence': 'coherence',
-        'fluency': 'fluency'
-      };
-      
-      const actualMetric = metricMap[metric] || metric;
-      const metricData = item[actualMetric] || {};
-      
-      return {
-        promptId: index + 1,
-        prompt: userMessage,
-        conversationId: item.conversation_id || 'N/A',
-        agentResponse: agentResponse,
-        passed: metricData.result === "Pass",
-        confidence: "0.8",
-        reason: metricData.reason || 'No reason available'
-      };
+    }
+  } catch (e) {
+    // Plain-text responses are shown as they are
+    return String(raw);
+  }
+  return 'No response data available';
+};
+
+export default function MetricDrilldownDrawer({ runId, metric, onClose }: any) {
+  const [rows, setRows] = useState<any[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [total, setTotal] = useState(0);
+  const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [error, setError] = useState<string | null>(null);
+  // Full prompt and response of expanded cards, by promptId
+  const [expanded, setExpanded] = useState<{ [promptId: string]: any }>({});
+
+  const fetchPage = useCallback(async (cursor: string | null) => {
+    const page = await getMetricDetailsPage(runId, metric, {
+      limit: PAGE_SIZE,
+      cursor: cursor || undefined,
+      fields: PAGE_FIELDS,
+      previewChars: PREVIEW_CHARS,
     });
-    
-    console.log("Metric details from props:", details);
-    setRows(details);
-    setLoading(false);
-    console.log("Metric details set from props:", data);
-  }, [runId, metric, data]);
+    return {
+      ...page,
+      items: page.items.map((item: any) => ({
+        ...item,
+        prompt: item.prompt || 'No prompt available',
+        agentResponse: item.agentResponse || 'No response data available',
+        reason: item.reason || 'No reason available',
+      })),
+    };
+  }, [runId, metric]);
+
+  useEffect(() => {
+    // Start over whenever a different run or metric is opened
+    let cancelled = false;
+    setLoading(true);
+    setError(null);
+    setRows([]);
+    setExpanded({});
+    setNextCursor(null);
+    setTotal(0);
+    fetchPage(null)
+      .then(page => {
+        if (cancelled) return;
+        setRows(page.items);
+        setNextCursor(page.next_cursor);
+        setTotal(page.total);
+      })
+      .catch(err => {
+        if (!cancelled) setError(err instanceof Error ? err.message : 'Failed to load metric details');
+      })
+      .finally(() => {
+        if (!cancelled) setLoading(false);
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [fetchPage]);
+
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchPage(nextCursor);
+      setRows(previous => [...previous, ...page.items]);
+      setNextCursor(page.next_cursor);
+      setTotal(page.total);
+    } catch (err) {
+      setError(err instanceof Error ? err.message : 'Failed to load metric details');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const toggleExpanded = async (promptId: string) => {
+    if (expanded[promptId]) {
+      setExpanded(previous => {
+        const next = { ...previous };
+        delete next[promptId];
+        return next;
+      });
+      return;
+    }
+    setExpanded(previous => ({ ...previous, [promptId]: { loading: true } }));
+    try {
+      // "prompt_12" is row 12, which the API serves as run "run_12"
+      const page = await getMetricDetailsPage(promptId.replace("prompt_", "run_"), metric, {
+        limit: 1,
+        fields: ["prompt", "agentResponse"],
+      });
+      const item = page.items[0] || {};
+      setExpanded(previous => ({
+        ...previous,
+        [promptId]: {
+          prompt: item.prompt || 'No prompt available',
+          agentResponse: extractAgentResponse(item.agentResponse),
+        },
+      }));
+    } catch (err) {
+      setExpanded(previous => ({
+        ...previous,
+        [promptId]: { error: err instanceof Error ? err.message : 'Failed to load full text' },
+      }));
+    }
+  };
 
   const getStatusColor = (passed: boolean) => {
     return passed ? "#2E7D32" : "#D32F2F";
@@ -96,7 +159,10 @@ export default function MetricDrilldownDrawer({ runId, metric, data, onClose }:
     "groundedness": "Groundedness",
     "toolCallAccuracy": "Tool Call Accuracy",
     "taskAdherence": "Task Adherence",
-    "fluency": "Fluency"
+    "fluency": "Fluency",
+    "intent_resolution": "Intent Resolution",
+    "tool_call_accuracy": "Tool Call Accuracy",
+    "task_adherence": "Task Adherence"
   };
 
   return (
@@ -138,13 +204,19 @@ export default function MetricDrilldownDrawer({ runId, metric, data, onClose }:
         <div style={{ textAlign: "center", padding: "40px", color: "#666" }}>
           Loading analysis...
         </div>
+      ) : error && rows.length === 0 ? (
+        <div style={{ textAlign: "center", padding: "40px", color: "#721c24" }}>
+          Error: {error}
+        </div>
       ) : (
         <div>
           <div style={{ marginBottom: "20px", padding: "12px", backgroundColor: "#f8f9fa", borderRadius: "8px" }}>
-            <strong>Summary:</strong> {rows.filter(r => r.passed).length} passed, {rows.filter(r => !r.passed).length} failed out of {rows.length} evaluations
+            <strong>Summary:</strong> {rows.filter(r => r.passed).length} passed, {rows.filter(r => !r.passed).length} failed out of {rows.length} loaded ({total} evaluations)
           </div>
           
-          {rows.map((r, index) => (
+          {rows.map((r) => {
+            const full = expanded[r.promptId];
+            return (
             <div key={r.promptId} style={{
               marginBottom: "20px",
               padding: "16px",
@@ -174,7 +246,7 @@ export default function MetricDrilldownDrawer({ runId, metric, data, onClose }:
                   color: "#495057",
                   border: "1px solid #e9ecef"
                 }}>
-                  {r.prompt}
+                  {full && full.prompt ? full.prompt : r.prompt}
                 </div>
               </div>
 
@@ -191,8 +263,22 @@ export default function MetricDrilldownDrawer({ runId, metric, data, onClose }:
                   maxHeight: "150px",
                   overflowY: "auto"
                 }}>
-                  {r.agentResponse}
+                  {full && full.agentResponse ? full.agentResponse : r.agentResponse}
                 </div>
+                <button onClick={() => toggleExpanded(r.promptId)} disabled={full && full.loading} style={{
+                  marginTop: "6px",
+                  background: "none",
+                  border: "none",
+                  padding: 0,
+                  color: "#007bff",
+                  cursor: "pointer",
+                  fontSize: "12px"
+                }}>
+                  {full ? (full.loading ? "Loading..." : "Show less") : "Show full text"}
+                </button>
+                {full && full.error && (
+                  <div style={{ color: "#721c24", fontSize: "12px" }}>Error: {full.error}</div>
+                )}
               </div>
 
               <div style={{ marginBottom: "8px" }}>
@@ -216,7 +302,30 @@ export default function MetricDrilldownDrawer({ runId, metric, data, onClose }:
                 </div>
               )}
             </div>
-          ))}
+            );
+          })}
+
+          {error && (
+            <div style={{ marginBottom: "12px", color: "#721c24", fontSize: "14px" }}>
+              Error: {error}
+            </div>
+          )}
+
+          {nextCursor && (
+            <button onClick={loadMore} disabled={loadingMore} style={{
+              width: "100%",
+              padding: "10px 16px",
+              backgroundColor: loadingMore ? "#ccc" : "#007bff",
+              color: "white",
+              border: "none",
+              borderRadius: "6px",
+              cursor: loadingMore ? "not-allowed" : "pointer",
+              fontSize: "14px",
+              fontWeight: "600"
+            }}>
+              {loadingMore ? "Loading..." : `Load more (${rows.length} of ${total})`}
+            </button>
+          )}
         </div>
       )}
     </div>